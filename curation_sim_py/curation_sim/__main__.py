@@ -0,0 +1,71 @@
+"""
+Runs the registered scenarios (see `curation_sim.scenarios`), or scenario files (see `curation_sim.scenario_file`):
+
+    python -m curation_sim list
+    python -m curation_sim run whale --seed 1 --out results/
+    python -m curation_sim run vol --plot
+    python -m curation_sim run curation_sim/scenario_files/whale.toml --seed 1
+"""
+import argparse
+import os
+import sys
+from typing import Optional, Sequence
+
+import numpy as np
+
+from curation_sim.online import summarize
+from curation_sim.results import MEMORY_BUDGET
+from curation_sim.scenario_file import DEFAULT_CACHE_DIR, load_scenario
+from curation_sim.scenarios import SCENARIOS, get_scenario, run_scenario
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m curation_sim', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list the registered scenarios.')
+    run = commands.add_parser('run', help='run a scenario.')
+    run.add_argument('scenario', help=f'a registered scenario ({", ".join(sorted(SCENARIOS))}), or the path of a '
+                                      'scenario file.')
+    run.add_argument('--seed', type=int, help='seeds the random draws of the run.')
+    run.add_argument('--out', metavar='PATH', help='write the results to this directory as the run goes.')
+    run.add_argument('--memory-budget', type=int, default=MEMORY_BUDGET,
+                     help='the bytes of results held in memory before they are written out.')
+    run.add_argument('--plot', action='store_true', help='plot the results.')
+    run.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                     help='the directory of compiled scenario files (default: %(default)s).')
+    run.add_argument('--no-cache', action='store_true', help='compile scenario files without caching them.')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name in sorted(SCENARIOS):
+            print(f'{name:<16}{get_scenario(name).description}')
+        return 0
+
+    if args.scenario in SCENARIOS:
+        scenario = get_scenario(args.scenario)
+    elif os.path.isfile(args.scenario):
+        # the random draws of a scenario file are made, with its seed, when it is compiled.
+        scenario = load_scenario(args.scenario, args.seed, None if args.no_cache else args.cache_dir).scenario()
+    else:
+        parser.error(f'no scenario or scenario file {args.scenario}; registered: {", ".join(sorted(SCENARIOS))}')
+    accumulators = [] if scenario.statistics is None else scenario.statistics()
+    log = run_scenario(scenario, args.seed, args.out, args.memory_budget, accumulators)
+    print(f'{args.scenario}: {len(log)} samples of {", ".join(log.columns)}'
+          + (f', written to {args.out}' if args.out else ''))
+    for name, statistics in summarize(accumulators).items():
+        print(f'  {name}: ' + ', '.join(f'{k}={v:.6g}' if np.isscalar(v) else f'{k}={v}'
+                                        for k, v in statistics.items()))
+    if args.plot:
+        if scenario.plot is None:
+            print(f'{args.scenario} has no plots')
+            return 1
+        import matplotlib.pyplot as plt
+
+        scenario.plot(log)
+        plt.show()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Agents: populations of participants that observe the live state every period and decide what to do. A population
+decides for all of its members at once, from arrays of their deposits and balances read off the state, so large
+reactive populations cost a few array operations per period plus one action per member that acts.
+
+`agent_actions(state, *agents)` turns agents into the period actions of a stream (see `curation_sim.streams`):
+
+    simulate3(periodic(agent_actions(state, traders, buyers), blocks=7200, periods=200), state)
+
+Agents act in turn, each deciding when its turn comes, so every agent sees the effects of the actions of those
+before it. Decisions are made as the stream is consumed by `simulate3`, never ahead of it.
+"""
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+from curation_sim.sim_utils import Action, State
+from curation_sim.streams import PeriodActions
+
+
+def deposits_of(pool: CurationPool, accounts: Sequence[ADDRESS_t]) -> np.ndarray:
+    if hasattr(pool, 'depositsOf'):
+        return pool.depositsOf(accounts)
+    return np.array([pool.depositOf(a) for a in accounts])
+
+
+def balances_of(token: Token, accounts: Sequence[ADDRESS_t]) -> np.ndarray:
+    if hasattr(token, 'balancesOf'):
+        return token.balancesOf(accounts)
+    return np.array([token.balanceOf(a) for a in accounts])
+
+
+def share_price(pool: CurationPool) -> NUMERIC_t:
+    """the self-assessed value of one share: what `buyShares` charges per share for a vanishing purchase."""
+    return pool.reserveToken.balanceOf(pool.address) * pool.valuationMultiple / pool.totalShares
+
+
+class Agent(ABC):
+
+    @abstractmethod
+    def act(self, state: State, t: int) -> Iterable[Action]:
+        """the actions of the population in period t, given the state at the start of its turn."""
+        pass
+
+
+def agent_actions(state: State, *agents: Agent) -> PeriodActions:
+    """the period actions of agents observing a state."""
+    def actions(t: int) -> Iterator[Action]:
+        for agent in agents:
+            yield from agent.act(state, t)
+    return actions
+
+
+class SensibleCurators(Agent):
+    """Curators who compound their deposit by a growth rate every so many periods, as far as their GRT allows."""
+
+    def __init__(self, curators: Sequence[ADDRESS_t], growth: float, every: int = 1):
+        """
+        :param growth: the fraction of its deposit a curator adds.
+        :param every: the number of periods between deposits.
+        """
+        self.curators: Sequence[ADDRESS_t] = list(curators)
+        self.growth: float = growth
+        self.every: int = every
+
+    def act(self, state: State, t: int) -> Iterator[Action]:
+        if t % self.every:
+            return
+        pool = state.curationPool
+        amounts = self.growth * deposits_of(pool, self.curators)
+        affordable = (amounts > 0) & (amounts <= balances_of(state.reserveToken, self.curators))
+        amounts = amounts.tolist()
+        for i in np.flatnonzero(affordable).tolist():
+            yield Action(action_type='DEPOSIT', target='curationPool', args=[self.curators[i], amounts[i]])
+
+
+class VolTraders(Agent):
+    """
+    Traders who, every period, each raise their deposit by a factor with one probability, lower it by its inverse
+    with another, or else do nothing. Deposits a trader's GRT cannot cover are skipped.
+    """
+
+    def __init__(self,
+                 traders: Sequence[ADDRESS_t],
+                 deposit_probability: float,
+                 withdraw_probability: float,
+                 trade_fraction: float,
+                 rng: Optional[np.random.Generator] = None):
+        assert deposit_probability >= 0
+        assert withdraw_probability >= 0
+        assert deposit_probability + withdraw_probability <= 1.0
+        self.traders: Sequence[ADDRESS_t] = list(traders)
+        self.deposit_probability: float = deposit_probability
+        self.withdraw_probability: float = withdraw_probability
+        self.trade_fraction: float = trade_fraction
+        self.rng: np.random.Generator = np.random.default_rng() if rng is None else rng
+
+    def act(self, state: State, t: int) -> Iterator[Action]:
+        deposits = deposits_of(state.curationPool, self.traders)
+        grt = balances_of(state.reserveToken, self.traders)
+        u = self.rng.random(len(self.traders))
+
+        up = (self.trade_fraction - 1) * deposits
+        down = deposits * (1 - 1 / self.trade_fraction)
+        deposit = (u < self.deposit_probability) & (up < grt)
+        withdraw = (u >= self.deposit_probability) & (u < self.deposit_probability + self.withdraw_probability)
+
+        up, down = up.tolist(), down.tolist()
+        for i in np.flatnonzero(deposit | withdraw).tolist():
+            if deposit[i]:
+                yield Action(action_type='DEPOSIT', target='curationPool', args=[self.traders[i], up[i]])
+            else:
+                yield Action(action_type='WITHDRAW', target='curationPool', args=[self.traders[i], down[i]])
+
+
+class Whale(Agent):
+    """A curator who deposits a large amount in one period and withdraws their whole deposit in a later one."""
+
+    def __init__(self, account: ADDRESS_t, amount: NUMERIC_t, enter: int, exit: Optional[int] = None):
+        self.account: ADDRESS_t = account
+        self.amount: NUMERIC_t = amount
+        self.enter: int = enter
+        self.exit: Optional[int] = exit
+
+    def act(self, state: State, t: int) -> Iterator[Action]:
+        if t == self.enter:
+            yield Action(action_type='DEPOSIT', target='curationPool', args=[self.account, self.amount])
+        elif t == self.exit:
+            deposit = state.curationPool.depositOf(self.account)
+            if deposit > 0:
+                yield Action(action_type='WITHDRAW', target='curationPool', args=[self.account, deposit])
+
+
+class MarketBuyers(Agent):
+    """
+    Buyers who each value a share at a price of their own, and every period buy a number of shares if the share
+    price is below their valuation and they can afford the purchase. Buyers are screened against the state at the
+    start of the period all at once, and those who pass are checked again when their turn comes, since the actions
+    before them (of this or other agents) move the price and their balances.
+    """
+
+    def __init__(self,
+                 buyers: Sequence[ADDRESS_t],
+                 valuations: np.ndarray,
+                 shares: NUMERIC_t,
+                 probability: float = 1.,
+                 rng: Optional[np.random.Generator] = None):
+        """
+        :param valuations: the price each buyer is willing to pay for a share.
+        :param shares: the number of shares in each purchase.
+        :param probability: the probability that a willing buyer is in the market in a period.
+        """
+        self.buyers: Sequence[ADDRESS_t] = list(buyers)
+        self.valuations: np.ndarray = np.asarray(valuations, dtype=np.float64)
+        self.shares: NUMERIC_t = shares
+        self.probability: float = probability
+        self.rng: np.random.Generator = np.random.default_rng() if rng is None else rng
+
+    def _cost(self, pool: CurationPool) -> float:
+        shares = float(self.shares)
+        return float(share_price(pool)) * shares / (1 + shares / float(pool.totalShares))
+
+    def act(self, state: State, t: int) -> Iterator[Action]:
+        pool = state.curationPool
+        willing = ((self.valuations > float(share_price(pool)))
+                   & (balances_of(state.reserveToken, self.buyers) >= self._cost(pool)))
+        if self.probability < 1:
+            willing &= self.rng.random(len(self.buyers)) < self.probability
+        for i in np.flatnonzero(willing).tolist():
+            buyer = self.buyers[i]
+            if self.valuations[i] > share_price(pool) and state.reserveToken.balanceOf(buyer) >= self._cost(pool):
+                yield Action(action_type='BUY_SHARES', target='curationPool', args=[buyer, self.shares])
@@ -0,0 +1,205 @@
+"""
+Filters and fits for simulation outputs. Every function takes a single trajectory or a batch of them, as the rows of a
+2-D array (eg. a metric of every replica of an ensemble, or every point of a sweep), with time along the last axis, and
+treats the whole batch in one vectorized pass: the filters run as linear recursions through `scipy.signal.lfilter`,
+linear and log-linear fits are closed form, and nonlinear least squares fits step the parameters of every trajectory
+at once, so fitting a thousand runs of a sweep costs about as many array operations as fitting one.
+
+    fit = fit_relaxation(t, ratios)      # ratios of shape (replicas, periods)
+    a, b, rate = fit.params.T            # the parameters of every replica
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+
+def lowpass(x: np.ndarray, a, axis: int = -1) -> np.ndarray:
+    """
+    The first-order lowpass filter y[0] = x[0], y[i] = a y[i-1] + (1 - a) x[i].
+
+    :param a: the smoothing factor in [0, 1], or an array of one per trajectory, shaped as x with a time axis of
+           length 1.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    a = np.asarray(a, dtype=np.float64)
+    if a.ndim:
+        shape = list(x.shape)
+        shape[axis] = 1
+        a = np.moveaxis(np.broadcast_to(a, shape), axis, -1)[..., 0]
+    x = np.moveaxis(x, axis, -1)
+    if a.ndim == 0:
+        from scipy.signal import lfilter
+
+        # the initial state sets y[-1] = x[0], so that y[0] = x[0].
+        y, _ = lfilter([1 - a], [1, -a], x, zi=a * x[..., :1])
+    else:
+        # a recursion per trajectory: loop over time, vectorized over the batch.
+        y = np.empty_like(x)
+        y[..., 0] = x[..., 0]
+        for i in range(1, x.shape[-1]):
+            y[..., i] = a * y[..., i - 1] + (1 - a) * x[..., i]
+    return np.moveaxis(y, -1, axis)
+
+
+def ema(x: np.ndarray, a: float, axis: int = -1) -> np.ndarray:
+    """
+    The exponential moving average of everything up to each time, weighting a value i steps back by a**i:
+    y[i] = sum_k a**k x[i-k] / sum_k a**k.
+    """
+    from scipy.signal import lfilter
+
+    x = np.asarray(x, dtype=np.float64)
+    num = lfilter([1.], [1., -a], x, axis=axis)
+    shape = [1] * x.ndim
+    shape[axis] = x.shape[axis]
+    denom = lfilter([1.], [1., -a], np.ones(x.shape[axis])).reshape(shape)
+    return num / denom
+
+
+def fit_linear(basis: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    The least squares coefficients of y on the columns of a basis, y[..., t] ~ sum_k c[..., k] basis[..., t, k].
+
+    :param basis: the basis functions sampled at the times of y, of shape (T, K), or one basis per trajectory.
+    :param y: trajectories of shape (..., T).
+    :return: the coefficients, of shape (..., K).
+    """
+    basis = np.asarray(basis, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if basis.ndim == 2:
+        # one basis for every trajectory: a single pseudo-inverse.
+        return y @ np.linalg.pinv(basis).T
+    gram = np.swapaxes(basis, -1, -2) @ basis
+    return np.linalg.solve(gram, (np.swapaxes(basis, -1, -2) @ y[..., None]))[..., 0]
+
+
+def fit_exponential(t: np.ndarray, y: np.ndarray):
+    """
+    The log-linear fit y ~ scale exp(rate t) of positive trajectories, in closed form.
+
+    :return: the scale and the rate of every trajectory.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    log_scale, rate = np.moveaxis(fit_linear(np.stack([np.ones_like(t), t], axis=-1), np.log(y)), -1, 0)
+    return np.exp(log_scale), rate
+
+
+@dataclass
+class BatchFit:
+    # the fitted parameters, of shape (trajectories, parameters).
+    params: np.ndarray
+    # the sum of squared residuals of every trajectory.
+    cost: np.ndarray
+    # whether the fit of every trajectory converged; fits that stalled or ran out of iterations did not.
+    converged: np.ndarray
+
+
+def fit_least_squares(model: Callable[..., np.ndarray],
+                      t: np.ndarray,
+                      y: np.ndarray,
+                      p0,
+                      bounds=(-np.inf, np.inf),
+                      max_iterations: int = 200,
+                      tolerance: float = 1e-10) -> BatchFit:
+    """
+    Fits a model to every trajectory by Levenberg-Marquardt, with the steps of all trajectories taken together: each
+    iteration evaluates the model for the whole batch once, plus once per parameter for a forward-difference
+    Jacobian, and solves the small normal equations of every trajectory at once. Every trajectory has its own damping
+    and stops on its own, so an ill-conditioned trajectory does not hold the others back.
+
+    :param model: model(t, *params) gives the model of every trajectory, where each parameter is an array of one value
+           per trajectory, of shape (trajectories, 1), and t has shape (T,).
+    :param y: trajectories of shape (T,) or (trajectories, T).
+    :param p0: the initial parameters, either one of each, shared by every trajectory, or of shape
+           (trajectories, parameters).
+    :param bounds: lower and upper bounds of each parameter; steps are clipped to them.
+    :param tolerance: a trajectory has converged when a step improves its cost by less than this fraction. A
+           trajectory whose damping runs away without a step improving it has stalled, and stops without converging.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    p = np.array(np.broadcast_to(np.asarray(p0, dtype=np.float64), (n, np.shape(p0)[-1])))
+    k = p.shape[1]
+    lower, upper = (np.broadcast_to(np.asarray(b, dtype=np.float64), (n, k)) for b in bounds)
+    p = np.clip(p, lower, upper)
+
+    def residuals(p):
+        return model(t, *(p[:, [i]] for i in range(k))) - y
+
+    r = residuals(p)
+    cost = (r ** 2).sum(axis=1)
+    damping = np.full(n, 1e-3)
+    converged = np.zeros(n, dtype=bool)
+    stalled = np.zeros(n, dtype=bool)
+    eye = np.eye(k)
+    for _ in range(max_iterations):
+        # forward differences, stepping towards the interior at an upper bound.
+        h = np.sqrt(np.finfo(np.float64).eps) * np.maximum(np.abs(p), 1.)
+        h = np.where(p + h > upper, -h, h)
+        jacobian = np.empty(r.shape + (k,))
+        for i in range(k):
+            stepped = p.copy()
+            stepped[:, i] += h[:, i]
+            jacobian[..., i] = (residuals(stepped) - r) / h[:, [i]]
+
+        jtj = np.swapaxes(jacobian, 1, 2) @ jacobian
+        jtr = (np.swapaxes(jacobian, 1, 2) @ r[..., None])[..., 0]
+        scale = jtj * eye + 1e-12 * eye
+        step = np.linalg.solve(jtj + damping[:, None, None] * scale, -jtr[..., None])[..., 0]
+        trial = np.clip(p + step, lower, upper)
+        trial_r = residuals(trial)
+        trial_cost = (trial_r ** 2).sum(axis=1)
+
+        better = (trial_cost <= cost) & ~converged & ~stalled
+        converged |= better & (cost - trial_cost <= tolerance * cost)
+        p[better], r[better], cost[better] = trial[better], trial_r[better], trial_cost[better]
+        damping = np.where(better, damping / 10, damping * 10)
+        # a trajectory whose damping has run away cannot improve further.
+        stalled |= ~converged & (damping > 1e12)
+        if (converged | stalled).all():
+            break
+    return BatchFit(params=p, cost=cost, converged=converged)
+
+
+def _relaxation(t, a, b, rate):
+    return a - b * np.exp(rate * t)
+
+
+def fit_relaxation(t: np.ndarray, y: np.ndarray, rates: Optional[Sequence[float]] = None) -> BatchFit:
+    """
+    Fits exponential relaxations y ~ a - b exp(rate t) to every trajectory. Given the rate the fit is linear in a and
+    b, so every trajectory starts from the best of a grid of rates, fitted in closed form, before all are refined
+    together.
+
+    :param rates: the grid of starting rates; defaults to decay rates from 1/100 to 10 e-folds over the span of t.
+    :return: a BatchFit with parameters (a, b, rate).
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    if rates is None:
+        rates = -np.logspace(-2, 1, 64) / (t[-1] - t[0])
+    rates = np.asarray(rates, dtype=np.float64)
+
+    # (rates, T, 2) bases, and the closed form fit of every trajectory to every one.
+    bases = np.stack([np.ones((len(rates), len(t))), -np.exp(rates[:, None] * t)], axis=-1)
+    coefficients = np.stack([fit_linear(basis, y) for basis in bases])
+    costs = ((np.einsum('rtk,rnk->rnt', bases, coefficients) - y) ** 2).sum(axis=-1)
+    best = costs.argmin(axis=0)
+    batch = np.arange(len(y))
+    p0 = np.column_stack([coefficients[best, batch], rates[best]])
+    return fit_least_squares(_relaxation, t, y, p0)
+
+
+def _lowpass_model(x: np.ndarray) -> Callable[..., np.ndarray]:
+    return lambda t, a: lowpass(x, a)
+
+
+def fit_lowpass(x: np.ndarray, y: np.ndarray, a0: float = .6) -> BatchFit:
+    """
+    Fits the smoothing factor of the lowpass filter taking each trajectory of x closest to the same trajectory of y,
+    eg. how closely share fractions follow deposit fractions.
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    return fit_least_squares(_lowpass_model(x), np.arange(x.shape[-1]), y, [a0], bounds=([0.], [1.]))
@@ -0,0 +1,306 @@
+"""
+Benchmarks of the hot paths of both engines, with float and with fixed-point arithmetic, over populations of
+increasing size. Each benchmark builds a workload state of n curators, then times a number of operations on it,
+scaled up until a run takes at least `MIN_SECONDS`; the median of several such runs, each on a fresh state, is kept,
+with the spread of the runs. Peak memory is measured with tracemalloc in a separate run of `OPS` operations, so that
+tracing does not distort the timings. Results can be stored as a JSON baseline and compared against later runs, where
+a drop in ops/sec beyond the tolerance, or beyond the spread of either run if that is wider, or a rise in peak memory
+beyond a tolerance is a regression.
+
+    python -m curation_sim.benchmarks.suite --save baselines.json
+    python -m curation_sim.benchmarks.suite --compare baselines.json --plot scaling.png
+"""
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.numeric import FIXED18, FLOAT, NumericBackend
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import simulate3
+
+ENGINES: Dict[str, Tuple[Type[CurationPool], Type[Token], NumericBackend]] = {
+    'dict': (CurationPool, Token, FLOAT),
+    'array': (ArrayCurationPool, ArrayToken, FLOAT),
+    'dict-fixed18': (CurationPool, Token, FIXED18),
+    'array-fixed18': (ArrayCurationPool, ArrayToken, FIXED18),
+}
+
+# the least number of operations of a micro-benchmark, and the number whose peak memory is measured.
+OPS: int = 2_000
+# the periods of the end-to-end simulate3 workload of `OPS` operations; it is lengthened in proportion to the number
+# of operations timed.
+PERIODS: int = 20
+# the least duration of a timed run.
+MIN_SECONDS: float = .1
+DEFAULT_SIZES: Tuple[int, ...] = (100, 1_000, 10_000)
+DEFAULT_REPEAT: int = 7
+# the fraction by which ops/sec may fall before it is a regression: medians of whole runs of the suite on one shared
+# machine differed by up to 2x, well beyond the spread of the runs within a benchmark.
+TOLERANCE: float = .6
+
+# a benchmark sets up a workload of n curators on an engine for a number of operations and returns the number of
+# operations and a callable performing them.
+Benchmark = Callable[[int, str, int], Tuple[int, Callable[[], None]]]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    n: int
+    ops: int
+    seconds: float
+    peak_bytes: int
+    # the interquartile range of the times of the runs, as a fraction of their median.
+    spread: float = 0.
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}[{self.n}]'
+
+
+def _setup(n: int, engine: str, ops: int):
+    workload = Workload(num_curators=n, periods=1)
+    state = workload.state(*ENGINES[engine])
+    picks = np.random.default_rng(0).integers(n, size=ops).tolist()
+    # the amount of every transfer, deposit, withdrawal and purchase.
+    amount = state.reserveToken.numeric.number(1e-3)
+    return workload.curators, state, picks, amount
+
+
+def bench_transfer(n: int, engine: str, ops: int = OPS):
+    curators, state, picks, amount = _setup(n, engine, ops)
+    token = state.reserveToken
+
+    def run():
+        for i in picks:
+            token.transfer(curators[i], curators[i - 1], amount)
+    return ops, run
+
+
+def bench_deposit(n: int, engine: str, ops: int = OPS):
+    curators, state, picks, amount = _setup(n, engine, ops)
+    pool = state.curationPool
+
+    def run():
+        for i in picks:
+            pool.deposit(curators[i], amount)
+    return ops, run
+
+
+def bench_withdraw(n: int, engine: str, ops: int = OPS):
+    curators, state, picks, amount = _setup(n, engine, ops)
+    pool = state.curationPool
+
+    def run():
+        for i in picks:
+            pool.withdraw(curators[i], amount)
+    return ops, run
+
+
+def bench_claim(n: int, engine: str, ops: int = OPS):
+    curators, state, picks, _ = _setup(n, engine, ops)
+    pool, chain = state.curationPool, state.chain
+
+    def run():
+        for i in picks:
+            chain.step()
+            pool.claim(curators[i])
+    return ops, run
+
+
+def bench_buy_shares(n: int, engine: str, ops: int = OPS):
+    _, state, _, amount = _setup(n, engine, ops)
+    pool, chain = state.curationPool, state.chain
+
+    def run():
+        for _ in range(ops):
+            chain.step()
+            pool.buyShares('market', amount)
+    return ops, run
+
+
+def bench_secondary_claim(n: int, engine: str, ops: int = OPS):
+    curators, state, picks, _ = _setup(n, engine, ops)
+    state.chain.sleep(ops)
+    state.curationPool.mintShares()
+    secondary_pool = state.curationPool.secondaryPool
+
+    def run():
+        for i in picks:
+            secondary_pool._claim(curators[i])
+    return ops, run
+
+
+def bench_simulate3(n: int, engine: str, ops: int = OPS):
+    workload = Workload(num_curators=n, periods=max(1, PERIODS * ops // OPS))
+    pool_cls, token_cls, numeric = ENGINES[engine]
+    state = workload.state(pool_cls, token_cls, numeric)
+    actions = workload.actions(numeric)
+    return len(actions), lambda: simulate3(actions, state)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    'token.transfer': bench_transfer,
+    'pool.deposit': bench_deposit,
+    'pool.withdraw': bench_withdraw,
+    'pool.claim': bench_claim,
+    'pool.buyShares': bench_buy_shares,
+    'secondaryPool._claim': bench_secondary_claim,
+    'simulate3': bench_simulate3,
+}
+
+
+def _time(benchmark: str, engine: str, n: int, size: int) -> Tuple[int, float]:
+    """the number of operations of one run of a benchmark set up for `size` operations, and its duration."""
+    ops, run = BENCHMARKS[benchmark](n, engine, size)
+    start = time.perf_counter()
+    run()
+    return ops, time.perf_counter() - start
+
+
+def measure(benchmark: str,
+            engine: str,
+            n: int,
+            repeat: int = DEFAULT_REPEAT,
+            min_seconds: float = MIN_SECONDS) -> BenchmarkResult:
+    """
+    the median time of `repeat` runs, each on a fresh state, of as many operations as take at least `min_seconds`,
+    and the peak memory allocated by a run of `OPS` operations.
+    """
+    size = OPS
+    ops, seconds = _time(benchmark, engine, n, size)
+    while seconds < min_seconds:
+        size = int(size * min(10., 1.2 * min_seconds / max(seconds, 1e-6)))
+        ops, seconds = _time(benchmark, engine, n, size)
+    samples = [seconds] + [_time(benchmark, engine, n, size)[1] for _ in range(repeat - 1)]
+    q1, median, q3 = np.percentile(samples, [25, 50, 75]).tolist()
+
+    _, run = BENCHMARKS[benchmark](n, engine, OPS)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name=f'{engine}/{benchmark}', n=n, ops=ops, seconds=median, peak_bytes=peak_bytes,
+                           spread=(q3 - q1) / median)
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES,
+              benchmarks: Optional[Iterable[str]] = None,
+              engines: Iterable[str] = tuple(ENGINES),
+              repeat: int = DEFAULT_REPEAT,
+              min_seconds: float = MIN_SECONDS) -> List[BenchmarkResult]:
+    benchmarks = list(BENCHMARKS) if benchmarks is None else list(benchmarks)
+    return [measure(b, e, n, repeat, min_seconds) for e in engines for b in benchmarks for n in sizes]
+
+
+def save_baselines(results: List[BenchmarkResult], path: str):
+    with open(path, 'w') as f:
+        json.dump({'python': platform.python_version(),
+                   'machine': platform.machine(),
+                   'results': [dict(asdict(r), ops_per_sec=r.ops_per_sec) for r in results]}, f, indent=1)
+
+
+def load_baselines(path: str) -> Dict[str, BenchmarkResult]:
+    with open(path) as f:
+        entries = json.load(f)['results']
+    results = [BenchmarkResult(**{k: v for k, v in e.items() if k != 'ops_per_sec'}) for e in entries]
+    return {r.key: r for r in results}
+
+
+def compare(results: List[BenchmarkResult],
+            baselines: Dict[str, BenchmarkResult],
+            tolerance: float = TOLERANCE,
+            memory_tolerance: float = .2,
+            memory_slack: int = 64 * 1024) -> List[str]:
+    """
+    The regressions of `results` against the baselines: benchmarks whose ops/sec fell by more than `tolerance`, or by
+    more than the spread of the runs of either the result or the baseline where that is wider, or whose peak memory
+    grew by more than `memory_tolerance`, as a fraction of the baseline, and by more than `memory_slack` bytes.
+    """
+    regressions = []
+    for r in results:
+        baseline = baselines.get(r.key)
+        if baseline is None:
+            continue
+        if r.ops_per_sec < (1 - max(tolerance, r.spread, baseline.spread)) * baseline.ops_per_sec:
+            regressions.append(f'{r.key}: {r.ops_per_sec:,.0f} ops/s < baseline {baseline.ops_per_sec:,.0f} ops/s')
+        if r.peak_bytes > max((1 + memory_tolerance) * baseline.peak_bytes, baseline.peak_bytes + memory_slack):
+            regressions.append(f'{r.key}: peak {r.peak_bytes:,} B > baseline {baseline.peak_bytes:,} B')
+    return regressions
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<36}{'n':>8}{'ops/s':>14}{'spread':>8}{'peak (KiB)':>14}"]
+    lines += [f'{r.name:<36}{r.n:>8}{r.ops_per_sec:>14,.0f}{r.spread:>8.0%}{r.peak_bytes / 1024:>14,.1f}'
+              for r in results]
+    return '\n'.join(lines)
+
+
+def plot_scaling(results: List[BenchmarkResult], path: Optional[str] = None):
+    """ops/sec and peak memory of every benchmark against the number of curators, on log-log axes."""
+    import matplotlib.pyplot as plt
+
+    fig, (ax_speed, ax_memory) = plt.subplots(1, 2, figsize=(14, 6))
+    for name in dict.fromkeys(r.name for r in results):
+        series = sorted((r for r in results if r.name == name), key=lambda r: r.n)
+        ns = [r.n for r in series]
+        ax_speed.plot(ns, [r.ops_per_sec for r in series], marker='o', label=name)
+        ax_memory.plot(ns, [r.peak_bytes for r in series], marker='o', label=name)
+    for ax, label in ((ax_speed, 'ops/sec'), (ax_memory, 'peak bytes')):
+        ax.set_xscale('log')
+        ax.set_yscale('log')
+        ax.set_xlabel('curators')
+        ax.set_ylabel(label)
+    ax_speed.legend(fontsize='small')
+    fig.tight_layout()
+    if path is not None:
+        fig.savefig(path)
+    return fig
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS))
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS)
+    parser.add_argument('--save', metavar='PATH', help='store the results as a baseline.')
+    parser.add_argument('--compare', metavar='PATH', help='fail if the results regress against a baseline.')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--plot', metavar='PATH', help='save scaling curves.')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.benchmarks, args.engines, args.repeat, args.min_seconds)
+    print(format_table(results))
+    if args.save:
+        save_baselines(results, args.save)
+    if args.plot:
+        plot_scaling(results, args.plot)
+    if args.compare:
+        regressions = compare(results, load_baselines(args.compare), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
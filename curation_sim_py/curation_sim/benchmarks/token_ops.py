@@ -0,0 +1,47 @@
+"""
+Micro-benchmark of Token transfer, mint and burn. Each operation is timed on a token without hooks, which takes the
+fast path, and on the same token with a no-op hook registered, which forces the full Context pipeline that every
+operation used to go through.
+
+    python -m curation_sim.benchmarks.token_ops
+"""
+import timeit
+from typing import Dict, Type
+
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.token import Token
+
+NUM_ACCOUNTS = 100
+
+
+def _noop(context):
+    pass
+
+
+def _token(token_cls: Type[Token], hooked: bool) -> Token:
+    token = token_cls({f'account{i}': 1e9 for i in range(NUM_ACCOUNTS)})
+    if hooked:
+        token.registerHooks(preTransfer=[_noop], preMint=[_noop], preBurn=[_noop])
+    return token
+
+
+def time_token_ops(token_cls: Type[Token] = Token, hooked: bool = False, number: int = 100_000) -> Dict[str, float]:
+    """the mean cost in microseconds of a transfer, a mint and a burn."""
+    token = _token(token_cls, hooked)
+    ops = {'transfer': lambda: token.transfer('account0', 'account1', 1.),
+           'mint': lambda: token.mint('account2', 1.),
+           'burn': lambda: token.burn('account3', 1.)}
+    return {name: min(timeit.repeat(op, number=number, repeat=3)) / number * 1e6 for name, op in ops.items()}
+
+
+def main():
+    print(f"{'token':<12}{'op':<10}{'hooked (us)':>12}{'fast (us)':>12}{'speedup':>10}")
+    for token_cls in (Token, ArrayToken):
+        hooked = time_token_ops(token_cls, hooked=True)
+        fast = time_token_ops(token_cls, hooked=False)
+        for op in fast:
+            print(f'{token_cls.__name__:<12}{op:<10}{hooked[op]:>12.3f}{fast[op]:>12.3f}{hooked[op] / fast[op]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Synthetic workloads for benchmarking: a population of curators with equal deposits, and a random stream of actions
+in which every period each curator independently deposits, withdraws or claims with the probabilities of an action
+mix, a market participant buys shares, and the chain then sleeps.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Type
+
+import numpy as np
+
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.numeric import FLOAT, NumericBackend
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import Action, State
+
+# the probability that a curator takes each action in a period; BUY_SHARES is the probability of one market purchase.
+DEFAULT_MIX: Dict[str, float] = {'DEPOSIT': .02, 'WITHDRAW': .02, 'CLAIM': .05, 'BUY_SHARES': .5}
+
+CURATOR_DEPOSIT: float = 1_000
+CURATOR_RESERVE: float = 1_000
+TRADE_SIZE: float = 10
+MARKET_RESERVE: float = 1e12
+
+
+@dataclass
+class Workload:
+    num_curators: int
+    periods: int
+    mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    blocks_per_period: int = 100
+    issuance_rate: float = 1e-4
+    seed: int = 0
+
+    @property
+    def curators(self) -> List[str]:
+        return [f'curator{i}' for i in range(self.num_curators)]
+
+    def state(self,
+              pool_cls: Type[CurationPool] = CurationPool,
+              token_cls: Type[Token] = Token,
+              numeric: NumericBackend = FLOAT) -> State:
+        deposits = [(c, CURATOR_DEPOSIT) for c in self.curators]
+        reserve = token_cls({'curationPool': CURATOR_DEPOSIT * self.num_curators,
+                             'market': MARKET_RESERVE,
+                             **{c: CURATOR_RESERVE for c in self.curators}},
+                            numeric=numeric)
+        chain = Chain()
+        pool = pool_cls(address='curationPool',
+                        initialShareBalances=dict(deposits),
+                        initialDeposits=deposits,
+                        chain=chain,
+                        reserveToken=reserve,
+                        share_token_cls=token_cls,
+                        issuanceRate=self.issuance_rate)
+        return State(chain, reserve, pool)
+
+    def actions(self, numeric: NumericBackend = FLOAT) -> List[Action]:
+        """
+        the action stream, with amounts in numbers of `numeric`; withdrawals that would exceed a curator's deposit are
+        left out.
+        """
+        trade_size = numeric.number(TRADE_SIZE)
+        rng = np.random.default_rng(self.seed)
+        curators = self.curators
+        deposits = np.full(self.num_curators, CURATOR_DEPOSIT)
+        reserves = np.full(self.num_curators, CURATOR_RESERVE)
+
+        actions = []
+        for _ in range(self.periods):
+            for action_type, p in self.mix.items():
+                if action_type == 'BUY_SHARES':
+                    if rng.random() < p:
+                        actions.append(Action(action_type='BUY_SHARES', target='curationPool',
+                                              args=['market', trade_size]))
+                    continue
+                for i in np.flatnonzero(rng.random(self.num_curators) < p).tolist():
+                    if action_type == 'DEPOSIT':
+                        if reserves[i] < TRADE_SIZE:
+                            continue
+                        reserves[i] -= TRADE_SIZE
+                        deposits[i] += TRADE_SIZE
+                        args = [curators[i], trade_size]
+                    elif action_type == 'WITHDRAW':
+                        if deposits[i] < TRADE_SIZE:
+                            continue
+                        reserves[i] += TRADE_SIZE
+                        deposits[i] -= TRADE_SIZE
+                        args = [curators[i], trade_size]
+                    else:
+                        args = [curators[i]]
+                    actions.append(Action(action_type=action_type, target='curationPool', args=args))
+            actions.append(Action(action_type='SLEEP', target='chain', args=[self.blocks_per_period]))
+        return actions
@@ -0,0 +1,233 @@
+"""
+Checkpoints of a simulation State, stored as a compressed NumPy npz bundle: one array of the addresses involved, and
+for every per-account table (token balances, deposits, the snapshots of both pools) an array of account ids and one
+array per field, alongside the scalar accumulators, the classes of the pools and tokens, and the states of the random
+number generators. Restoring rebuilds the same classes, so a checkpoint of the array engine restores to the array
+engine, and the numeric backend of the reserve token. Balances are stored as float64 under the FLOAT backend, and as
+the decimal strings of their integer units under FIXED18, so that they restore exactly. Token hooks are not part of a
+checkpoint.
+
+A run resumes from `simulate3(actions, checkpoint.state, ..., start=checkpoint.action_index)`, given the same actions;
+a Checkpointer passed to `simulate3` writes checkpoints as the run goes.
+"""
+from dataclasses import dataclass
+import importlib
+import json
+import os
+import random
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import PPSnapShot
+from curation_sim.pools.numeric import BACKENDS, FIXED18, FLOAT, NumericBackend, Wad
+from curation_sim.pools.secondary_pool import SPSnapShot
+from curation_sim.sim_utils import State
+
+POOL_SCALARS = ('issuanceRate', 'accRoyaltiesPerShare', 'lastMintedBlock', 'valuationMultiple', 'mintedLogIndex',
+                'logShareUnit')
+SECONDARY_POOL_SCALARS = ('accSharesPerDeposit', 'accShares', 'accRoyaltiesPerDeposit', 'totalDeposits')
+PP_SNAPSHOT_FIELDS = ('shares', 'accRoyaltiesPerShare')
+SP_SNAPSHOT_FIELDS = ('accSharesPerDeposit', 'accRoyaltiesPerDeposit', 'deposit')
+
+# random number generators whose state can be saved, besides the global ones of `random` and `numpy.random`.
+RNG_t = Any
+
+
+@dataclass
+class Checkpoint:
+    state: State
+    # the number of actions applied to the state.
+    action_index: int
+
+
+def _class_path(obj) -> str:
+    cls = type(obj)
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+def _load_class(path: str):
+    module, name = path.split(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def _rng_state(rng: RNG_t) -> str:
+    if isinstance(rng, np.random.Generator):
+        return json.dumps(rng.bit_generator.state, default=lambda a: a.tolist())
+    if rng is np.random or isinstance(rng, np.random.RandomState):
+        return json.dumps(rng.get_state(legacy=False), default=lambda a: a.tolist())
+    return json.dumps(rng.getstate())
+
+
+def _set_rng_state(rng: RNG_t, state: str):
+    state = json.loads(state)
+    if isinstance(rng, np.random.Generator):
+        rng.bit_generator.state = state
+    elif rng is np.random or isinstance(rng, np.random.RandomState):
+        state['state']['key'] = np.array(state['state']['key'], dtype=np.uint32)
+        rng.set_state(state)
+    else:
+        version, internal, gauss_next = state
+        rng.setstate((version, tuple(internal), gauss_next))
+
+
+def _global_rngs() -> Dict[str, RNG_t]:
+    # the modules expose the state of their global generators through module-level getstate/get_state.
+    return {'random': random, 'numpy.random': np.random}
+
+
+def _column(values, numeric: NumericBackend) -> np.ndarray:
+    if numeric is FIXED18:
+        return np.array([str(Wad.from_number(v).wei) for v in values], dtype=str)
+    return np.array(list(values), dtype=np.float64)
+
+
+def _from_column(column: np.ndarray, numeric: NumericBackend) -> list:
+    if numeric is FIXED18:
+        return [Wad(int(v)) for v in column.tolist()]
+    return column.tolist()
+
+
+class _Accounts:
+    """assigns every address an index into the address array of a checkpoint."""
+
+    def __init__(self, numeric: NumericBackend):
+        self.ids: Dict[str, int] = {}
+        self.numeric: NumericBackend = numeric
+
+    def table(self, arrays: Dict[str, np.ndarray], name: str, records: Dict[str, Any], fields=None):
+        ids = [self.ids.setdefault(a, len(self.ids)) for a in records]
+        arrays[f'{name}/ids'] = np.array(ids, dtype=np.int64)
+        if fields is None:
+            arrays[f'{name}/value'] = _column(records.values(), self.numeric)
+        else:
+            for f in fields:
+                arrays[f'{name}/{f}'] = _column((getattr(r, f) for r in records.values()), self.numeric)
+
+
+def save_checkpoint(path: str,
+                    state: State,
+                    action_index: int = 0,
+                    rngs: Optional[Dict[str, RNG_t]] = None):
+    """
+    :param path: the file to write, conventionally ending in .npz. The file is replaced atomically.
+    :param state: the state to save.
+    :param action_index: the number of actions applied to the state.
+    :param rngs: further random number generators to save, eg. the random.Random driving a scenario, by name. The
+           global generators of `random` and `numpy.random` are always saved.
+    """
+    pool = state.curationPool
+    secondary_pool = pool.secondaryPool
+    numeric = state.reserveToken.numeric
+    accounts = _Accounts(numeric)
+
+    arrays: Dict[str, np.ndarray] = {'action_index': np.array(action_index), 'chain.blockHeight':
+                                     np.array(state.chain.blockHeight), 'numeric': np.array(numeric.name)}
+    accounts.table(arrays, 'reserveToken.balances', dict(state.reserveToken.balances))
+    accounts.table(arrays, 'shareToken.balances', dict(pool.shareToken.balances))
+    accounts.table(arrays, 'curationPool.deposits', dict(pool.deposits))
+    accounts.table(arrays, 'curationPool.snapshots', dict(pool.snapshots), PP_SNAPSHOT_FIELDS)
+    accounts.table(arrays, 'secondaryPool.snapshots', dict(secondary_pool.snapshots), SP_SNAPSHOT_FIELDS)
+    arrays['accounts'] = np.array(list(accounts.ids), dtype=str)
+
+    # scalars keep their type, so that eg. block heights remain integers; Wads are saved as their units, and listed.
+    scalars = {f'curationPool.{name}': getattr(pool, name) for name in POOL_SCALARS}
+    scalars.update({f'secondaryPool.{name}': getattr(secondary_pool, name) for name in SECONDARY_POOL_SCALARS})
+    scalars['reserveToken.totalSupply'] = state.reserveToken.totalSupply
+    scalars['shareToken.totalSupply'] = pool.shareToken.totalSupply
+    wads = [name for name, value in scalars.items() if isinstance(value, Wad)]
+    for name, value in scalars.items():
+        arrays[name] = np.array(str(value.wei) if isinstance(value, Wad) else value)
+    arrays['wads'] = np.array(wads, dtype=str)
+
+    # NaN stands for a pool that does not rebase.
+    arrays['curationPool.rebaseAbove'] = np.array(np.nan if pool.rebaseAbove is None else pool.rebaseAbove)
+    arrays['curationPool.address'] = np.array(pool.address)
+    arrays['secondaryPool.address'] = np.array(secondary_pool.address)
+    for name, obj in (('curationPool', pool), ('secondaryPool', secondary_pool),
+                      ('reserveToken', state.reserveToken), ('shareToken', pool.shareToken)):
+        arrays[f'class/{name}'] = np.array(_class_path(obj))
+
+    for name, rng in {**_global_rngs(), **(rngs or {})}.items():
+        arrays[f'rng/{name}'] = np.array(_rng_state(rng))
+
+    # np.savez adds the .npz suffix to names without it, so write through a file object.
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str, rngs: Optional[Dict[str, RNG_t]] = None) -> Checkpoint:
+    """
+    Restores a state, and the global random number generators, from a checkpoint.
+
+    :param rngs: generators saved under these names are set, in place, to their saved state.
+    """
+    with np.load(path) as data:
+        accounts = data['accounts'].tolist()
+        # checkpoints written before numeric backends are of floats.
+        numeric = BACKENDS[str(data['numeric'])] if 'numeric' in data.files else FLOAT
+        wads = set(data['wads'].tolist()) if 'wads' in data.files else set()
+
+        def table(name: str, fields=None):
+            addresses = [accounts[i] for i in data[f'{name}/ids'].tolist()]
+            if fields is None:
+                return dict(zip(addresses, _from_column(data[f'{name}/value'], numeric)))
+            columns = [_from_column(data[f'{name}/{f}'], numeric) for f in fields]
+            return {a: dict(zip(fields, values)) for a, values in zip(addresses, zip(*columns))}
+
+        def scalar(name: str):
+            return Wad(int(str(data[name]))) if name in wads else data[name].item()
+
+        token_cls = _load_class(str(data['class/reserveToken']))
+        reserve_token = token_cls({}, numeric=numeric)
+        reserve_token.balances = table('reserveToken.balances')
+        reserve_token.totalSupply = scalar('reserveToken.totalSupply')
+
+        chain = Chain(scalar('chain.blockHeight'))
+        pool = _load_class(str(data['class/curationPool']))(
+            address=str(data['curationPool.address']),
+            initialShareBalances={},
+            initialDeposits=[],
+            chain=chain,
+            reserveToken=token_cls({}, numeric=numeric),
+            share_token_cls=_load_class(str(data['class/shareToken'])),
+            secondary_pool_cls=_load_class(str(data['class/secondaryPool'])),
+            secondaryPoolAddress=str(data['secondaryPool.address']))
+        pool.reserveToken = reserve_token
+        pool.secondaryPool.reserveToken = reserve_token
+
+        pool.shareToken.balances = table('shareToken.balances')
+        pool.shareToken.totalSupply = scalar('shareToken.totalSupply')
+        pool.deposits = table('curationPool.deposits')
+        pool.snapshots = {a: PPSnapShot(**r) for a, r in table('curationPool.snapshots', PP_SNAPSHOT_FIELDS).items()}
+        pool.secondaryPool.snapshots = {a: SPSnapShot(**r)
+                                        for a, r in table('secondaryPool.snapshots', SP_SNAPSHOT_FIELDS).items()}
+        for name in POOL_SCALARS:
+            setattr(pool, name, scalar(f'curationPool.{name}'))
+        rebaseAbove = scalar('curationPool.rebaseAbove')
+        pool.rebaseAbove = None if np.isnan(rebaseAbove) else rebaseAbove
+        for name in SECONDARY_POOL_SCALARS:
+            setattr(pool.secondaryPool, name, scalar(f'secondaryPool.{name}'))
+
+        for name, rng in {**_global_rngs(), **(rngs or {})}.items():
+            key = f'rng/{name}'
+            if key in data.files:
+                _set_rng_state(rng, str(data[key]))
+
+        return Checkpoint(state=State(chain, reserve_token, pool), action_index=int(data['action_index']))
+
+
+class Checkpointer:
+    """Writes a checkpoint every `every` actions of a `simulate3` run, overwriting the previous one."""
+
+    def __init__(self, path: str, every: int, rngs: Optional[Dict[str, RNG_t]] = None):
+        self.path: str = path
+        self.every: int = every
+        self.rngs: Optional[Dict[str, RNG_t]] = rngs
+
+    def commit(self, state: State, index: int):
+        if index % self.every == 0:
+            save_checkpoint(self.path, state, index, self.rngs)
@@ -0,0 +1,190 @@
+"""
+Monte Carlo ensembles of a stochastic scenario. Replicas are reduced as they finish: the mean and variance of every
+metric at every period are updated with Welford's algorithm, and quantiles are tracked with the P-square algorithm of
+Jain and Chlamtac, so memory is O(periods) per metric whatever the number of replicas.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class StreamingMoments:
+    """running count, mean and variance of equally-shaped arrays."""
+
+    def __init__(self, shape: Tuple[int, ...]):
+        self.count: int = 0
+        self.mean: np.ndarray = np.zeros(shape)
+        self._m2: np.ndarray = np.zeros(shape)
+
+    def update(self, x: np.ndarray):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """the unbiased sample variance; zero until two samples have been seen."""
+        if self.count < 2:
+            return np.zeros_like(self._m2)
+        return self._m2 / (self.count - 1)
+
+
+class StreamingQuantile:
+    """
+    The P-square estimate of one quantile, tracked independently for every element of equally-shaped arrays. Five
+    markers per element are kept; until five samples have been seen the quantile is computed exactly.
+    """
+
+    def __init__(self, p: float, shape: Tuple[int, ...]):
+        self.p: float = p
+        self.count: int = 0
+        self.heights: np.ndarray = np.zeros((5,) + shape)
+        self.positions: np.ndarray = np.tile(np.arange(1., 6.).reshape((5,) + (1,) * len(shape)), (1,) + shape)
+        self.desired: np.ndarray = np.tile(np.array([1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]).reshape(
+            (5,) + (1,) * len(shape)), (1,) + shape)
+        self.increments: np.ndarray = np.array([0, p / 2, p, (1 + p) / 2, 1]).reshape((5,) + (1,) * len(shape))
+
+    def update(self, x: np.ndarray):
+        if self.count < 5:
+            self.heights[self.count] = x
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort(axis=0)
+            return
+        self.count += 1
+        q, n = self.heights, self.positions
+
+        # find the cell of each sample, extending the extreme markers if necessary.
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        cell = np.clip((x >= q[1:4]).sum(axis=0), 0, 3)
+        n += np.arange(5).reshape((5,) + (1,) * (n.ndim - 1)) > cell
+        self.desired += self.increments
+
+        # adjust the three middle markers.
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            d = np.sign(d)
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            neighbour = np.where(d > 0, q[i + 1], q[i - 1])
+            neighbour_position = np.where(d > 0, n[i + 1], n[i - 1])
+            linear = q[i] + d * (neighbour - q[i]) / (neighbour_position - n[i])
+            bracketed = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(bracketed, parabolic, linear), q[i])
+            n[i] = np.where(move, n[i] + d, n[i])
+
+    @property
+    def value(self) -> np.ndarray:
+        if self.count == 0:
+            return np.full(self.heights.shape[1:], np.nan)
+        if self.count <= 5:
+            return np.quantile(self.heights[:self.count], self.p, axis=0)
+        return self.heights[2].copy()
+
+
+@dataclass
+class EnsembleResult:
+    """
+    Per-period statistics of every metric over the replicas of an ensemble.
+
+    :param count: the number of replicas.
+    :param mean: the mean of each metric, one value per period.
+    :param variance: the unbiased variance of each metric, one value per period.
+    :param quantile_levels: the quantiles tracked.
+    :param quantiles: the estimated quantiles of each metric, with shape (len(quantile_levels), periods).
+    """
+    count: int
+    mean: Dict[str, np.ndarray]
+    variance: Dict[str, np.ndarray]
+    quantile_levels: np.ndarray
+    quantiles: Dict[str, np.ndarray]
+
+    def std(self, metric: str) -> np.ndarray:
+        return np.sqrt(self.variance[metric])
+
+    def quantile(self, metric: str, level: float) -> np.ndarray:
+        """the quantile curve of a metric at one of the tracked levels."""
+        i = int(np.argmin(np.abs(self.quantile_levels - level)))
+        if not np.isclose(self.quantile_levels[i], level, rtol=0, atol=1e-9):
+            raise ValueError(f'EnsembleResult_quantile: level {level} was not tracked; tracked: '
+                             f'{", ".join(map(str, self.quantile_levels.tolist()))}')
+        return self.quantiles[metric][i]
+
+    def band(self, metric: str, lower: float, upper: float) -> Tuple[np.ndarray, np.ndarray]:
+        """the lower and upper quantile curves of a metric, eg. for `plt.fill_between`."""
+        return self.quantile(metric, lower), self.quantile(metric, upper)
+
+    def save(self, path: str):
+        """writes the result as an npz bundle, with keys such as `mean/share_fraction`."""
+        arrays = {'count': np.array(self.count), 'quantile_levels': self.quantile_levels}
+        for name, group in (('mean', self.mean), ('variance', self.variance), ('quantiles', self.quantiles)):
+            arrays.update({f'{name}/{k}': v for k, v in group.items()})
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'EnsembleResult':
+        with np.load(path) as data:
+            groups = {'mean': {}, 'variance': {}, 'quantiles': {}}
+            for key in data.files:
+                if '/' in key:
+                    group, name = key.split('/', 1)
+                    groups[group][name] = data[key]
+            return cls(count=int(data['count']), quantile_levels=data['quantile_levels'], **groups)
+
+
+class EnsembleReducer:
+    """reduces replica trajectories, given as dictionaries of metric name to per-period array, one at a time."""
+
+    def __init__(self, quantiles: Sequence[float] = (.05, .5, .95)):
+        self.quantile_levels: np.ndarray = np.asarray(quantiles, dtype=np.float64)
+        self._moments: Dict[str, StreamingMoments] = {}
+        self._quantiles: Dict[str, Tuple[StreamingQuantile, ...]] = {}
+
+    def update(self, trajectories: Dict[str, np.ndarray]):
+        for name, values in trajectories.items():
+            values = np.asarray(values, dtype=np.float64)
+            if name not in self._moments:
+                self._moments[name] = StreamingMoments(values.shape)
+                self._quantiles[name] = tuple(StreamingQuantile(p, values.shape) for p in self.quantile_levels)
+            self._moments[name].update(values)
+            for q in self._quantiles[name]:
+                q.update(values)
+
+    def result(self) -> EnsembleResult:
+        counts = {m.count for m in self._moments.values()}
+        return EnsembleResult(count=counts.pop() if counts else 0,
+                              mean={k: m.mean.copy() for k, m in self._moments.items()},
+                              variance={k: m.variance for k, m in self._moments.items()},
+                              quantile_levels=self.quantile_levels,
+                              quantiles={k: np.stack([q.value for q in qs]) for k, qs in self._quantiles.items()})
+
+
+def run_ensemble(replica: Callable[[int], Dict[str, np.ndarray]],
+                 seeds: Iterable[int],
+                 quantiles: Sequence[float] = (.05, .5, .95),
+                 processes: Optional[int] = 1) -> EnsembleResult:
+    """
+    :param replica: a picklable, module-level function running one seeded replica and returning its trajectories,
+           such as `ohq_sim_vol.run_replica`.
+    :param seeds: one seed per replica, eg. from `sweep.spawn_seeds`.
+    :param quantiles: the quantiles to estimate at every period.
+    :param processes: the number of worker processes; 1 runs in this process and None uses one per core. Replicas
+           are reduced in seed order as they complete, so the result does not depend on scheduling.
+    """
+    reducer = EnsembleReducer(quantiles)
+    if processes == 1:
+        for seed in seeds:
+            reducer.update(replica(seed))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for trajectories in executor.map(replica, seeds):
+                reducer.update(trajectories)
+    return reducer.result()
@@ -0,0 +1,212 @@
+"""
+An append-only log of state changes, as a compact alternative to recording a full copy of the state after every action.
+
+Every entry records that, after a given action, one field of one account (or one scalar accumulator) changed to some
+value. Entries hold the new values rather than differences, in the dtype of the numeric backend of the reserve token
+(object arrays of Wads under FIXED18), so that rebuilt states equal those of the run exactly rather than accumulating
+rounding errors. Accounts touched by an action are discovered through the post-transfer/mint/burn hooks of the
+reserve and share tokens: every pool operation that changes a deposit or a snapshot also moves tokens to or from that
+account, so only those accounts are inspected after the action. A pool that rebases its share unit rescales the
+shares of every account without moving any tokens, so after an action that changes the share unit every account is
+inspected. Periodic keyframes hold a full copy of the tracked state, so any intermediate state can be rebuilt by
+applying at most `keyframe_interval` actions' worth of entries to a keyframe.
+"""
+import copy
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from curation_sim.pools.accounts import AccountIndex
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t, Context
+
+# account id used for entries that belong to a scalar accumulator rather than to an account.
+SCALAR = -1
+
+# per-account fields: name -> (mapping getter, record attribute or None for plain values)
+ACCOUNT_FIELDS: Dict[str, Tuple[Callable, Optional[str]]] = {
+    'reserveToken.balance': (lambda s: s.reserveToken.balances, None),
+    'shareToken.balance': (lambda s: s.curationPool.shareToken.balances, None),
+    'curationPool.deposit': (lambda s: s.curationPool.deposits, None),
+    'curationPool.shares': (lambda s: s.curationPool.snapshots, 'shares'),
+    'curationPool.accRoyaltiesPerShare': (lambda s: s.curationPool.snapshots, 'accRoyaltiesPerShare'),
+    'secondaryPool.accSharesPerDeposit': (lambda s: s.curationPool.secondaryPool.snapshots, 'accSharesPerDeposit'),
+    'secondaryPool.accRoyaltiesPerDeposit': (lambda s: s.curationPool.secondaryPool.snapshots,
+                                             'accRoyaltiesPerDeposit'),
+    'secondaryPool.deposit': (lambda s: s.curationPool.secondaryPool.snapshots, 'deposit'),
+}
+
+SCALAR_FIELDS: Dict[str, Callable] = {
+    'chain.blockHeight': lambda s: s.chain.blockHeight,
+    'reserveToken.totalSupply': lambda s: s.reserveToken.totalSupply,
+    'shareToken.totalSupply': lambda s: s.curationPool.shareToken.totalSupply,
+    'curationPool.accRoyaltiesPerShare': lambda s: s.curationPool.accRoyaltiesPerShare,
+    'curationPool.lastMintedBlock': lambda s: s.curationPool.lastMintedBlock,
+    'curationPool.mintedLogIndex': lambda s: s.curationPool.mintedLogIndex,
+    'curationPool.logShareUnit': lambda s: s.curationPool.logShareUnit,
+    'secondaryPool.accSharesPerDeposit': lambda s: s.curationPool.secondaryPool.accSharesPerDeposit,
+    'secondaryPool.accRoyaltiesPerDeposit': lambda s: s.curationPool.secondaryPool.accRoyaltiesPerDeposit,
+    'secondaryPool.totalDeposits': lambda s: s.curationPool.secondaryPool.totalDeposits,
+}
+
+
+@dataclass
+class LoggedState:
+    """The tracked state after a given action, rebuilt from the event log."""
+    action_index: int
+    scalars: Dict[str, NUMERIC_t]
+    fields: Dict[str, Dict[ADDRESS_t, NUMERIC_t]]
+
+
+class EventLog:
+    """
+    :param keyframe_interval: the number of actions between full copies of the tracked state.
+    :param capacity: the initial number of entries reserved.
+    """
+
+    def __init__(self, keyframe_interval: int = 1_000, capacity: int = 1_024):
+        self.keyframe_interval: int = keyframe_interval
+        self.accounts: AccountIndex = AccountIndex()
+        self.field_names: List[str] = list(ACCOUNT_FIELDS) + list(SCALAR_FIELDS)
+        self._field_ids: Dict[str, int] = {f: i for i, f in enumerate(self.field_names)}
+
+        self.size: int = 0
+        self.action: np.ndarray = np.zeros(capacity, dtype=np.int64)
+        self.field: np.ndarray = np.zeros(capacity, dtype=np.int16)
+        self.account: np.ndarray = np.zeros(capacity, dtype=np.int32)
+        # the value of the field after the action, in the dtype of the numeric backend of the state (see `attach`).
+        self.value: np.ndarray = np.zeros(capacity, dtype=np.float64)
+
+        # the block height after each action, for lookups by block height.
+        self.block_heights: List[int] = []
+        self.keyframes: Dict[int, LoggedState] = {}
+
+        self._current: Optional[LoggedState] = None
+        self._touched: Set[ADDRESS_t] = set()
+        self._tokens = []
+
+    # Hooks registered on the tokens; they only note which accounts an action touches.
+    def _onTransfer(self, context: Context):
+        self._touched.add(context.fromAccount)
+        self._touched.add(context.toAccount)
+
+    def _onMint(self, context: Context):
+        self._touched.add(context.toAccount)
+
+    def _onBurn(self, context: Context):
+        self._touched.add(context.fromAccount)
+
+    def attach(self, state):
+        """starts logging a state: registers the token hooks and takes the initial keyframe."""
+        for token in (state.reserveToken, state.curationPool.shareToken):
+            token.registerHooks(postTransfer=[self._onTransfer], postMint=[self._onMint], postBurn=[self._onBurn])
+            self._tokens.append(token)
+        dtype = state.reserveToken.numeric.dtype
+        if self.value.dtype != dtype:
+            value = np.zeros(len(self.value), dtype=dtype)
+            value[:self.size] = self.value[:self.size]
+            self.value = value
+
+        fields = {}
+        for name, (getter, attr) in ACCOUNT_FIELDS.items():
+            mapping = getter(state)
+            fields[name] = {k: (v if attr is None else getattr(v, attr)) for k, v in mapping.items()}
+        self._current = LoggedState(action_index=0,
+                                    scalars={name: getter(state) for name, getter in SCALAR_FIELDS.items()},
+                                    fields=fields)
+        self.block_heights.append(state.chain.blockHeight)
+        self.keyframes[0] = copy.deepcopy(self._current)
+
+    def detach(self):
+        for token in self._tokens:
+            token.unregisterHooks(postTransfer=[self._onTransfer], postMint=[self._onMint], postBurn=[self._onBurn])
+        self._tokens = []
+
+    def _append(self, index: int, field: int, account: int, value: NUMERIC_t):
+        if self.size == len(self.action):
+            capacity = 2 * len(self.action)
+            for name in ('action', 'field', 'account', 'value'):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column
+                setattr(self, name, grown)
+        self.action[self.size] = index
+        self.field[self.size] = field
+        self.account[self.size] = account
+        self.value[self.size] = value
+        self.size += 1
+
+    def commit(self, state, index: int):
+        """logs the changes made by action `index` (the initial state being action 0)."""
+        current = self._current
+        if state.curationPool.logShareUnit != current.scalars['curationPool.logShareUnit']:
+            for getter, _ in ACCOUNT_FIELDS.values():
+                self._touched.update(getter(state))
+        for name, getter in SCALAR_FIELDS.items():
+            value = getter(state)
+            prev = current.scalars[name]
+            if value != prev:
+                self._append(index, self._field_ids[name], SCALAR, value)
+                current.scalars[name] = value
+
+        if self._touched:
+            touched = sorted(self._touched)
+            self._touched.clear()
+            for name, (getter, attr) in ACCOUNT_FIELDS.items():
+                mapping = getter(state)
+                known = current.fields[name]
+                field = self._field_ids[name]
+                for account in touched:
+                    value = mapping.get(account)
+                    if value is None:
+                        continue
+                    if attr is not None:
+                        value = getattr(value, attr)
+                    prev = known.get(account)
+                    if prev is None or value != prev:
+                        self._append(index, field, self.accounts.idOf(account), value)
+                        known[account] = value
+
+        current.action_index = index
+        self.block_heights.append(state.chain.blockHeight)
+        if index % self.keyframe_interval == 0:
+            self.keyframes[index] = copy.deepcopy(current)
+
+    @property
+    def num_actions(self) -> int:
+        return len(self.block_heights) - 1
+
+    def entries(self, action_index: int) -> List[Tuple[str, Optional[ADDRESS_t], NUMERIC_t]]:
+        """the (field, account, value) entries logged for one action; scalar entries have no account."""
+        lo, hi = np.searchsorted(self.action[:self.size], [action_index, action_index + 1])
+        return [(self.field_names[self.field[i]],
+                 None if self.account[i] == SCALAR else self.accounts.addresses[self.account[i]],
+                 value) for i, value in zip(range(lo, hi), self.value[lo:hi].tolist())]
+
+    def reconstruct(self, action_index: int) -> LoggedState:
+        """rebuilds the tracked state as it was after action `action_index`."""
+        if not 0 <= action_index <= self.num_actions:
+            raise IndexError(f'EventLog_reconstruct: no action {action_index} in a log of {self.num_actions} actions')
+        start = max(k for k in self.keyframes if k <= action_index)
+        ret = copy.deepcopy(self.keyframes[start])
+        actions = self.action[:self.size]
+        lo, hi = np.searchsorted(actions, [start + 1, action_index + 1])
+        for i, value in zip(range(lo, hi), self.value[lo:hi].tolist()):
+            name = self.field_names[self.field[i]]
+            if self.account[i] == SCALAR:
+                ret.scalars[name] = value
+            else:
+                ret.fields[name][self.accounts.addresses[self.account[i]]] = value
+        ret.action_index = action_index
+        return ret
+
+    def reconstruct_at_block(self, blockHeight: int) -> LoggedState:
+        """rebuilds the tracked state after the last action at or before `blockHeight`."""
+        index = int(np.searchsorted(self.block_heights, blockHeight, side='right')) - 1
+        if index < 0:
+            raise IndexError(f'EventLog_reconstruct_at_block: the log starts after block {blockHeight}')
+        return self.reconstruct(index)
+
+    def nbytes(self) -> int:
+        """the size of the entry columns, excluding keyframes."""
+        return sum(getattr(self, name)[:self.size].nbytes for name in ('action', 'field', 'account', 'value'))
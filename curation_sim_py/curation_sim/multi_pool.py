@@ -0,0 +1,134 @@
+"""
+Many curation pools, one per subgraph, sharing one chain and one reserve token. Issuance is lazy in every pool, so a
+sleep touches no pool at all, and a curator's claim touches only the pools they have signalled on, which the PoolSet
+keeps indexed. Actions address the pool set as the `pool` target (eg. moving signal between pools) and a single pool
+as `pool[i]` (eg. purchases of its shares); deposits and withdrawals keep the index current either way:
+
+    Action(action_type='MOVE_SIGNAL', target='pool', args=['curator0', 3, 17, 500])
+    Action(action_type='BUY_SHARES', target='pool[17]', args=['market', 100])
+    Action(action_type='DEPOSIT', target='pool[17]', args=['curator0', 500])
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Set, Tuple, Type
+
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+
+
+class IndexedPool:
+    """
+    A pool of a PoolSet, as `pool_set[i]` gives it: deposits and withdrawals go through the set, which reindexes the
+    curator, and everything else is the pool's own.
+    """
+
+    def __init__(self, poolSet: 'PoolSet', i: int):
+        self.poolSet: PoolSet = poolSet
+        self.index: int = i
+
+    def deposit(self, curator: ADDRESS_t, amount: NUMERIC_t):
+        self.poolSet.deposit(self.index, curator, amount)
+
+    def withdraw(self, curator: ADDRESS_t, amount: NUMERIC_t):
+        self.poolSet.withdraw(self.index, curator, amount)
+
+    def __getattr__(self, name):
+        return getattr(self.poolSet.pools[self.index], name)
+
+
+class PoolSet:
+
+    def __init__(self, pools: Sequence[CurationPool]):
+        self.pools: List[CurationPool] = list(pools)
+        self._indexed: List[IndexedPool] = [IndexedPool(self, i) for i in range(len(self.pools))]
+        # the pools each curator has a deposit in.
+        self.curatorPools: Dict[ADDRESS_t, Set[int]] = {}
+        for i, pool in enumerate(self.pools):
+            for curator, deposit in pool.deposits.items():
+                if deposit > 0:
+                    self.curatorPools.setdefault(curator, set()).add(i)
+
+    def __getitem__(self, i: int) -> IndexedPool:
+        return self._indexed[i]
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def __iter__(self) -> Iterator[CurationPool]:
+        return iter(self.pools)
+
+    def poolsOf(self, curator: ADDRESS_t) -> List[int]:
+        """the pools a curator has a deposit in, in order."""
+        return sorted(self.curatorPools.get(curator, ()))
+
+    def _reindex(self, curator: ADDRESS_t, i: int):
+        if self.pools[i].depositOf(curator) > 0:
+            self.curatorPools.setdefault(curator, set()).add(i)
+        elif curator in self.curatorPools:
+            self.curatorPools[curator].discard(i)
+            if not self.curatorPools[curator]:
+                del self.curatorPools[curator]
+
+    def deposit(self, i: int, curator: ADDRESS_t, amount: NUMERIC_t):
+        self.pools[i].deposit(curator, amount)
+        self._reindex(curator, i)
+
+    def withdraw(self, i: int, curator: ADDRESS_t, amount: NUMERIC_t):
+        self.pools[i].withdraw(curator, amount)
+        self._reindex(curator, i)
+
+    def claim(self, curator: ADDRESS_t):
+        """claims shares and royalties in every pool the curator has a deposit in, and no other."""
+        for i in self.poolsOf(curator):
+            self.pools[i].claim(curator)
+
+    def moveSignal(self, curator: ADDRESS_t, fromPool: int, toPool: int, amount: NUMERIC_t):
+        """withdraws an amount from one pool and deposits it in another."""
+        self.withdraw(fromPool, curator, amount)
+        self.deposit(toPool, curator, amount)
+
+
+@dataclass
+class MultiPoolState:
+    chain: Chain
+    reserveToken: Token
+    pool: PoolSet
+
+    def fork(self) -> 'MultiPoolState':
+        chain = self.chain.fork()
+        reserveToken = self.reserveToken.fork()
+        pool = PoolSet([p.fork(chain, reserveToken) for p in self.pool])
+        return MultiPoolState(chain, reserveToken, pool)
+
+
+def pool_address(i: int) -> ADDRESS_t:
+    return f'pool{i}'
+
+
+def build_multi_pool_state(pool_deposits: Sequence[Sequence[Tuple[ADDRESS_t, NUMERIC_t]]],
+                           reserveBalances: Dict[ADDRESS_t, NUMERIC_t],
+                           issuanceRate: float = 0,
+                           pool_cls: Type[CurationPool] = CurationPool,
+                           token_cls: Type[Token] = Token) -> MultiPoolState:
+    """
+    :param pool_deposits: the initial deposits of each pool; each curator starts with shares equal to their deposit.
+    :param reserveBalances: the reserve token held by each participant outside the pools. The pools, at addresses
+           `pool0`, `pool1`..., are funded with their deposits.
+    :param issuanceRate: the issuance rate of every pool.
+    """
+    balances = dict(reserveBalances)
+    for i, deposits in enumerate(pool_deposits):
+        balances[pool_address(i)] = sum(d for _, d in deposits)
+    reserveToken = token_cls(balances)
+    chain = Chain()
+    pools = [pool_cls(address=pool_address(i),
+                      initialShareBalances={c: d for c, d in deposits},
+                      initialDeposits=list(deposits),
+                      chain=chain,
+                      reserveToken=reserveToken,
+                      share_token_cls=token_cls,
+                      issuanceRate=issuanceRate,
+                      secondaryPoolAddress=f'{pool_address(i)}.secondaryPool')
+             for i, deposits in enumerate(pool_deposits)]
+    return MultiPoolState(chain, reserveToken, PoolSet(pools))
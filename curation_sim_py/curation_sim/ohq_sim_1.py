@@ -38,7 +38,8 @@ scenario_1_config = Config(
         Action(action_type="SLEEP", target='chain', args=[10000]),
         Action(action_type="CLAIM", target='curationPool', args=['curator2']),
         Action(action_type="CLAIM", target='curationPool', args=['curator1']),
-        Action(action_type="SLEEP", target='chain', args=[100000]),  # Note: setting sleep too high runs into precision issues
+        # Note: setting sleep too high runs into float precision issues (see pools.numeric.FIXED18)
+        Action(action_type="SLEEP", target='chain', args=[100000]),
         Action(action_type="CLAIM", target='curationPool', args=['curator2']),
         Action(action_type="CLAIM", target='curationPool', args=['curator1'])
     ],
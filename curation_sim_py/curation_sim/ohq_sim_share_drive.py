@@ -7,19 +7,20 @@ market, nor the behavioral psychology of the curators, we use their share fracti
 We control their share fraction through a 'ghost' curator, whose share purchases drive down the curators' share
 fraction.
 """
-import copy
 from dataclasses import dataclass
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Dict, Iterable, Iterator, Optional, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
-import scipy.optimize as sopt
 
+from curation_sim.analysis import fit_least_squares, fit_linear
 from curation_sim.pools.chain import Chain
 from curation_sim.pools.curation_pool import CurationPool
 from curation_sim.pools.secondary_pool import SecondaryPool
 from curation_sim.pools.token import Token
-from curation_sim.sim_utils import Config, State, Action, simulate3, get_stakers
+from curation_sim.recorder import ColumnarLog, ColumnarRecorder, Metric, RecorderSpec, deposit_balances, share_balances
+from curation_sim.scenarios import Scenario
+from curation_sim.sim_utils import Config, State, Action, simulate3, get_stakers, record_effective_state
+from curation_sim.streams import PeriodActions, periodic
 
 # A population of curators with intentions to remain staked.
 NUM_STAKERS = 30
@@ -38,62 +39,75 @@ class PoolConfig:
     reserve_std: int
 
 
-def advance_actions(actions: List[Action],
-                    time: int,
-                    num_curators: int,
-                    specific_curators: Optional[Tuple[str]] = None):
+def drive_actions(share_drive: Dict[int, int]) -> PeriodActions:
     """
-        Advance the state machine during a time when no explicit changes are made. These actions
-        should represent passive time evolution.
-        """
-    for i in range(num_curators):
-        a = Action(action_type='CLAIM', target='curationPool', args=[f'curator{i}'])
-        actions.append(a)
-    for c in specific_curators:
-        actions.append(Action(action_type='CLAIM', target='curationPool', args=[c]))
-    actions.append(Action(action_type='SLEEP', target='chain', args=[time]))
-
-
-def get_actions(share_drive: Dict[int, int], max_time: int) -> List[Action]:
-    # The actions called on the state machine during its evolution.
-    sim_actions = []
-
-    # prime the system.
-    for t in range(max_time * WAIT_PERIODS):
+    The market buys the shares of the drive in its periods. Curators do not need to claim, since the state is
+    recorded with effective share balances.
+
+    BUY_SHARES mints the purchased shares without first minting issued shares, so the purchase compounds from the
+    last mint. Issuance is settled (MINT_SHARES) at the end of the period before a purchase, which keeps the last
+    mint one period before the purchase, as it was when every curator claimed each period.
+    """
+    def actions(t: int) -> Iterator[Action]:
         if t in share_drive:
-            sim_actions.append(Action(action_type='BUY_SHARES', target='curationPool', args=['market', share_drive[t]]))
-        advance_actions(sim_actions, BLOCKS_PER_PERIOD, NUM_STAKERS, SPECIFIC_CURATORS)
+            yield Action(action_type='BUY_SHARES', target='curationPool', args=['market', share_drive[t]])
+        if (t + 1) in share_drive:
+            yield Action(action_type='MINT_SHARES', target='curationPool', args=[])
+    return actions
+
+
+def record_state(state: State) -> Dict:
+    ret = record_effective_state(state)
+    shares = ret['shareBalances']
+    ret['totalShares'] = sum(shares[c] for c in SPECIFIC_CURATORS) + sum(shares[f'curator{i}'] for i in range(NUM_STAKERS))
+    return ret
 
-    return sim_actions
 
+def get_actions(share_drive: Dict[int, int], max_time: int) -> Iterator[Action]:
+    """the actions called on the state machine during its evolution, generated lazily."""
+    return periodic(drive_actions(share_drive), BLOCKS_PER_PERIOD, max_time * WAIT_PERIODS)
 
-def get_sim_config(pool_config: PoolConfig, actions: List[Action], chain: Chain) -> Config:
+
+def get_sim_config(pool_config: PoolConfig,
+                   actions: Iterable[Action],
+                   chain: Chain,
+                   rng: Optional[np.random.Generator] = None) -> Config:
+    """
+    :param rng: the source of the randomly drawn deposits and balances of the curators; None draws them from the
+           global generator of numpy.random, which sweeps seed.
+    """
     # initial conditions
-    deposits_share_balances = [('market', 0)] + get_stakers(num_stakers=NUM_STAKERS, mean=10_000, std=pool_config.deposit_std)
+    deposits_share_balances = [('market', 0)] + get_stakers(num_stakers=NUM_STAKERS, mean=10_000, std=pool_config.deposit_std,
+                                                            rng=rng)
     config = Config(
         initialReserveTokenBalances=[
                                         ('curationPool', sum(i[1] for i in deposits_share_balances)), ('market', 100_000)
-                                    ] + get_stakers(num_stakers=NUM_STAKERS, mean=1_000, std=pool_config.reserve_std),
+                                    ] + get_stakers(num_stakers=NUM_STAKERS, mean=1_000, std=pool_config.reserve_std,
+                                                    rng=rng),
         initialShareBalances=deposits_share_balances,
         initialDeposits=deposits_share_balances,
         actions=actions,
-        recordState=lambda state: {
-            'time': copy.deepcopy(state.chain.blockHeight),
-            'shareBalances': copy.deepcopy(state.curationPool.shareToken.balances),
-            'depositBalances': copy.deepcopy(state.curationPool.deposits),
-            'totalShares': state.curationPool.shareToken.balanceOf('market') + sum(state.curationPool.shareToken.balanceOf(f'curator{i}') for i in range(NUM_STAKERS)),
-            'primaryPoolTotalDeposits': copy.deepcopy(state.curationPool.reserveToken.balanceOf(state.curationPool.address)),
-            'secondaryPoolTotalDeposits': copy.deepcopy(state.curationPool.secondaryPool.totalDeposits),
-            'reserveBalances': copy.deepcopy(state.reserveToken.balances),
-        }
+        recordState=record_state
     )
     return config
 
 
-def run_simulation(pool_config: PoolConfig, share_drive: Dict[int, int], max_time: int) -> List[Dict]:
-    assert max_time * WAIT_PERIODS > max(share_drive)
-    chain = Chain()
-    sim_config = get_sim_config(pool_config, get_actions(share_drive, max_time), chain)
+CURATORS: Tuple[str, ...] = tuple(f'curator{i}' for i in range(NUM_STAKERS))
+
+# The columns needed by ProcessedSim, sampled after every SLEEP.
+RECORDER_SPEC = RecorderSpec(
+    metrics=[
+        Metric('market_deposits', lambda s: s.curationPool.depositOf('market')),
+        deposit_balances('curator_deposits', CURATORS),
+        Metric('market_shares', lambda s: s.curationPool.effectiveShareBalanceOf('market')),
+        share_balances('curator_shares', CURATORS),
+        Metric('spool_total', lambda s: s.curationPool.secondaryPool.totalDeposits),
+    ],
+    action_types=('SLEEP',),
+    initial=False)
+
+
+def get_state(sim_config: Config, chain: Chain, pool_config: PoolConfig) -> State:
     reserveToken = Token({k: v for k, v in sim_config.initialReserveTokenBalances})
 
     curationPool = CurationPool(
@@ -105,13 +119,24 @@ def run_simulation(pool_config: PoolConfig, share_drive: Dict[int, int], max_tim
         initialDeposits=sim_config.initialDeposits,
         issuanceRate=pool_config.issuance_rate)
 
-    state = State(chain,
-                  reserveToken,
-                  curationPool)
+    return State(chain,
+                 reserveToken,
+                 curationPool)
+
+
+def run_simulation(pool_config: PoolConfig,
+                   share_drive: Dict[int, int],
+                   max_time: int,
+                   recordState: Optional[ColumnarRecorder] = None) -> Union[List[Dict], ColumnarLog]:
+    """runs the scenario, recording with the config's recordState unless a columnar recorder is given."""
+    assert max_time * WAIT_PERIODS > max(share_drive)
+    chain = Chain()
+    sim_config = get_sim_config(pool_config, get_actions(share_drive, max_time), chain)
+    state = get_state(sim_config, chain, pool_config)
 
     sim_result = simulate3(sim_config.actions,
                            state,
-                           sim_config.recordState)
+                           sim_config.recordState if recordState is None else recordState)
 
     return sim_result
 
@@ -129,6 +154,19 @@ class ProcessedSim:
     def __post_init__(self):
         self.ratio = [i/j for i, j in zip(self.curator_shares, self.total_shares)]
 
+    @classmethod
+    def from_columns(cls, log: ColumnarLog) -> 'ProcessedSim':
+        """builds the processed result straight from the columns sampled with RECORDER_SPEC."""
+        curator_shares = log['curator_shares'].sum(axis=1)
+        return cls(
+            market_deposits=log['market_deposits'].tolist(),
+            curator_deposits=log['curator_deposits'].sum(axis=1).tolist(),
+            market_shares=log['market_shares'].tolist(),
+            curator_shares=curator_shares.tolist(),
+            spool_total=log['spool_total'].tolist(),
+            total_shares=(log['market_shares'] + curator_shares).tolist(),
+        )
+
 
 def process_result(result: List[Dict]) -> ProcessedSim:
     sleep_actions = list(filter(lambda x: x['action']['action_type'] == 'SLEEP', result))
@@ -146,34 +184,34 @@ def process_result(result: List[Dict]) -> ProcessedSim:
 
 
 def run_and_process(pool_config: PoolConfig, share_drive: Dict[int, int], max_time: int) -> ProcessedSim:
-    return process_result(run_simulation(pool_config, share_drive, max_time))
+    log = run_simulation(pool_config, share_drive, max_time, ColumnarRecorder(RECORDER_SPEC))
+    return ProcessedSim.from_columns(log)
+
 
+def do_step(seed: int = 0):
+    # imported here since the sweep runner itself depends on this module.
+    from curation_sim.sweep import run_sweep, sweep_grid
+    import matplotlib.pyplot as plt
 
-def do_step():
     fig, axs = plt.subplots(2, 1, figsize=(15, 7))
 
-    for r in (1e-4, 2e-4, 4e-4):
-        pool_config = PoolConfig(issuance_rate=r, deposit_std=1_000, reserve_std=100)
-        result_obj = run_and_process(pool_config, {5: 100_000}, 15)
+    rates = (1e-4, 2e-4, 4e-4)
+    sweep = run_sweep(sweep_grid([PoolConfig(issuance_rate=r, deposit_std=1_000, reserve_std=100) for r in rates],
+                                 [{5: 100_000}], [seed], 15))
+    # the ratio relaxes as 1 - a (1 + r)^-t after the step: a linear fit for every rate at once.
+    ys = np.array([result_obj.ratio[5:] for result_obj in sweep.results])
+    xs = np.arange(ys.shape[1])
+    exp_t = (1 + np.array(rates)[:, None]) ** (-xs * BLOCKS_PER_PERIOD)
+    amplitudes = fit_linear(exp_t[..., None], 1 - ys)[:, 0]
+    print(amplitudes)
+
+    for r, result_obj, a, e in zip(rates, sweep.results, amplitudes, exp_t):
 
         axs[0].plot(result_obj.total_shares, '.', label=f'r={1e4*r}E-4')
 
         axs[1].plot(result_obj.ratio, '.', label=f'r={1e4*r}E-4')
 
-        ys = np.array(result_obj.ratio[5:])
-        xs = np.array(range(len(ys)))
-        exp_t = (1 + r) ** (-xs * BLOCKS_PER_PERIOD)
-        model = lambda a: 1 - a * exp_t
-
-        def cost(params):
-            a = params
-            yhat = model(a)
-            return ((yhat-ys)**2).sum()
-
-        a = sopt.fmin(cost, [.2])
-        print(a)
-
-        yhat = model(a)
+        yhat = 1 - a * e
 
         axs[1].plot(range(5, 5 + len(yhat)), yhat)
 
@@ -199,30 +237,30 @@ def do_step():
     plt.show()
 
 
-def do_linear_ramp():
+def do_linear_ramp(seed: int = 0):
+    # imported here since the sweep runner itself depends on this module.
+    from curation_sim.sweep import run_sweep, sweep_grid
+    import matplotlib.pyplot as plt
+
     fig, axs = plt.subplots(1, 1, figsize=(15, 7))
     axs = [axs]
 
     r = 1e-4
     pool_config = PoolConfig(issuance_rate=r, deposit_std=0, reserve_std=0)
-    for drive in ({5: 15_000, 6: 15_000},
-                  {k: 3_000 for k in range(5, 15)},
-                  {k: 1_000 for k in range(5, 35)},
-                  {k: 333.3333 for k in range(5, 95)}):
-        result_obj = run_and_process(pool_config, drive, 15)
+    drives = ({5: 15_000, 6: 15_000},
+              {k: 3_000 for k in range(5, 15)},
+              {k: 1_000 for k in range(5, 35)},
+              {k: 333.3333 for k in range(5, 95)})
+    sweep = run_sweep(sweep_grid([pool_config], drives, [seed], 15))
+    for drive, result_obj in zip(drives, sweep.results):
 
         if len(drive) > 10:
             ys = np.array(result_obj.ratio[5:5+len(drive)])
-            xs = np.array(range(len(ys)))
-            model = lambda a, c: a + (1-a) * (1 + r) ** (-c * xs * BLOCKS_PER_PERIOD)
-
-            def cost(params):
-                a, c = params
-                yhat = model(a, c)
-                return ((yhat - ys) ** 2).sum()
+            xs = np.arange(len(ys))
+            model = lambda t, a, c: a + (1-a) * (1 + r) ** (-c * t * BLOCKS_PER_PERIOD)
 
-            a, c = sopt.fmin(cost, [.2, .2])
-            yhat = model(a, c)
+            a, c = fit_least_squares(model, xs, ys, [.2, .2]).params[0]
+            yhat = model(xs, a, c)
             axs[0].plot(range(5, 5 + len(yhat)), yhat)
 
         axs[0].plot(result_obj.ratio, '.', label=f'{len(drive)} steps')
@@ -240,15 +278,20 @@ def do_linear_ramp():
     plt.show()
 
 
-def do_sin_ramp():
+def do_sin_ramp(seed: int = 0):
+    # imported here since the sweep runner itself depends on this module.
+    from curation_sim.sweep import run_sweep, sweep_grid
+    import matplotlib.pyplot as plt
+
     fig, axs = plt.subplots(1, 1, figsize=(15, 7))
     axs = [axs]
 
     r = 1e-4
     pool_config = PoolConfig(issuance_rate=r, deposit_std=1_000, reserve_std=100)
-    for nu in (11, 23, 59):
-        drive = {k: 100 * (1 + np.sin(nu * k)) for k in range(5, 105)}
-        result_obj = run_and_process(pool_config, drive, 15)
+    frequencies = (11, 23, 59)
+    drives = [{k: 100 * (1 + np.sin(nu * k)) for k in range(5, 105)} for nu in frequencies]
+    sweep = run_sweep(sweep_grid([pool_config], drives, [seed], 15))
+    for nu, result_obj in zip(frequencies, sweep.results):
         axs[0].plot(result_obj.ratio, '.', label=f'{nu} steps')
 
     axs[0].set_title('ratio of curator shares to total shares with sinusoidal ramps', fontsize=20)
@@ -264,6 +307,36 @@ def do_sin_ramp():
     plt.show()
 
 
+# a single run of a step in the share drive, as in do_step.
+STEP_POOL_CONFIG = PoolConfig(issuance_rate=1e-4, deposit_std=1_000, reserve_std=100)
+STEP_DRIVE = {5: 100_000}
+STEP_MAX_TIME = 15
+
+
+def _step_state(rng: np.random.Generator) -> State:
+    chain = Chain()
+    return get_state(get_sim_config(STEP_POOL_CONFIG, (), chain, rng), chain, STEP_POOL_CONFIG)
+
+
+def plot(log: ColumnarLog):
+    """plots the fraction of the shares owned by the curators over a run."""
+    import matplotlib.pyplot as plt
+
+    result = ProcessedSim.from_columns(log)
+    fig, axs = plt.subplots(figsize=(15, 7))
+    axs.plot(result.ratio, '.')
+    axs.set_xlabel('time (a.u.)', fontsize=15)
+    axs.set_ylabel('ratio of shares owned\nby active curators', fontsize=15)
+    fig.savefig('share_drive.png')
+
+
+SCENARIO = Scenario(description='a market buys shares in a step, diluting the share fraction of the curators',
+                    state=_step_state,
+                    actions=lambda state, rng: get_actions(STEP_DRIVE, STEP_MAX_TIME),
+                    spec=RECORDER_SPEC,
+                    plot=plot)
+
+
 if __name__ == '__main__':
     # do_step()
     # do_linear_ramp()
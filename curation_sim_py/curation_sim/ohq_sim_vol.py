@@ -1,15 +1,18 @@
-import copy
-import random
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 
 import numpy as np
-import scipy.optimize as sopt
-from matplotlib import pyplot as plt
 
+from curation_sim.agents import SensibleCurators, VolTraders, agent_actions
+from curation_sim.analysis import fit_lowpass, lowpass
+from curation_sim.ensemble import run_ensemble
 from curation_sim.pools.chain import Chain
 from curation_sim.pools.secondary_pool import SecondaryPool
 from curation_sim.pools.token import Token
-from curation_sim.sim_utils import Action, Config, State, simulate3, CurationPool
+from curation_sim.recorder import ColumnarLog, ColumnarRecorder, Metric, RecorderSpec, deposit_balances
+from curation_sim.scenarios import Scenario, run_scenario
+from curation_sim.sim_utils import Action, Config, State, simulate3, CurationPool, record_effective_state
+from curation_sim.streams import periodic
+from curation_sim.sweep import spawn_seeds
 
 # parameters for the time evolution of the system.
 WAIT_PERIODS = 1
@@ -26,12 +29,6 @@ DEPOSIT_PROBABILITY: float = .2
 # the probability a trader will withdraw grt.
 WITHDRAW_PROBABILITY: float = .2
 
-# assert positive probability.
-# the remaining probability is to do nothing.
-assert DEPOSIT_PROBABILITY >= 0
-assert WITHDRAW_PROBABILITY >= 0
-assert DEPOSIT_PROBABILITY + WITHDRAW_PROBABILITY <= 1.0
-
 # the fraction of shares and number of shares owned by the principal curator.
 SENSIBLE_STARTING_FRACTION: float = .7
 SENSIBLE_STARTING_SHARES: float = 70000
@@ -42,169 +39,119 @@ TRADER_GRT = 1_000_000
 SENSIBLE_CURATOR_GRT = 10_000_000
 
 
-# The actions called on the state machine during its evolution.
-sim_actions_basic = []
+# trader GRT holdings in the curation pool. assuming that the curators have a certain amount of grt that represents
+# a certain fraction of the overall stake, distribute the remaining staked grt across vol traders.
+trader_starting_grt: float = ((1 - SENSIBLE_STARTING_FRACTION) * SENSIBLE_STARTING_SHARES / SENSIBLE_STARTING_FRACTION) / NUM_VOL_TRADERS
+TRADERS: Tuple[str, ...] = tuple(f'trader{t}' for t in range(NUM_VOL_TRADERS))
 
 
-def advance_actions(actions: List[Action],
-                    sleep_time: int,
-                    vol_trader_stakes: Dict[str, float],
-                    vol_trader_grt: Dict[str, float],
-                    curator_stakes: Dict[str, float],
-                    abs_time: int,
-                    traders_active: bool):
+# time evolution
+PRIME_TIME: int = 10
+SIM_TIME: int = 200
+
+
+def get_actions(state: State, rng: Optional[np.random.Generator] = None) -> Iterator[Action]:
     """
-    Advance the state machine during a time when no explicit changes are made. These actions
-    should represent passive time evolution.
-
-    :param actions: The list of actions.
-    :param sleep_time: The time to sleep.
-    :param vol_trader_stakes: The grt staked by each vol trader.
-    :param vol_trader_grt: The grt owned by each vol trader.
-    :param curator_stakes: The grt staked by each curator.
-    :param abs_time: The absolute time of the simulation.
-    :param traders_active: Whether the traders are active.
+    The actions of one random path of the scenario, decided lazily by agents observing the state as it evolves.
+    Nobody needs to claim, since the state is recorded with effective share balances.
+
+    :param state: the state the actions are applied to.
+    :param rng: the source of randomness of the traders.
     """
+    traders = VolTraders(TRADERS,
+                         deposit_probability=DEPOSIT_PROBABILITY,
+                         withdraw_probability=WITHDRAW_PROBABILITY,
+                         trade_fraction=TRADE_FRACTION,
+                         rng=rng)
+    # the sensible curator compounds their stake every ten periods.
+    sensible_curators = SensibleCurators(['sensible_curator'], growth=np.exp(.00047 * 10) - 1, every=10)
 
-    if traders_active:
-        for i in vol_trader_stakes:
-            event_val = random.random()
-            if event_val < DEPOSIT_PROBABILITY:
-                amnt_up = (TRADE_FRACTION - 1) * vol_trader_stakes[i]
-                if amnt_up < vol_trader_grt[i]:
-                    a = Action(action_type='DEPOSIT', target='curationPool', args=[i, amnt_up])
-                    actions.append(a)
-                    vol_trader_stakes[i] += amnt_up
-                    vol_trader_grt[i] -= amnt_up
-            elif DEPOSIT_PROBABILITY <= event_val < DEPOSIT_PROBABILITY + WITHDRAW_PROBABILITY:
-                amnt_down = vol_trader_stakes[i] * (1 - 1 / TRADE_FRACTION)
-                a = Action(action_type='WITHDRAW', target='curationPool', args=[i, amnt_down])
-                actions.append(a)
-                vol_trader_stakes[i] -= amnt_down
-            else:
-                pass
-
-        for c in curator_stakes:
-            if abs_time % 10 == 0:
-                amnt = (np.exp(.00047 * 10) - 1) * curator_stakes[c]
-                a = Action(action_type='DEPOSIT', target='curationPool', args=[c, amnt])
-                actions.append(a)
-                curator_stakes[c] += amnt
-
-    for i in vol_trader_stakes:
-        a = Action(action_type='CLAIM', target='curationPool', args=[i])
-        actions.append(a)
-    for c in curator_stakes:
-        actions.append(Action(action_type='CLAIM', target='curationPool', args=[c]))
-    actions.append(Action(action_type='SLEEP', target='chain', args=[sleep_time]))
+    # prime the system.
+    yield from periodic(None, BLOCKS_PER_PERIOD, PRIME_TIME)
+    yield from periodic(agent_actions(state, traders, sensible_curators), BLOCKS_PER_PERIOD, SIM_TIME,
+                        start=PRIME_TIME)
 
 
-# trader GRT holdings in the curation pool. assuming that the curators have a certain amount of grt that represents
-# a certain fraction of the overall stake, distribute the remaining staked grt across vol traders.
-trader_starting_grt: float = ((1 - SENSIBLE_STARTING_FRACTION) * SENSIBLE_STARTING_SHARES / SENSIBLE_STARTING_FRACTION) / NUM_VOL_TRADERS
-trader_stake: Dict[str, float] = {f'trader{t}': trader_starting_grt for t in range(NUM_VOL_TRADERS)}
-# personal trader GRT holdings outside
-trader_grt: Dict[str, float] = {f'trader{t}': TRADER_GRT for t in range(NUM_VOL_TRADERS)}
+def get_scenario_config(actions: Iterable[Action] = ()) -> Config:
+    # initial conditions
+    # the shares (also used as the stake) attributed to each participant.
+    deposits_share_balances = [('sensible_curator', SENSIBLE_STARTING_SHARES)] + [(i, trader_starting_grt) for i in TRADERS]
+    # the grt owned by each participant.
+    initial_reserve_token_balances = [('curationPool', sum(i[1] for i in deposits_share_balances)),
+                                      ('sensible_curator', SENSIBLE_CURATOR_GRT)
+                                      ] + [(i, TRADER_GRT) for i in TRADERS]
 
-curator_stake = {'sensible_curator': SENSIBLE_STARTING_SHARES}
+    return Config(
+        initialReserveTokenBalances=initial_reserve_token_balances,
+        initialShareBalances=deposits_share_balances,
+        initialDeposits=deposits_share_balances,
+        actions=actions,
+        recordState=record_effective_state
+    )
 
 
-# time evolution
-PRIME_TIME: int = 10
-SIM_TIME: int = 200
+def get_state(scenario_config: Config) -> State:
+    chain = Chain()
+    reserveToken = Token({k: v for k, v in scenario_config.initialReserveTokenBalances})
+
+    curationPool = CurationPool(
+          address='curationPool',
+          reserveToken=reserveToken,
+          secondary_pool_cls=SecondaryPool,
+          chain=chain,
+          initialShareBalances={k: v for k, v in scenario_config.initialShareBalances},
+          initialDeposits=scenario_config.initialDeposits,
+          issuanceRate=1e-4)
+
+    return State(chain,
+                 reserveToken,
+                 curationPool)
+
+
+def _sensible_share_fraction(state: State) -> float:
+    shares = state.curationPool.effectiveShareBalances()
+    return shares['sensible_curator'] / sum(shares.values())
+
+
+def _sensible_deposit_fraction(state: State) -> float:
+    deposits = state.curationPool.deposits
+    return deposits['sensible_curator'] / sum(deposits.values())
 
-# prime the system.
-for t in range(PRIME_TIME):
-    advance_actions(sim_actions_basic, BLOCKS_PER_PERIOD, trader_stake, trader_grt, curator_stake, t, traders_active=False)
-
-for t in range(SIM_TIME):
-    advance_actions(sim_actions_basic, BLOCKS_PER_PERIOD, trader_stake, trader_grt, curator_stake, PRIME_TIME+t, traders_active=True)
-
-# initial conditions
-# the shares (also used as the stake) attributed to each participant.
-deposits_share_balances = [('sensible_curator', SENSIBLE_STARTING_SHARES)] + [(i, trader_starting_grt) for i in trader_stake]
-# the grt owned by each participant.
-initial_reserve_token_balances = [('curationPool', sum(i[1] for i in deposits_share_balances)),
-                                  ('sensible_curator', SENSIBLE_CURATOR_GRT)
-                                  ] + [(i, TRADER_GRT) for i in trader_stake]
-
-scenario_config = Config(
-    initialReserveTokenBalances=initial_reserve_token_balances,
-    initialShareBalances=deposits_share_balances,
-    initialDeposits=deposits_share_balances,
-    actions=sim_actions_basic,
-    recordState=lambda s: {
-        'time': copy.deepcopy(s.chain.blockHeight),
-        'shareBalances': copy.deepcopy(s.curationPool.shareToken.balances),
-        'depositBalances': copy.deepcopy(s.curationPool.deposits),
-        'primaryPoolTotalDeposits': copy.deepcopy(s.curationPool.reserveToken.balanceOf(s.curationPool.address)),
-        'secondaryPoolTotalDeposits': copy.deepcopy(s.curationPool.secondaryPool.totalDeposits),
-        'reserveBalances': copy.deepcopy(s.reserveToken.balances),
-    }
-)
-
-chain = Chain()
-reserveToken = Token({k: v for k, v in scenario_config.initialReserveTokenBalances})
-
-curationPool = CurationPool(
-      address='curationPool',
-      reserveToken=reserveToken,
-      secondary_pool_cls=SecondaryPool,
-      chain=chain,
-      initialShareBalances={k: v for k, v in scenario_config.initialShareBalances},
-      initialDeposits=scenario_config.initialDeposits,
-      issuanceRate=1e-4)
-
-state = State(chain,
-              reserveToken,
-              curationPool)
-
-
-def basic_plot():
-    sim_result = simulate3(scenario_config.actions,
-                           state,
-                           scenario_config.recordState)
-
-    # studies on the results.
-    sleep_actions = list(filter(lambda x: x['action']['action_type'] == 'SLEEP', sim_result))
-
-    stable_shares = [i['state']['shareBalances']['sensible_curator'] for i in sleep_actions]
-    total_shares = [sum(i['state']['shareBalances'].values()) for i in sleep_actions]
-    sensible_share_fraction = [i / j for i, j in zip(stable_shares, total_shares)]
-
-    stable_signal = [i['state']['depositBalances']['sensible_curator'] for i in sleep_actions]
-    trader_signal = [sum(i['state']['depositBalances'][f'trader{t}'] for t in range(NUM_VOL_TRADERS)) for i in sleep_actions]
-
-    total_signal = [sum(i['state']['depositBalances'].values()) for i in sleep_actions]
-    sensible_deposit_fraction = [i / j for i, j in zip(stable_signal, total_signal)]
-
-    def lowpass(x, a):
-        y = [x[0]]
-        for idx in range(1, len(x)):
-            y.append(a * y[idx - 1] + (1 - a) * x[idx])
-        return y
-
-    def ema(x, a):
-        num = [x[0]]
-        denom = [1]
-        for i in range(1, len(x)):
-            num.append(x[i] + a * num[i - 1])
-            denom.append(denom[i - 1] + a ** i)
-        return [i / j for i, j in zip(num, denom)]
-
-    def cost(x, f):
-        a = x[0]
-        y = f(sensible_deposit_fraction, a)
-        return sum((i - j) ** 2 for i, j in zip(y, sensible_share_fraction))
+
+# the fractions of shares and of signal owned by the sensible curator, sampled after every period.
+FRACTIONS_SPEC = RecorderSpec(metrics=[Metric('share_fraction', _sensible_share_fraction),
+                                       Metric('deposit_fraction', _sensible_deposit_fraction)],
+                              action_types=('SLEEP',),
+                              initial=False)
+
+
+def run_replica(seed: int) -> Dict[str, np.ndarray]:
+    """the per-period share and deposit fractions of the sensible curator along one seeded random path."""
+    state = get_state(get_scenario_config())
+    log = simulate3(get_actions(state, np.random.default_rng(seed)), state, ColumnarRecorder(FRACTIONS_SPEC))
+    return dict(log.columns)
+
+
+# the fractions, and the deposits of the traders, sampled after every period.
+SCENARIO_SPEC = RecorderSpec(metrics=FRACTIONS_SPEC.metrics + [deposit_balances('trader_deposits', TRADERS)],
+                             action_types=('SLEEP',),
+                             initial=False)
+
+
+def plot(log: ColumnarLog):
+    """plots the share and deposit fractions of the sensible curator, and the lowpass filter relating them."""
+    from matplotlib import pyplot as plt
+
+    sensible_share_fraction = log['share_fraction']
+    sensible_deposit_fraction = log['deposit_fraction']
 
     fig, axs = plt.subplots(figsize=(8, 6))
 
     axs.plot(sensible_deposit_fraction, label='grt fraction')
     axs.plot(sensible_share_fraction, label='share fraction')
 
-    smoother = lowpass
-    result = sopt.fmin(lambda x: cost(x, smoother), [.6])
-    y = smoother(sensible_deposit_fraction, result[0])
+    a = fit_lowpass(sensible_deposit_fraction, sensible_share_fraction).params[0, 0]
+    y = lowpass(sensible_deposit_fraction, a)
     axs.plot(y, label='lowpass', linewidth=3)
 
     axs.set_xlabel('time (a.u.)', fontsize=15)
@@ -213,12 +160,46 @@ def basic_plot():
     axs.legend(fontsize=15)
     fig.savefig('curator_volatile_market.png')
 
-    active_trading = np.array(trader_signal[PRIME_TIME:]) / trader_signal[0]
+    if 'trader_deposits' in log.columns:
+        trader_signal = log['trader_deposits'].sum(axis=1)
+        active_trading = trader_signal[PRIME_TIME:] / trader_signal[0]
+
+        print(.2 * np.log(1+.05)**2)
+        print(np.diff(active_trading).mean())
+
+
+SCENARIO = Scenario(description='a sensible curator among traders who trade in and out of the pool at random',
+                    state=lambda rng: get_state(get_scenario_config()),
+                    actions=get_actions,
+                    spec=SCENARIO_SPEC,
+                    plot=plot)
 
-    print(.2 * np.log(1+.05)**2)
-    print(np.diff(active_trading).mean())
+
+def basic_plot(seed: Optional[int] = None):
+    plot(run_scenario(SCENARIO, seed))
+
+
+def ensemble_plot(num_replicas: int = 32, seed: int = 0, processes: Optional[int] = None):
+    """confidence bands of the share and deposit fractions over many random paths."""
+    from matplotlib import pyplot as plt
+
+    result = run_ensemble(run_replica, spawn_seeds(seed, num_replicas), processes=processes)
+
+    fig, axs = plt.subplots(figsize=(8, 6))
+    for metric, label in (('deposit_fraction', 'grt fraction'), ('share_fraction', 'share fraction')):
+        lower, upper = result.band(metric, .05, .95)
+        axs.plot(result.mean[metric], label=f'{label} (mean)')
+        axs.fill_between(range(len(lower)), lower, upper, alpha=.3, label=f'{label} (5%-95%)')
+
+    axs.set_xlabel('time (a.u.)', fontsize=15)
+    axs.set_ylabel('ratio of shares and signal owned by active curators', fontsize=15)
+    axs.set_title(f'Curator Share Fraction over {result.count} Volatile Markets', fontsize=20)
+    axs.legend(fontsize=15)
+    fig.savefig('curator_volatile_market_ensemble.png')
 
 
 if __name__ == '__main__':
+    from matplotlib import pyplot as plt
+
     basic_plot()
     plt.show()
@@ -0,0 +1,157 @@
+"""
+Online statistics of a run. An Accumulator reads a metric of the state after each action `simulate3` applies, as a
+Metric of a RecorderSpec would, but folds it into a running statistic held in constant memory rather than recording
+it, so a long run can report eg. the mean and peak of a ratio, or when it first crossed a threshold, without keeping
+any per-action state:
+
+    ratio = MinMax('ratio', lambda s: s.curationPool.effectiveShareBalanceOf('whale') / ..., action_types=('SLEEP',))
+    simulate3(actions, state, accumulators=[ratio])
+    ratio.result()        # {'min': ..., 'max': ..., 'argmin': ..., 'argmax': ...}
+
+Metrics may be scalars or vectors, eg. the deposits of every curator, which are accumulated elementwise.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from curation_sim.recorder import INITIAL_STATE
+
+
+def _value(x: np.ndarray):
+    """a scalar as a Python number, a vector as an array."""
+    return x.item() if x.ndim == 0 else x
+
+
+class Accumulator(ABC):
+    """
+    :param name: the name of the statistic.
+    :param fn: computes the value of the metric from the state.
+    :param action_types: the action types after which the metric is read; None reads it after every action.
+    :param initial: whether to read the metric of the initial state.
+    """
+
+    def __init__(self,
+                 name: str,
+                 fn: Callable[[Any], Any],
+                 action_types: Optional[Tuple[str, ...]] = None,
+                 initial: bool = True):
+        self.name: str = name
+        self.fn: Callable[[Any], Any] = fn
+        self.action_types: Optional[Tuple[str, ...]] = action_types
+        self.initial: bool = initial
+        # the number of values read.
+        self.count: int = 0
+
+    def observe(self, state, index: int, action_type: str):
+        """reads the metric if it is read after this action."""
+        if action_type == INITIAL_STATE:
+            if not self.initial:
+                return
+        elif self.action_types is not None and action_type not in self.action_types:
+            return
+        self.update(np.asarray(self.fn(state), dtype=np.float64), index)
+        self.count += 1
+
+    @abstractmethod
+    def update(self, x: np.ndarray, index: int):
+        """folds in the value of the metric after the action at this index."""
+        pass
+
+    @abstractmethod
+    def result(self) -> Dict[str, Any]:
+        pass
+
+
+class RunningMean(Accumulator):
+    """the mean and variance of the values read, by Welford's algorithm."""
+
+    def update(self, x: np.ndarray, index: int):
+        if self.count == 0:
+            self._mean, self._m2 = x.copy(), np.zeros_like(x)
+            return
+        delta = x - self._mean
+        self._mean = self._mean + delta / (self.count + 1)
+        self._m2 = self._m2 + delta * (x - self._mean)
+
+    def result(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {'count': 0, 'mean': np.nan, 'variance': np.nan, 'std': np.nan}
+        variance = self._m2 / self.count
+        return {'count': self.count,
+                'mean': _value(self._mean),
+                'variance': _value(variance),
+                'std': _value(np.sqrt(variance))}
+
+
+class EWMA(Accumulator):
+    """
+    The exponentially weighted moving average y = a y + (1 - a) x, starting from the first value read, as
+    `analysis.lowpass` filters a whole trajectory.
+
+    :param a: the smoothing factor in [0, 1].
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], a: float, **kwargs):
+        super().__init__(name, fn, **kwargs)
+        self.a: float = a
+
+    def update(self, x: np.ndarray, index: int):
+        self._value = x.copy() if self.count == 0 else self.a * self._value + (1 - self.a) * x
+
+    def result(self) -> Dict[str, Any]:
+        return {'count': self.count, 'value': _value(self._value) if self.count else np.nan}
+
+
+class MinMax(Accumulator):
+    """the least and greatest values read, and the indices of the actions after which they were first read."""
+
+    def update(self, x: np.ndarray, index: int):
+        if self.count == 0:
+            self._min, self._max = x.copy(), x.copy()
+            self._argmin, self._argmax = np.full(x.shape, index), np.full(x.shape, index)
+            return
+        lower, higher = x < self._min, x > self._max
+        self._min, self._argmin = np.where(lower, x, self._min), np.where(lower, index, self._argmin)
+        self._max, self._argmax = np.where(higher, x, self._max), np.where(higher, index, self._argmax)
+
+    def result(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {'count': 0, 'min': np.nan, 'max': np.nan, 'argmin': -1, 'argmax': -1}
+        return {'count': self.count,
+                'min': _value(self._min),
+                'max': _value(self._max),
+                'argmin': _value(self._argmin),
+                'argmax': _value(self._argmax)}
+
+
+class TimeToThreshold(Accumulator):
+    """
+    When the metric first reached a threshold: the index of the action after which it was first read at or above the
+    threshold (or at or below it), and the number of values read before, eg. the number of periods when the metric is
+    read after every SLEEP; -1 if it has not been reached.
+
+    :param below: wait for the metric to fall to the threshold rather than rise to it.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], threshold: float, below: bool = False, **kwargs):
+        super().__init__(name, fn, **kwargs)
+        self.threshold: float = threshold
+        self.below: bool = below
+
+    def update(self, x: np.ndarray, index: int):
+        if self.count == 0:
+            self._index, self._reads = np.full(x.shape, -1), np.full(x.shape, -1)
+        reached = (x <= self.threshold if self.below else x >= self.threshold) & (self._index < 0)
+        self._index = np.where(reached, index, self._index)
+        self._reads = np.where(reached, self.count, self._reads)
+
+    def result(self) -> Dict[str, Any]:
+        if self.count == 0:
+            return {'count': 0, 'index': -1, 'reads': -1}
+        return {'count': self.count, 'index': _value(self._index), 'reads': _value(self._reads)}
+
+
+def summarize(accumulators: Iterable[Accumulator]) -> Dict[str, Dict[str, Any]]:
+    """the result of every accumulator, by name."""
+    return {a.name: a.result() for a in accumulators}
@@ -0,0 +1,247 @@
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+
+
+class AccountIndex:
+    """
+    Assigns a dense integer id to every address seen by a contract, so that per-account state can be stored in
+    arrays rather than dictionaries keyed by address. Ids are never reused or removed.
+    """
+
+    def __init__(self, addresses: Iterable[ADDRESS_t] = ()):
+        self.ids: Dict[ADDRESS_t, int] = {}
+        self.addresses: List[ADDRESS_t] = []
+        self.extend(addresses)
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def __contains__(self, account: ADDRESS_t):
+        return account in self.ids
+
+    def idOf(self, account: ADDRESS_t) -> int:
+        """the id of an account, registering the account if it has not been seen before."""
+        idx = self.ids.get(account)
+        if idx is None:
+            idx = len(self.addresses)
+            self.ids[account] = idx
+            self.addresses.append(account)
+        return idx
+
+    def find(self, account: ADDRESS_t) -> int:
+        """the id of an account, or -1 if it has never been seen."""
+        return self.ids.get(account, -1)
+
+    def copy(self) -> 'AccountIndex':
+        ret = AccountIndex()
+        ret.ids = dict(self.ids)
+        ret.addresses = list(self.addresses)
+        return ret
+
+    def extend(self, accounts: Iterable[ADDRESS_t]) -> np.ndarray:
+        """registers many accounts at once and returns their ids."""
+        return np.fromiter((self.idOf(a) for a in accounts), dtype=np.int64)
+
+
+class AccountTable:
+    """
+    A struct-of-arrays holding one column per field, indexed by the ids of an AccountIndex. Several tables may share
+    one index (eg. the deposits and the snapshots of a pool), so a table grows lazily whenever the index has outgrown
+    it. The `present` mask distinguishes rows that have been written from rows that only exist because the index is
+    shared, which lets the owner reproduce the `dict.get(account, default)` semantics of the dictionary engine.
+    """
+
+    def __init__(self,
+                 index: AccountIndex,
+                 fields: Tuple[str, ...],
+                 capacity: int = 16,
+                 dtype=np.float64):
+        self.index: AccountIndex = index
+        self.fields: Tuple[str, ...] = fields
+        self.dtype = dtype
+        capacity = max(capacity, len(index), 1)
+        self.columns: Dict[str, np.ndarray] = {f: np.zeros(capacity, dtype=dtype) for f in fields}
+        self.present: np.ndarray = np.zeros(capacity, dtype=bool)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.present)
+
+    def _reserve(self, size: int):
+        if size <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        for f in self.fields:
+            column = np.zeros(capacity, dtype=self.dtype)
+            column[:self.capacity] = self.columns[f]
+            self.columns[f] = column
+        present = np.zeros(capacity, dtype=bool)
+        present[:self.capacity] = self.present
+        self.present = present
+
+    def row(self, account: ADDRESS_t) -> int:
+        """the row of an account, creating it (not yet present) if necessary."""
+        idx = self.index.idOf(account)
+        if idx >= self.capacity:
+            self._reserve(idx + 1)
+        return idx
+
+    def find(self, account: ADDRESS_t) -> int:
+        """the row of an account if it has been written, or -1."""
+        idx = self.index.ids.get(account, -1)
+        if idx < 0 or idx >= self.capacity or not self.present[idx]:
+            return -1
+        return idx
+
+    def rows(self, accounts: Iterable[ADDRESS_t]) -> np.ndarray:
+        ids = self.index.extend(accounts)
+        self._reserve(len(self.index))
+        return ids
+
+    def lookup(self, accounts: Iterable[ADDRESS_t]) -> Tuple[np.ndarray, np.ndarray]:
+        """the rows of many accounts, and a mask of which of them are present. Unknown accounts are not registered."""
+        ids = np.fromiter((self.index.ids.get(a, -1) for a in accounts), dtype=np.int64)
+        found = (ids >= 0) & (ids < self.capacity)
+        found[found] = self.present[ids[found]]
+        return ids, found
+
+    def gather(self, field: str, accounts: Iterable[ADDRESS_t], default: NUMERIC_t = 0) -> np.ndarray:
+        """the values of a field for many accounts, with `default` for rows that are not present."""
+        ids, found = self.lookup(accounts)
+        ret = np.full(len(ids), default, dtype=self.dtype)
+        ret[found] = self.columns[field][ids[found]]
+        return ret
+
+    def load(self, field: str, values: Dict[ADDRESS_t, NUMERIC_t]):
+        """bulk-writes a column from a mapping of account to value."""
+        ids = self.rows(values.keys())
+        self.columns[field][ids] = np.fromiter(values.values(), dtype=self.dtype, count=len(ids))
+        self.present[ids] = True
+
+    def clear(self):
+        for column in self.columns.values():
+            column[:] = 0
+        self.present[:] = False
+
+    def view(self, field: str) -> np.ndarray:
+        """the column of a field, trimmed to the accounts known to the index."""
+        self._reserve(len(self.index))
+        return self.columns[field][:len(self.index)]
+
+    def presentMask(self) -> np.ndarray:
+        self._reserve(len(self.index))
+        return self.present[:len(self.index)]
+
+    def copy(self, index: AccountIndex = None) -> 'AccountTable':
+        ret = AccountTable.__new__(AccountTable)
+        ret.index = self.index if index is None else index
+        ret.fields = self.fields
+        ret.dtype = self.dtype
+        ret.columns = {f: c.copy() for f, c in self.columns.items()}
+        ret.present = self.present.copy()
+        return ret
+
+
+class AccountColumn(MutableMapping):
+    """
+    A dictionary-like view of one column of an AccountTable, restricted to the rows that are present. This keeps code
+    written against `Dict[ADDRESS_t, NUMERIC_t]` (recorders, scenarios) working against the array engine. Deep copies
+    of the view are plain dictionaries, so recorded states do not alias the live arrays.
+    """
+
+    def __init__(self, table: AccountTable, field: str):
+        self.table = table
+        self.field = field
+
+    def __getitem__(self, account: ADDRESS_t):
+        idx = self.table.find(account)
+        if idx < 0:
+            raise KeyError(account)
+        return self.table.columns[self.field].item(idx)
+
+    def __setitem__(self, account: ADDRESS_t, value: NUMERIC_t):
+        idx = self.table.row(account)
+        self.table.columns[self.field][idx] = value
+        self.table.present[idx] = True
+
+    def __delitem__(self, account: ADDRESS_t):
+        idx = self.table.find(account)
+        if idx < 0:
+            raise KeyError(account)
+        self.table.columns[self.field][idx] = 0
+        self.table.present[idx] = False
+
+    def __iter__(self):
+        present = self.table.presentMask()
+        addresses = self.table.index.addresses
+        return (addresses[i] for i in np.flatnonzero(present))
+
+    def __len__(self):
+        return int(self.table.presentMask().sum())
+
+    def values(self):
+        return self.table.view(self.field)[self.table.presentMask()].tolist()
+
+    def copy(self) -> Dict[ADDRESS_t, NUMERIC_t]:
+        return dict(zip(self, self.values()))
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.copy()})'
+
+
+class AccountRecords(MutableMapping):
+    """
+    A dictionary-like view of the rows of an AccountTable as records (eg. the snapshot dataclasses of the dictionary
+    engine). Records are built on access and written back field by field, so mutating a returned record does not
+    change the table.
+    """
+
+    def __init__(self, table: AccountTable, record_cls):
+        self.table = table
+        self.record_cls = record_cls
+
+    def __getitem__(self, account: ADDRESS_t):
+        idx = self.table.find(account)
+        if idx < 0:
+            raise KeyError(account)
+        return self.record_cls(**{f: self.table.columns[f].item(idx) for f in self.table.fields})
+
+    def __setitem__(self, account: ADDRESS_t, record):
+        idx = self.table.row(account)
+        for f in self.table.fields:
+            self.table.columns[f][idx] = getattr(record, f)
+        self.table.present[idx] = True
+
+    def __delitem__(self, account: ADDRESS_t):
+        idx = self.table.find(account)
+        if idx < 0:
+            raise KeyError(account)
+        for f in self.table.fields:
+            self.table.columns[f][idx] = 0
+        self.table.present[idx] = False
+
+    def __iter__(self):
+        present = self.table.presentMask()
+        addresses = self.table.index.addresses
+        return (addresses[i] for i in np.flatnonzero(present))
+
+    def __len__(self):
+        return int(self.table.presentMask().sum())
+
+    def copy(self):
+        return {k: self[k] for k in self}
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.copy()})'
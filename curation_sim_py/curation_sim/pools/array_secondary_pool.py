@@ -0,0 +1,149 @@
+from typing import Dict, Iterable, Tuple, Sequence
+
+import numpy as np
+
+from curation_sim.pools.accounts import AccountIndex, AccountTable, AccountRecords
+from curation_sim.pools.primary_pool import PrimaryPool
+from curation_sim.pools.secondary_pool import SecondaryPool, SPSnapShot
+from curation_sim.pools.token import Token
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+
+SP_SNAPSHOT_FIELDS = ('accSharesPerDeposit', 'accRoyaltiesPerDeposit', 'deposit')
+
+
+class ArraySecondaryPool(SecondaryPool):
+    """
+    A SecondaryPool whose snapshots are stored as a struct-of-arrays indexed by account id. When the primary pool
+    exposes an AccountIndex (as ArrayCurationPool does) the snapshots share it, so a curator has the same row in the
+    deposits of the primary pool and in the snapshots of the secondary pool.
+    """
+
+    def __init__(self,
+                 address: ADDRESS_t,
+                 shareToken: Token,
+                 reserveToken: Token,
+                 totalDeposits: NUMERIC_t,
+                 primaryPool: PrimaryPool):
+        accounts = getattr(primaryPool, 'accounts', None)
+        self.accounts: AccountIndex = AccountIndex() if accounts is None else accounts
+        self._snapshots: AccountTable = AccountTable(self.accounts, SP_SNAPSHOT_FIELDS,
+                                                     dtype=reserveToken.numeric.dtype)
+        super().__init__(address, shareToken, reserveToken, totalDeposits, primaryPool)
+
+    @property
+    def snapshots(self) -> AccountRecords:
+        return AccountRecords(self._snapshots, SPSnapShot)
+
+    @snapshots.setter
+    def snapshots(self, value: Dict[ADDRESS_t, SPSnapShot]):
+        self._snapshots.clear()
+        records = self.snapshots
+        for k, v in value.items():
+            records[k] = v
+
+    def _forkAccounts(self, ret: 'ArraySecondaryPool'):
+        shared = self.accounts is getattr(self.primaryPool, 'accounts', None)
+        ret.accounts = ret.primaryPool.accounts if shared else self.accounts.copy()
+        ret._snapshots = self._snapshots.copy(ret.accounts)
+
+    def _rebaseShares(self, factor: float):
+        self.accSharesPerDeposit *= factor
+        self.accShares *= factor
+        self._snapshots.columns['accSharesPerDeposit'] *= factor
+
+    def _snapshotValues(self, account: ADDRESS_t) -> Tuple[NUMERIC_t, NUMERIC_t, NUMERIC_t]:
+        """(accSharesPerDeposit, accRoyaltiesPerDeposit, deposit) with the same defaults as `snapshotOf`."""
+        table = self._snapshots
+        idx = table.find(account)
+        if idx >= 0:
+            columns = table.columns
+            return (columns['accSharesPerDeposit'].item(idx),
+                    columns['accRoyaltiesPerDeposit'].item(idx),
+                    columns['deposit'].item(idx))
+        deposit = self.primaryPool.depositOf(account)
+        if deposit > 0:
+            return 0, 0, deposit
+        return self.accSharesPerDeposit, self.accRoyaltiesPerDeposit, 0
+
+    def _writeSnapshot(self, account: ADDRESS_t, deposit: NUMERIC_t):
+        table = self._snapshots
+        idx = table.row(account)
+        table.columns['accSharesPerDeposit'][idx] = self.accSharesPerDeposit
+        table.columns['accRoyaltiesPerDeposit'][idx] = self.accRoyaltiesPerDeposit
+        table.columns['deposit'][idx] = deposit
+        table.present[idx] = True
+
+    def _updateDeposit(self, account: ADDRESS_t, amount: NUMERIC_t):
+        prevDeposit = self._snapshotValues(account)[2]
+        self._writeSnapshot(account, amount)
+        self.totalDeposits += (amount - prevDeposit)
+
+    def _claim(self, account: ADDRESS_t):
+        prevAccShares, prevAccRoyalties, prevDeposit = self._snapshotValues(account)
+
+        accShares = (self.accSharesPerDeposit - prevAccShares) * prevDeposit
+        self.shareToken.transfer(self.address, account, accShares)
+
+        accRoyalties = (self.accRoyaltiesPerDeposit - prevAccRoyalties) * prevDeposit
+        self.reserveToken.transfer(self.address, account, accRoyalties)
+
+        self._writeSnapshot(account, prevDeposit)
+
+    def _claimMany(self, accounts: Iterable[ADDRESS_t]):
+        """
+        Claims for many accounts with array operations when neither token has hooks, and one account at a time
+        otherwise.
+        """
+        accounts = list(dict.fromkeys(accounts))
+        tokens = (self.shareToken, self.reserveToken)
+        if (self.address in accounts or any(t._hooked or not hasattr(t, '_applyTransfers') for t in tokens)):
+            return super()._claimMany(accounts)
+
+        accShares, accRoyalties, deposit = self._snapshotArrays(accounts)
+        self.shareToken._applyTransfers(self.address, accounts, (self.accSharesPerDeposit - accShares) * deposit)
+        self.reserveToken._applyTransfers(self.address, accounts,
+                                          (self.accRoyaltiesPerDeposit - accRoyalties) * deposit)
+
+        table = self._snapshots
+        ids = table.rows(accounts)
+        table.columns['accSharesPerDeposit'][ids] = self.accSharesPerDeposit
+        table.columns['accRoyaltiesPerDeposit'][ids] = self.accRoyaltiesPerDeposit
+        table.columns['deposit'][ids] = deposit
+        table.present[ids] = True
+
+    def snapshotOf(self, account: ADDRESS_t):
+        accSharesPerDeposit, accRoyaltiesPerDeposit, deposit = self._snapshotValues(account)
+        return SPSnapShot(accSharesPerDeposit=accSharesPerDeposit,
+                          accRoyaltiesPerDeposit=accRoyaltiesPerDeposit,
+                          deposit=deposit)
+
+    def _snapshotArrays(self, accounts: Sequence[ADDRESS_t]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """vectorized `_snapshotValues` for many accounts."""
+        ids, found = self._snapshots.lookup(accounts)
+        columns = self._snapshots.columns
+        if hasattr(self.primaryPool, 'depositsOf'):
+            deposits = self.primaryPool.depositsOf(accounts)
+        else:
+            deposits = np.array([self.primaryPool.depositOf(a) for a in accounts], dtype=self._snapshots.dtype)
+        genesis = ~found & (deposits > 0)
+        zero = self.reserveToken.numeric.number(0)
+        accShares = np.where(genesis, zero, self.accSharesPerDeposit)
+        accRoyalties = np.where(genesis, zero, self.accRoyaltiesPerDeposit)
+        deposit = np.where(genesis, deposits, zero)
+        accShares[found] = columns['accSharesPerDeposit'][ids[found]]
+        accRoyalties[found] = columns['accRoyaltiesPerDeposit'][ids[found]]
+        deposit[found] = columns['deposit'][ids[found]]
+        return accShares, accRoyalties, deposit
+
+    def pendingSharesOfMany(self, accounts: Sequence[ADDRESS_t], undistributedShares: NUMERIC_t = 0) -> np.ndarray:
+        """vectorized `pendingSharesOf` for many accounts."""
+        accSharesPerDeposit = self.accSharesPerDeposit
+        if undistributedShares and self.totalDeposits > 0:
+            accSharesPerDeposit += (undistributedShares/self.totalDeposits)
+        accShares, _, deposit = self._snapshotArrays(accounts)
+        return (accSharesPerDeposit - accShares) * deposit
+
+    def pendingRoyaltiesOfMany(self, accounts: Sequence[ADDRESS_t]) -> np.ndarray:
+        """vectorized `pendingRoyaltiesOf` for many accounts."""
+        _, accRoyalties, deposit = self._snapshotArrays(accounts)
+        return (self.accRoyaltiesPerDeposit - accRoyalties) * deposit
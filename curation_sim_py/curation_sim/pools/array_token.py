@@ -0,0 +1,121 @@
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from curation_sim.pools.accounts import AccountIndex, AccountTable, AccountColumn
+from curation_sim.pools.numeric import FLOAT, NumericBackend
+from curation_sim.pools.token import Token
+from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+
+
+class ArrayToken(Token):
+    """
+    A Token whose balances live in a NumPy array indexed by account id rather than in a dictionary. Transfers, mints
+    and burns take the same fast path or hook pipeline as Token; only the storage differs. The `balances`
+    attribute is a dictionary-like view, so existing recorders keep working. The array holds float64 balances, or
+    Python objects for backends such as FIXED18.
+    """
+
+    def __init__(self,
+                 initialBalances: Dict[ADDRESS_t, NUMERIC_t],
+                 accounts: Optional[AccountIndex] = None,
+                 numeric: NumericBackend = FLOAT):
+        self.accounts: AccountIndex = AccountIndex() if accounts is None else accounts
+        self._table: AccountTable = AccountTable(self.accounts, ('balance',), capacity=len(initialBalances),
+                                                 dtype=numeric.dtype)
+        super().__init__(initialBalances, numeric=numeric)
+
+    @property
+    def balances(self) -> AccountColumn:
+        return AccountColumn(self._table, 'balance')
+
+    @balances.setter
+    def balances(self, value: Dict[ADDRESS_t, NUMERIC_t]):
+        self._table.clear()
+        self._table.load('balance', value)
+
+    def _forkBalances(self, ret: 'ArrayToken'):
+        ret.accounts = self.accounts.copy()
+        ret._table = self._table.copy(ret.accounts)
+
+    def _scaleBalances(self, factor: NUMERIC_t):
+        self._table.columns['balance'] *= factor
+        self.totalSupply *= factor
+
+    def _computeTotalSupply(self):
+        return self.numeric.number(self._table.view('balance').sum())
+
+    def _applyTransfer(self,
+                       fromAccount: ADDRESS_t,
+                       toAccount: ADDRESS_t,
+                       amount: NUMERIC_t,
+                       senderInitialBalance: NUMERIC_t,
+                       receiverInitialBalance: NUMERIC_t):
+        table = self._table
+        fromIdx = table.row(fromAccount)
+        toIdx = table.row(toAccount)
+        column = table.columns['balance']
+
+        senderFinalBalance = senderInitialBalance - amount
+        if senderFinalBalance < 0:
+            if abs(senderFinalBalance / amount) < self.numeric.relative_tolerance:
+                senderFinalBalance = 0
+            else:
+                raise
+        column[fromIdx] = senderFinalBalance
+        table.present[fromIdx] = True
+
+        receiverFinalBalance = receiverInitialBalance + amount
+        assert receiverFinalBalance >= 0
+        column[toIdx] = receiverFinalBalance
+        table.present[toIdx] = True
+
+    def _applyMint(self, toAccount: ADDRESS_t, amount: NUMERIC_t, receiverInitialBalance: NUMERIC_t):
+        idx = self._table.row(toAccount)
+        self._table.columns['balance'][idx] = receiverInitialBalance + amount
+        self._table.present[idx] = True
+        self.totalSupply += amount
+
+    def _applyBurn(self, fromAccount: ADDRESS_t, amount: NUMERIC_t, senderInitialBalance: NUMERIC_t):
+        senderFinalBalance = senderInitialBalance - amount
+        assert senderFinalBalance >= 0
+        idx = self._table.row(fromAccount)
+        self._table.columns['balance'][idx] = senderFinalBalance
+        self._table.present[idx] = True
+
+        self.totalSupply -= amount
+        assert self.totalSupply >= 0
+
+    def _applyTransfers(self, fromAccount: ADDRESS_t, toAccounts: Sequence[ADDRESS_t], amounts: np.ndarray):
+        """
+        Transfers from one account to many distinct accounts at once, bypassing hooks. A total shortfall below the
+        rounding tolerance of `_validateTransfer` for each transfer, as the same transfers made one at a time could
+        round away, is absorbed by the sender.
+        """
+        table = self._table
+        fromIdx = table.row(fromAccount)
+        toIdx = table.rows(toAccounts)
+        column = table.columns['balance']
+
+        senderFinalBalance = self.balanceOf(fromAccount) - amounts.sum()
+        if senderFinalBalance < 0:
+            if -senderFinalBalance < len(amounts) * self.numeric.tolerance:
+                senderFinalBalance = 0
+            else:
+                raise AssertionError("Token_transfer: Sender has insufficient funds")
+        column[fromIdx] = senderFinalBalance
+        table.present[fromIdx] = True
+
+        np.add.at(column, toIdx, amounts)
+        table.present[toIdx] = True
+
+    def balanceOf(self, account: ADDRESS_t):
+        idx = self.accounts.ids.get(account, -1)
+        column = self._table.columns['balance']
+        if idx < 0 or idx >= len(column):
+            return 0
+        return column.item(idx)
+
+    def balancesOf(self, accounts: Iterable[ADDRESS_t]) -> np.ndarray:
+        """the balances of many accounts at once; unknown accounts have a zero balance."""
+        return self._table.gather('balance', accounts)
@@ -5,5 +5,8 @@ class Chain:
     def sleep(self, blocks: int):
         self.blockHeight += blocks
 
+    def fork(self) -> 'Chain':
+        return Chain(self.blockHeight)
+
     def step(self):
         self.blockHeight += 1
@@ -1,5 +1,7 @@
+import copy
 from dataclasses import dataclass
-from typing import Dict, Type, List, Tuple
+import math
+from typing import Dict, Type, List, Tuple, Optional
 
 from curation_sim.pools.chain import Chain
 from curation_sim.pools.primary_pool import PrimaryPool
@@ -24,7 +26,9 @@ class CurationPool(PrimaryPool):
                  share_token_cls: Type[Token] = Token,
                  secondary_pool_cls: Type[SecondaryPool] = SecondaryPool,
                  issuanceRate: float = 0,
-                 valuationMultiple: NUMERIC_t = 1):
+                 valuationMultiple: NUMERIC_t = 1,
+                 secondaryPoolAddress: ADDRESS_t = 'secondaryPool',
+                 rebaseAbove: Optional[float] = None):
 
         """
         :param address: the network address of the curation pool, or any suitable identifier.
@@ -38,8 +42,18 @@ class CurationPool(PrimaryPool):
         :param secondary_pool_cls: the constructor for the secondary pool.
         :param issuanceRate: the issuance rate r at which new reserve tokens are minted.
         :param valuationMultiple: the personal valuation of shares by the curators.
+        :param secondaryPoolAddress: the address of the secondary pool, which must be unique among the pools sharing
+               a reserve token.
+        :param rebaseAbove: if given, shares are counted in a rebasing unit of exp(logShareUnit) shares, so that they
+               stay within float range over long horizons: when a mint would take the share supply above this many
+               units, every share amount held by the pool, its share token and its secondary pool is rescaled so that
+               the total shares come to one unit. Share amounts, including those of buyShares, are then in that unit.
+
+        Amounts and rates are converted to the numeric backend of the reserve token, which the share token shares.
         """
-  
+        number = reserveToken.numeric.number
+        initialDeposits = [(k, number(v)) for k, v in initialDeposits]
+
         if sum(y for _, y in initialDeposits) != reserveToken.balanceOf(address):
             raise AssertionError("CurationPool_constructor: Deposit balances must sum to pools token balance")
 
@@ -48,15 +62,15 @@ class CurationPool(PrimaryPool):
         #   - shares - Intended to track the users primary pool shares
 
         self.snapshots: Dict[ADDRESS_t, PPSnapShot] = {}
-        self.issuanceRate: NUMERIC_t = issuanceRate
-        self.shareToken: Token = share_token_cls(initialShareBalances)
+        self.issuanceRate: NUMERIC_t = number(issuanceRate)
+        self.shareToken: Token = share_token_cls(initialShareBalances, numeric=reserveToken.numeric)
         self.deposits: Dict[ADDRESS_t, NUMERIC_t] = {k: v for k, v in initialDeposits}
         self.chain: Chain = chain
         self.address: ADDRESS_t = address
         self.reserveToken: Token = reserveToken
         self.accRoyaltiesPerShare: NUMERIC_t = 0
         self.secondaryPool: SecondaryPool = secondary_pool_cls(
-            address='secondaryPool',
+            address=secondaryPoolAddress,
             shareToken=self.shareToken,
             reserveToken=reserveToken,
             totalDeposits=self.reserveToken.balanceOf(self.address),
@@ -64,11 +78,35 @@ class CurationPool(PrimaryPool):
 
         # a proxy for what time has passed.
         self.lastMintedBlock = chain.blockHeight
+        # the log of the growth of the total shares by issuance up to the last mint, so that `totalShares` is the share
+        # supply times exp(logIssuanceIndex - mintedLogIndex).
+        self.mintedLogIndex: float = 0.
+        self.rebaseAbove: Optional[float] = rebaseAbove
+        # the log of the number of shares in a unit of share amounts.
+        self.logShareUnit: float = 0.
         # Defines the relationships between total deposits and the total self-assessed value of shares.
         # In theory, it makes sense for this to be related to the opportunity costs of deposits and the
         # ideal turnover rate (according to Weyl).
-        self.valuationMultiple: NUMERIC_t = valuationMultiple
+        self.valuationMultiple: NUMERIC_t = number(valuationMultiple)
   
+    def fork(self, chain: Chain, reserveToken: Token) -> 'CurationPool':
+        """
+        An independent copy of the pool, with its share token and secondary pool, living on another chain and reserve
+        token (eg. copies made with `Chain.fork` and `Token.fork`).
+        """
+        ret = copy.copy(self)
+        ret.chain = chain
+        ret.reserveToken = reserveToken
+        ret.shareToken = self.shareToken.fork()
+        self._forkAccounts(ret)
+        ret.secondaryPool = self.secondaryPool.fork(ret)
+        return ret
+
+    def _forkAccounts(self, ret: 'CurationPool'):
+        # balances are immutable numbers, but snapshots are updated in place by `_claim`, so each one is copied.
+        ret.deposits = dict(self.deposits)
+        ret.snapshots = {k: copy.copy(v) for k, v in self.snapshots.items()}
+
     # Users can deposit reserves, without buying shares. These are principal-protected
     def deposit(self, fromAccount: ADDRESS_t, amount: NUMERIC_t):
         """user deposits an amount of reserve token into the curation pool."""
@@ -118,6 +156,12 @@ class CurationPool(PrimaryPool):
         self.mintShares()
         self.secondaryPool._claim(account)
   
+    # Claims for every depositor at once. Shares are minted once rather than once per account, which matters for
+    # large populations; the result is the same as calling `claim` for each depositor.
+    def claimAll(self):
+        self.mintShares()
+        self.secondaryPool._claimMany(list(self.deposits))
+
     # Claims royalties for a user's shares in the primary pool. Does not touch secondary pool directly
     def _claim(self, account: ADDRESS_t):
 
@@ -157,10 +201,49 @@ class CurationPool(PrimaryPool):
 
     # Mints shares into the secondary pool according to the issuance rate.
     def mintShares(self):
+        logIssuanceIndex = self.logIssuanceIndex
+        if self.rebaseAbove is not None and self.shareToken.totalSupply > 0:
+            logTotalShares = math.log(self.shareToken.totalSupply) + logIssuanceIndex - self.mintedLogIndex
+            if logTotalShares > math.log(self.rebaseAbove):
+                self._rebaseShares(math.exp(-logTotalShares))
+
         sharesToMint = self.totalShares - self.shareToken.totalSupply
         self.shareToken.mint(self.secondaryPool.address, sharesToMint)
         self.secondaryPool._distributeShares(sharesToMint)
         self.lastMintedBlock = self.chain.blockHeight
+        self.mintedLogIndex = logIssuanceIndex
+
+    # Multiplies every share amount by a factor, and divides the share unit by it.
+    def _rebaseShares(self, factor: float):
+        self.shareToken._scaleBalances(factor)
+        self.accRoyaltiesPerShare /= factor
+        self._scaleSnapshots(factor)
+        self.secondaryPool._rebaseShares(factor)
+        self.logShareUnit -= math.log(factor)
+
+    def _scaleSnapshots(self, factor: float):
+        for snapshot in self.snapshots.values():
+            snapshot.shares *= factor
+            snapshot.accRoyaltiesPerShare /= factor
+
+    # Shares that `claim(account)` would transfer, including shares issued since the last mint.
+    def pendingSharesOf(self, account: ADDRESS_t):
+        return self.secondaryPool.pendingSharesOf(account, self.totalShares - self.shareToken.totalSupply)
+
+    # Royalties that `claim(account)` would transfer from the secondary pool.
+    def pendingRoyaltiesOf(self, account: ADDRESS_t):
+        return self.secondaryPool.pendingRoyaltiesOf(account)
+
+    # The share balance an account would hold right after claiming, without claiming.
+    def effectiveShareBalanceOf(self, account: ADDRESS_t):
+        return self.shareToken.balanceOf(account) + self.pendingSharesOf(account)
+
+    def effectiveShareBalances(self) -> Dict[ADDRESS_t, NUMERIC_t]:
+        """effective share balances of every share holder and depositor, excluding the secondary pool itself."""
+        accounts = dict.fromkeys(self.shareToken.balances)
+        accounts.update(dict.fromkeys(self.deposits))
+        accounts.pop(self.secondaryPool.address, None)
+        return {a: self.effectiveShareBalanceOf(a) for a in accounts}
 
     def snapshotsOf(self, account: ADDRESS_t):
         return self.snapshots.get(account, PPSnapShot(shares=self.shareToken.balanceOf(account),
@@ -169,6 +252,14 @@ class CurationPool(PrimaryPool):
     def depositOf(self, account: ADDRESS_t):
         return self.deposits.get(account, 0)
 
+    # The log of the growth of the total shares by issuance since the pool was created. Advancing the chain only
+    # advances this index; nothing is minted until the next claim.
+    @property
+    def logIssuanceIndex(self) -> float:
+        return self.mintedLogIndex + (self.chain.blockHeight - self.lastMintedBlock) * math.log1p(self.issuanceRate)
+
     @property
     def totalShares(self):
+        if self.rebaseAbove is not None:
+            return self.shareToken.totalSupply * math.exp(self.logIssuanceIndex - self.mintedLogIndex)
         return self.shareToken.totalSupply * (1 + self.issuanceRate)**(self.chain.blockHeight - self.lastMintedBlock)
@@ -0,0 +1,183 @@
+"""
+Numeric backends for token and pool arithmetic. FLOAT, the default, keeps balances as the Python numbers they are
+given as, ints and floats alike, and rounds away the small shortfalls that float arithmetic produces. FIXED18 keeps
+them as Wads: integer counts of 10**-18 of a token, as GRT is accounted on chain. Every product and quotient of Wads is
+rounded down to the nearest unit, so simulations are exact, deterministic across machines and comparable bit for bit,
+at the cost of slower arithmetic.
+
+A backend is chosen per token, eg. `Token(balances, numeric=FIXED18)`; pools take the backend of their reserve token,
+converting their initial deposits and rates with it. Amounts passed to actions should be numbers of the backend
+(`FIXED18.number(10.5)`); a float meeting a Wad is converted rather than rejected, but is only as exact as its decimal
+representation.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from fractions import Fraction
+import numbers
+from typing import Any, Callable
+
+import numpy as np
+
+# the number of units in one token.
+WAD: int = 10**18
+
+
+class Wad:
+    """
+    An 18-decimal fixed-point number, stored as the integer number of 10**-18 units. Arithmetic and comparisons with
+    other Wads, ints and floats give Wads; an int or float operand is a number of whole tokens, converted first.
+    """
+    __slots__ = ('wei',)
+
+    def __init__(self, wei: int):
+        self.wei: int = wei
+
+    @classmethod
+    def from_number(cls, x) -> 'Wad':
+        """a Wad of the value of an int, a float (through its shortest decimal representation), a string or a Wad."""
+        if isinstance(x, Wad):
+            return x
+        if isinstance(x, numbers.Integral):
+            return cls(int(x) * WAD)
+        if isinstance(x, numbers.Real):
+            return cls(int(Decimal(repr(float(x))) * WAD))
+        if isinstance(x, str):
+            return cls(int(Decimal(x) * WAD))
+        raise TypeError(f'cannot convert {type(x).__name__} to Wad')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __float__(self) -> float:
+        return self.wei / WAD
+
+    def __bool__(self) -> bool:
+        return self.wei != 0
+
+    def __hash__(self):
+        return hash(Fraction(self.wei, WAD))
+
+    def __repr__(self):
+        return f"Wad('{self}')"
+
+    def __str__(self):
+        return str(Decimal(self.wei).scaleb(-18).normalize())
+
+    def __format__(self, spec: str) -> str:
+        return format(float(self), spec) if spec else str(self)
+
+    def __neg__(self) -> 'Wad':
+        return Wad(-self.wei)
+
+    def __pos__(self) -> 'Wad':
+        return self
+
+    def __abs__(self) -> 'Wad':
+        return Wad(abs(self.wei))
+
+    def __add__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(self.wei + other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(self.wei - other)
+
+    def __rsub__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(other - self.wei)
+
+    def __mul__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(self.wei * other // WAD)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(self.wei * WAD // other)
+
+    def __rtruediv__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else Wad(other * WAD // self.wei)
+
+    def __pow__(self, n):
+        """
+        Integer powers are computed by repeated squaring in fixed point, rounding every product down, so that
+        compounding eg. an issuance rate over many blocks stays exact and deterministic. Other powers go through floats.
+        """
+        if isinstance(n, numbers.Integral) and n >= 0:
+            x, z, n = self.wei, WAD, int(n)
+            while n:
+                if n & 1:
+                    z = z * x // WAD
+                x = x * x // WAD
+                n >>= 1
+            return Wad(z)
+        if isinstance(n, numbers.Real):
+            return Wad.from_number(float(self) ** float(n))
+        return NotImplemented
+
+    def __eq__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else self.wei == other
+
+    def __lt__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else self.wei < other
+
+    def __le__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else self.wei <= other
+
+    def __gt__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else self.wei > other
+
+    def __ge__(self, other):
+        other = _wei(other)
+        return NotImplemented if other is None else self.wei >= other
+
+
+def _wei(x):
+    """the units of an operand of Wad arithmetic, or None if it is not a number (eg. an array, which then applies
+    the operation element by element)."""
+    t = type(x)
+    if t is Wad:
+        return x.wei
+    if t is int:
+        return x * WAD
+    if isinstance(x, (numbers.Real, Wad)):
+        return Wad.from_number(x).wei
+    return None
+
+
+def _as_is(x):
+    return x
+
+
+@dataclass(frozen=True)
+class NumericBackend:
+    name: str
+    # converts an int or a float into a number of the backend.
+    number: Callable[[Any], Any]
+    # the dtype of per-account arrays in the array engine.
+    dtype: Any
+    # transfers exceeding the sender's balance by less than this are rounded down to the balance.
+    tolerance: Any
+    # a balance left negative by a transfer by less than this fraction of the amount is clamped to zero.
+    relative_tolerance: float
+
+
+FLOAT = NumericBackend(name='float', number=_as_is, dtype=np.float64, tolerance=1e-5, relative_tolerance=1e-10)
+# Wads overflow int64 above 9.2 tokens, so arrays of them hold Python objects.
+FIXED18 = NumericBackend(name='fixed18', number=Wad.from_number, dtype=object, tolerance=Wad(0),
+                         relative_tolerance=0.)
+
+# the backends by name, eg. to restore the backend of a checkpoint.
+BACKENDS = {b.name: b for b in (FLOAT, FIXED18)}
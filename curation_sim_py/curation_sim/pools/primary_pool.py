@@ -36,3 +36,15 @@ class PrimaryPool(ABC):
     @abstractmethod
     def depositOf(self, account: ADDRESS_t):
         pass
+
+    @abstractmethod
+    def pendingSharesOf(self, account: ADDRESS_t):
+        pass
+
+    @abstractmethod
+    def pendingRoyaltiesOf(self, account: ADDRESS_t):
+        pass
+
+    @abstractmethod
+    def effectiveShareBalanceOf(self, account: ADDRESS_t):
+        pass
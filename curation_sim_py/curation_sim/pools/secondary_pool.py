@@ -1,5 +1,6 @@
+import copy
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterable
 
 from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
 from curation_sim.pools.token import Token
@@ -35,6 +36,28 @@ class SecondaryPool:
         self.totalDeposits: NUMERIC_t = totalDeposits
         self.primaryPool: PrimaryPool = primaryPool
   
+    def fork(self, primaryPool: PrimaryPool) -> 'SecondaryPool':
+        """an independent copy of the pool, belonging to a fork of its primary pool."""
+        ret = copy.copy(self)
+        ret.primaryPool = primaryPool
+        ret.shareToken = primaryPool.shareToken
+        ret.reserveToken = primaryPool.reserveToken
+        self._forkAccounts(ret)
+        return ret
+
+    def _forkAccounts(self, ret: 'SecondaryPool'):
+        # snapshots are always replaced, never updated in place, so they can be shared.
+        ret.snapshots = dict(self.snapshots)
+
+    # Multiplies every share amount by a factor, as the primary pool rebases its share unit.
+    def _rebaseShares(self, factor: float):
+        self.accSharesPerDeposit *= factor
+        self.accShares *= factor
+        self.snapshots = {k: SPSnapShot(accSharesPerDeposit=v.accSharesPerDeposit * factor,
+                                        accRoyaltiesPerDeposit=v.accRoyaltiesPerDeposit,
+                                        deposit=v.deposit)
+                          for k, v in self.snapshots.items()}
+
     # Updates deposits without claiming accumulated royalties or shares
     def _updateDeposit(self, account: ADDRESS_t, amount: NUMERIC_t):
         prevDeposit = self.snapshotOf(account).deposit
@@ -72,7 +95,28 @@ class SecondaryPool:
             accRoyaltiesPerDeposit=self.accRoyaltiesPerDeposit,
             deposit=prevSnapshot.deposit)
         self.snapshots[account] = newSnapshot
+
+    # Claims for many accounts, as if `_claim` were called for each in turn.
+    def _claimMany(self, accounts: Iterable[ADDRESS_t]):
+        for account in accounts:
+            self._claim(account)
   
+    # Read-only views of what `_claim` would pay out, computed from the accumulators without touching any state.
+    # `undistributedShares` are shares issued by the primary pool but not yet minted into this pool.
+    def pendingSharesOf(self, account: ADDRESS_t, undistributedShares: NUMERIC_t = 0):
+        snapshot = self.snapshotOf(account)
+        accSharesPerDeposit = self.accSharesPerDeposit
+        if undistributedShares and self.totalDeposits > 0:
+            accSharesPerDeposit += (undistributedShares/self.totalDeposits)
+        return (accSharesPerDeposit - snapshot.accSharesPerDeposit) * snapshot.deposit
+
+    def pendingRoyaltiesOf(self, account: ADDRESS_t):
+        snapshot = self.snapshotOf(account)
+        return (self.accRoyaltiesPerDeposit - snapshot.accRoyaltiesPerDeposit) * snapshot.deposit
+
+    def effectiveShareBalanceOf(self, account: ADDRESS_t, undistributedShares: NUMERIC_t = 0):
+        return self.shareToken.balanceOf(account) + self.pendingSharesOf(account, undistributedShares)
+
     def snapshotOf(self, account: ADDRESS_t):
         # This accounts for users that haven't been snapshotted but had a genesis deposit or have never had a deposit
         return self.snapshots.get(account,
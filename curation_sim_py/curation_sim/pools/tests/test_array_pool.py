@@ -0,0 +1,107 @@
+import copy
+import unittest
+
+import numpy as np
+
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import Action, State, simulate3
+
+NUM_CURATORS = 5
+
+
+def _build_state(pool_cls, token_cls):
+    deposits = [('whale', 0)] + [(f'curator{i}', 1_000 * (i + 1)) for i in range(NUM_CURATORS)]
+    reserve = token_cls({'curationPool': sum(v for _, v in deposits),
+                         'whale': 100_000,
+                         'buyer': 100_000,
+                         **{f'curator{i}': 500 for i in range(NUM_CURATORS)}})
+    chain = Chain()
+    pool = pool_cls(address='curationPool',
+                    initialShareBalances={k: v for k, v in deposits},
+                    initialDeposits=deposits,
+                    chain=chain,
+                    reserveToken=reserve,
+                    issuanceRate=1e-4)
+    return State(chain, reserve, pool)
+
+
+def _actions():
+    actions = []
+    for t in range(30):
+        if t == 5:
+            actions.append(Action(action_type='DEPOSIT', target='curationPool', args=['whale', 20_000]))
+        if t == 10:
+            actions.append(Action(action_type='BUY_SHARES', target='curationPool', args=['buyer', 500]))
+        if t == 20:
+            actions.append(Action(action_type='WITHDRAW', target='curationPool', args=['whale', 15_000]))
+        for i in range(NUM_CURATORS):
+            actions.append(Action(action_type='CLAIM', target='curationPool', args=[f'curator{i}']))
+        actions.append(Action(action_type='CLAIM', target='curationPool', args=['whale']))
+        actions.append(Action(action_type='SLEEP', target='chain', args=[100]))
+    return actions
+
+
+def _record(state):
+    return {'shareBalances': copy.deepcopy(state.curationPool.shareToken.balances),
+            'depositBalances': copy.deepcopy(state.curationPool.deposits),
+            'reserveBalances': copy.deepcopy(state.reserveToken.balances),
+            'secondaryPoolTotalDeposits': state.curationPool.secondaryPool.totalDeposits}
+
+
+class TestArrayCurationPool(unittest.TestCase):
+
+    def test_matches_dict_engine(self):
+        expected = simulate3(_actions(), _build_state(CurationPool, Token), _record)
+        actual = simulate3(_actions(), _build_state(ArrayCurationPool, ArrayToken), _record)
+
+        self.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            self.assertAlmostEqual(e['state']['secondaryPoolTotalDeposits'],
+                                   a['state']['secondaryPoolTotalDeposits'])
+            for key in ('shareBalances', 'depositBalances', 'reserveBalances'):
+                self.assertIsInstance(a['state'][key], dict)
+                self.assertEqual(set(e['state'][key]), set(a['state'][key]))
+                for account, value in e['state'][key].items():
+                    self.assertTrue(np.isclose(value, a['state'][key][account], rtol=1e-12), (key, account))
+
+    def test_dict_reserve_token(self):
+        expected = _build_state(CurationPool, Token)
+        actual = _build_state(ArrayCurationPool, Token)
+        simulate3(_actions(), expected, lambda s: {})
+        simulate3(_actions(), actual, lambda s: {})
+
+        for i in range(NUM_CURATORS):
+            self.assertAlmostEqual(expected.curationPool.shareToken.balanceOf(f'curator{i}'),
+                                   actual.curationPool.shareToken.balanceOf(f'curator{i}'))
+
+    def test_bulk_views(self):
+        state = _build_state(ArrayCurationPool, ArrayToken)
+        accounts = [f'curator{i}' for i in range(NUM_CURATORS)] + ['nobody']
+
+        np.testing.assert_array_equal(state.curationPool.depositsOf(accounts),
+                                      [1_000 * (i + 1) for i in range(NUM_CURATORS)] + [0])
+        np.testing.assert_array_equal(state.curationPool.shareToken.balancesOf(accounts),
+                                      [1_000 * (i + 1) for i in range(NUM_CURATORS)] + [0])
+        self.assertNotIn('nobody', state.curationPool.accounts)
+
+    def test_large_population(self):
+        n = 100_000
+        deposits = [(f'curator{i}', 10.0) for i in range(n)]
+        chain = Chain()
+        reserve = ArrayToken({'curationPool': 10.0 * n})
+        pool = ArrayCurationPool(address='curationPool',
+                                 initialShareBalances={k: v for k, v in deposits},
+                                 initialDeposits=deposits,
+                                 chain=chain,
+                                 reserveToken=reserve,
+                                 issuanceRate=1e-4)
+        chain.sleep(100)
+        pool.claim('curator7')
+
+        self.assertEqual(len(pool.deposits), n)
+        self.assertGreater(pool.shareToken.balanceOf('curator7'), 10.0)
+        self.assertEqual(pool.shareToken.balanceOf('curator8'), 10.0)
@@ -0,0 +1,119 @@
+import math
+import unittest
+
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+
+
+def _build_pool(pool_cls=CurationPool, token_cls=Token, **kwargs):
+    deposits = [('curator0', 1_000), ('curator1', 3_000)]
+    reserve = token_cls({'curationPool': 4_000, 'curator2': 2_000, 'buyer': 10_000})
+    chain = Chain()
+    pool = pool_cls(address='curationPool',
+                    initialShareBalances={k: v for k, v in deposits},
+                    initialDeposits=deposits,
+                    chain=chain,
+                    reserveToken=reserve,
+                    issuanceRate=1e-4,
+                    **kwargs)
+    return chain, pool
+
+
+class TestPendingViews(unittest.TestCase):
+
+    def _check_views_match_claim(self, pool_cls, token_cls):
+        chain, pool = _build_pool(pool_cls, token_cls)
+        chain.sleep(500)
+        pool.deposit('curator2', 2_000)
+        pool.buyShares('buyer', 100)
+        chain.sleep(1_000)
+
+        for account in ('curator0', 'curator1', 'curator2', 'buyer', 'nobody'):
+            pendingShares = pool.pendingSharesOf(account)
+            pendingRoyalties = pool.pendingRoyaltiesOf(account)
+            effective = pool.effectiveShareBalanceOf(account)
+            shares = pool.shareToken.balanceOf(account)
+            royalties = pool.reserveToken.balanceOf(account)
+
+            pool.claim(account)
+
+            self.assertAlmostEqual(pool.shareToken.balanceOf(account) - shares, pendingShares)
+            self.assertAlmostEqual(pool.reserveToken.balanceOf(account) - royalties, pendingRoyalties)
+            self.assertAlmostEqual(pool.shareToken.balanceOf(account), effective)
+            self.assertAlmostEqual(pool.pendingSharesOf(account), 0)
+
+    def test_views_match_claim(self):
+        self._check_views_match_claim(CurationPool, Token)
+
+    def test_views_match_claim_array_engine(self):
+        self._check_views_match_claim(ArrayCurationPool, ArrayToken)
+
+    def test_views_do_not_mutate(self):
+        chain, pool = _build_pool()
+        chain.sleep(1_000)
+        supply = pool.shareToken.totalSupply
+
+        self.assertGreater(pool.pendingSharesOf('curator0'), 0)
+        self.assertEqual(pool.shareToken.totalSupply, supply)
+        self.assertEqual(pool.secondaryPool.snapshots, {})
+
+    def test_effective_balances(self):
+        chain, pool = _build_pool()
+        _, array_pool = _build_pool(ArrayCurationPool, ArrayToken)
+        array_pool.chain = chain
+        chain.sleep(1_000)
+
+        expected = pool.effectiveShareBalances()
+        actual = array_pool.effectiveShareBalances()
+
+        self.assertEqual(set(expected), {'curator0', 'curator1'})
+        self.assertEqual(set(expected), set(actual))
+        for k, v in expected.items():
+            self.assertAlmostEqual(v, actual[k])
+        self.assertAlmostEqual(sum(expected.values()), pool.totalShares)
+
+
+class TestRebasing(unittest.TestCase):
+
+    def _run(self, chain, pool, periods):
+        for t in range(periods):
+            chain.sleep(1_000)
+            pool.claim('curator0')
+            if t % 3 == 0:
+                pool.buyShares('buyer', pool.totalShares * 1e-3)
+            if t % 4 == 0 and pool.reserveToken.balanceOf('curator2') >= 10:
+                pool.deposit('curator2', 10)
+        for account in ('curator0', 'curator1', 'curator2', 'buyer'):
+            pool.claim(account)
+
+    def _check_matches_plain_pool(self, pool_cls, token_cls):
+        chain, plain = _build_pool(pool_cls, token_cls)
+        self._run(chain, plain, 30)
+        chain, rebasing = _build_pool(pool_cls, token_cls, rebaseAbove=1e4)
+        self._run(chain, rebasing, 30)
+
+        self.assertGreater(rebasing.logShareUnit, 0)
+        self.assertAlmostEqual(rebasing.logIssuanceIndex, 30_000 * math.log1p(1e-4))
+        self.assertAlmostEqual(math.log(rebasing.totalShares) + rebasing.logShareUnit, math.log(plain.totalShares))
+        for account in ('curator0', 'curator1', 'curator2', 'buyer', 'secondaryPool'):
+            self.assertAlmostEqual(rebasing.shareToken.balanceOf(account) / rebasing.totalShares,
+                                   plain.shareToken.balanceOf(account) / plain.totalShares)
+            self.assertAlmostEqual(rebasing.reserveToken.balanceOf(account), plain.reserveToken.balanceOf(account))
+
+    def test_matches_plain_pool(self):
+        self._check_matches_plain_pool(CurationPool, Token)
+
+    def test_matches_plain_pool_array_engine(self):
+        self._check_matches_plain_pool(ArrayCurationPool, ArrayToken)
+
+    def test_long_horizon(self):
+        # the share supply of a plain pool would grow by a factor of e**1000, beyond the range of floats.
+        chain, pool = _build_pool(rebaseAbove=1e6)
+        pool.issuanceRate = 1e-3
+        self._run(chain, pool, 1_000)
+        self.assertGreater(pool.logShareUnit, 900)
+        self.assertLess(pool.totalShares, 1e6)
+        self.assertAlmostEqual(sum(pool.shareToken.balances.values()), pool.totalShares)
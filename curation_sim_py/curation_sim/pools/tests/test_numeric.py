@@ -0,0 +1,97 @@
+import copy
+from fractions import Fraction
+import unittest
+
+import numpy as np
+
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.numeric import FIXED18, FLOAT, WAD, Wad
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import simulate3
+
+
+class TestWad(unittest.TestCase):
+
+    def test_conversion(self):
+        self.assertEqual(Wad.from_number(0.1).wei, 10**17)
+        self.assertEqual(Wad.from_number(3).wei, 3 * WAD)
+        self.assertEqual(Wad.from_number('1.000000000000000001').wei, WAD + 1)
+        self.assertEqual(str(Wad.from_number(2.5)), '2.5')
+        self.assertEqual(float(Wad.from_number(2.5)), 2.5)
+
+    def test_arithmetic(self):
+        a, b = Wad.from_number(0.1), Wad.from_number(0.2)
+        self.assertEqual(a + b, Wad.from_number(0.3))
+        self.assertEqual(a + b, 0.3)
+        self.assertEqual(0 + a, a)
+        self.assertEqual(1.5 - a, Wad.from_number(1.4))
+        self.assertEqual(a * 3, Wad.from_number(0.3))
+        # quotients round down to the unit.
+        self.assertEqual((Wad.from_number(1) / 3).wei, WAD // 3)
+        self.assertEqual(2 / Wad.from_number(4), 0.5)
+        self.assertTrue(a < b < 1)
+        self.assertEqual(hash(Wad.from_number(2)), hash(2))
+
+    def test_pow(self):
+        rate = 1 + Wad.from_number(1e-4)
+        # every product rounds down, so the power falls short of the exact one by a few units.
+        shortfall = Fraction(rate.wei, WAD) ** 37 * WAD - (rate ** 37).wei
+        self.assertTrue(0 <= shortfall < 20)
+        self.assertAlmostEqual(float(rate ** 100_000), 1.0001 ** 100_000, delta=1e-9 * 1.0001 ** 100_000)
+
+    def test_arrays(self):
+        column = np.array([Wad.from_number(1), Wad.from_number(2)], dtype=object)
+        self.assertEqual(column.sum(), 3)
+        self.assertEqual((Wad.from_number(1) - column).tolist(), [0, -1])
+        self.assertEqual(type((column * 2)[0]), Wad)
+
+
+class TestFloat(unittest.TestCase):
+
+    def test_as_given(self):
+        # the default backend leaves ints as ints, as before backends existed.
+        self.assertEqual(Token({'a': 2**60 + 1}).balanceOf('a'), 2**60 + 1)
+        self.assertIs(type(FLOAT.number(3)), int)
+
+
+class TestFixedPointTokens(unittest.TestCase):
+
+    def test_exact_transfers(self):
+        for token_cls in (Token, ArrayToken):
+            token = token_cls({'a': 1, 'b': 0}, numeric=FIXED18)
+            tenth = FIXED18.number(0.1)
+            for _ in range(10):
+                token.transfer('a', 'b', tenth)
+            self.assertEqual(token.balanceOf('a'), 0)
+            self.assertEqual(token.balanceOf('b').wei, WAD)
+            self.assertEqual(token.totalSupply, 1)
+
+    def test_simulation(self):
+        workload = Workload(num_curators=30, periods=40, mix={'DEPOSIT': .1, 'WITHDRAW': .1, 'CLAIM': .1,
+                                                              'BUY_SHARES': .5})
+        float_state = workload.state()
+        simulate3(workload.actions(), float_state)
+
+        states = []
+        for pool_cls, token_cls in ((None, Token), (ArrayCurationPool, ArrayToken)):
+            state = (workload.state(token_cls=token_cls, numeric=FIXED18) if pool_cls is None
+                     else workload.state(pool_cls, token_cls, FIXED18))
+            simulate3(workload.actions(FIXED18), state)
+            states.append(state)
+
+        # both engines agree to the unit, and with floats to float precision.
+        fixed, array_fixed = states
+        for curator in workload.curators:
+            share_balance = fixed.curationPool.shareToken.balanceOf(curator)
+            self.assertIs(type(share_balance), Wad)
+            self.assertEqual(share_balance, array_fixed.curationPool.shareToken.balanceOf(curator))
+            self.assertEqual(fixed.reserveToken.balanceOf(curator), array_fixed.reserveToken.balanceOf(curator))
+            self.assertAlmostEqual(float(share_balance), float_state.curationPool.shareToken.balanceOf(curator),
+                                   places=6)
+        self.assertEqual(copy.deepcopy(fixed.curationPool.totalShares), array_fixed.curationPool.totalShares)
+
+
+if __name__ == '__main__':
+    unittest.main()
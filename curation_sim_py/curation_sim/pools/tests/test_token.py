@@ -1,7 +1,10 @@
 import copy
 import unittest
 
-from curation_sim.pools.token import Context, update_context
+import numpy as np
+
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.token import Context, Token, update_context
 
 
 class TestUpdateContext(unittest.TestCase):
@@ -14,3 +17,54 @@ class TestUpdateContext(unittest.TestCase):
 
         self.assertEqual(ctx, old_ctx)
         self.assertEqual(new_ctx.toAccount, 10)
+
+
+class TestFastPath(unittest.TestCase):
+
+    def _tokens(self):
+        fast = Token({'a': 10., 'b': 5.})
+        hooked = Token({'a': 10., 'b': 5.})
+        hooked.registerHooks(postTransfer=[lambda ctx: None])
+        return fast, hooked
+
+    def test_hooks_select_path(self):
+        token = Token({'a': 1})
+        self.assertIsNone(token.transfer('a', 'b', 1))
+
+        hook = lambda ctx: None
+        token.registerHooks(preMint=[hook])
+        self.assertIsInstance(token.mint('a', 1), Context)
+        token.unregisterHooks(preMint=[hook])
+        self.assertIsNone(token.mint('a', 1))
+
+    def test_paths_agree(self):
+        for token_cls in (Token, ArrayToken):
+            fast, hooked = token_cls({'a': 10., 'b': 5.}), token_cls({'a': 10., 'b': 5.})
+            hooked.registerHooks(postTransfer=[lambda ctx: None], postMint=[lambda ctx: None],
+                                 postBurn=[lambda ctx: None])
+            for token in (fast, hooked):
+                token.transfer('a', 'b', 4.)
+                # shortfalls below the rounding tolerance transfer the whole balance.
+                token.transfer('a', 'c', 6. + 1e-6)
+                token.mint('d', 3.)
+                token.burn('b', 2.)
+            self.assertEqual(dict(fast.balances), dict(hooked.balances))
+            self.assertEqual(fast.totalSupply, hooked.totalSupply)
+            self.assertEqual(fast.balanceOf('a'), 0)
+
+    def test_batched_transfers(self):
+        # a batch absorbs the rounding shortfall each of its transfers could, and no more.
+        token = ArrayToken({'a': 10.})
+        token._applyTransfers('a', ['b', 'c', 'd'], np.array([4., 3., 3. + 2.5e-5]))
+        self.assertEqual(token.balanceOf('a'), 0)
+        self.assertEqual(token.balanceOf('d'), 3. + 2.5e-5)
+        token = ArrayToken({'a': 10.})
+        with self.assertRaises(AssertionError):
+            token._applyTransfers('a', ['b', 'c'], np.array([5., 5. + 2.5e-5]))
+
+    def test_errors(self):
+        for token in self._tokens():
+            with self.assertRaises(RuntimeError):
+                token.transfer('a', 'b', 11.)
+            with self.assertRaises(AssertionError):
+                token.burn('b', 6.)
@@ -2,6 +2,7 @@ import copy
 import logging
 from typing import Dict
 
+from curation_sim.pools.numeric import FLOAT, NumericBackend
 from curation_sim.pools.utils import Context, ADDRESS_t, NUMERIC_t
 
 _log = logging.Logger(__name__)
@@ -18,8 +19,17 @@ def update_context(context, **kwargs):
 
 
 class Token:
-    def __init__(self, initialBalances: Dict[ADDRESS_t, NUMERIC_t]):
-        self.balances: Dict[ADDRESS_t, NUMERIC_t] = copy.deepcopy(initialBalances)
+    """
+    Tokens without hooks take a fast path: transfer, mint and burn update balances directly, without building or
+    copying a Context. Registering any hook switches the token to the full pre/validate/execute/post pipeline, which
+    is the only path that returns the Context. Both paths apply balance changes through `_applyTransfer`,
+    `_applyMint` and `_applyBurn`, which are what storage-specific subclasses override.
+
+    Balances are numbers of the token's numeric backend (see `curation_sim.pools.numeric`), floats by default.
+    """
+    def __init__(self, initialBalances: Dict[ADDRESS_t, NUMERIC_t], numeric: NumericBackend = FLOAT):
+        self.numeric: NumericBackend = numeric
+        self.balances: Dict[ADDRESS_t, NUMERIC_t] = {k: numeric.number(v) for k, v in initialBalances.items()}
         self.totalSupply: NUMERIC_t = self._computeTotalSupply()
         self.hooks = {'preTransfer': [],
                       'postTransfer': [],
@@ -27,6 +37,7 @@ class Token:
                       'postMint': [],
                       'preBurn': [],
                       'postBurn': []}
+        self._hooked: bool = False
   
     def registerHooks(self,
                       preTransfer=None,
@@ -48,6 +59,43 @@ class Token:
         self.hooks['postMint'] += postMint
         self.hooks['preBurn'] += preBurn
         self.hooks['postBurn'] += postBurn
+        self._hooked = any(self.hooks.values())
+
+    def unregisterHooks(self,
+                        preTransfer=None,
+                        postTransfer=None,
+                        preMint=None,
+                        postMint=None,
+                        preBurn=None,
+                        postBurn=None):
+        for name, hooks in (('preTransfer', preTransfer),
+                            ('postTransfer', postTransfer),
+                            ('preMint', preMint),
+                            ('postMint', postMint),
+                            ('preBurn', preBurn),
+                            ('postBurn', postBurn)):
+            for hook in ([] if hooks is None else hooks):
+                self.hooks[name].remove(hook)
+        self._hooked = any(self.hooks.values())
+
+    def fork(self) -> 'Token':
+        """
+        An independent copy of the token. Hooks belong to whoever registered them on this token, so the copy starts
+        without any.
+        """
+        ret = copy.copy(self)
+        ret.hooks = {k: [] for k in self.hooks}
+        ret._hooked = False
+        self._forkBalances(ret)
+        return ret
+
+    def _forkBalances(self, ret: 'Token'):
+        ret.balances = dict(self.balances)
+
+    def _scaleBalances(self, factor: NUMERIC_t):
+        """multiplies every balance, and the supply, by a factor; for pools that rebase their share unit."""
+        self.balances = {k: v * factor for k, v in self.balances.items()}
+        self.totalSupply *= factor
 
     def _computeTotalSupply(self):
         return sum(self.balances.values())
@@ -61,7 +109,8 @@ class Token:
         senderInitialBalance = context.senderInitialBalance
         amount = context.amount
         if senderInitialBalance < amount:
-            if (amount-senderInitialBalance) < 1e-5:  # // This addresses some Javascript math imprecision
+            # // This addresses some Javascript math imprecision
+            if (amount-senderInitialBalance) < self.numeric.tolerance:
                 _log.info("Token_transfer: Rounding down amount to address precision issues")
                 _log.info(context)
                 amount = senderInitialBalance
@@ -72,17 +121,25 @@ class Token:
 
         return update_context(context, amount=amount)
 
-    def _executeTransfer(self, context: Context):
-        self.balances[context.fromAccount] = context.senderInitialBalance - context.amount
-        if self.balances[context.fromAccount] < 0:
-            if abs(self.balances[context.fromAccount] / context.amount) < 1e-10:
-                self.balances[context.fromAccount] = 0
+    def _applyTransfer(self,
+                       fromAccount: ADDRESS_t,
+                       toAccount: ADDRESS_t,
+                       amount: NUMERIC_t,
+                       senderInitialBalance: NUMERIC_t,
+                       receiverInitialBalance: NUMERIC_t):
+        self.balances[fromAccount] = senderInitialBalance - amount
+        if self.balances[fromAccount] < 0:
+            if abs(self.balances[fromAccount] / amount) < self.numeric.relative_tolerance:
+                self.balances[fromAccount] = 0
             else:
                 raise
 
-        self.balances[context.toAccount] = context.receiverInitialBalance + context.amount
-        assert self.balances[context.toAccount] >= 0
+        self.balances[toAccount] = receiverInitialBalance + amount
+        assert self.balances[toAccount] >= 0
 
+    def _executeTransfer(self, context: Context):
+        self._applyTransfer(context.fromAccount, context.toAccount, context.amount,
+                            context.senderInitialBalance, context.receiverInitialBalance)
         return context
 
     def _postTransfer(self, context: Context):
@@ -94,6 +151,16 @@ class Token:
         senderInitialBalance = self.balanceOf(fromAccount)
         receiverInitialBalance = self.balanceOf(toAccount)
 
+        if not self._hooked:
+            if senderInitialBalance < amount:
+                amount = self._validateTransfer(Context(fromAccount=fromAccount,
+                                                        toAccount=toAccount,
+                                                        amount=amount,
+                                                        senderInitialBalance=senderInitialBalance,
+                                                        receiverInitialBalance=receiverInitialBalance)).amount
+            self._applyTransfer(fromAccount, toAccount, amount, senderInitialBalance, receiverInitialBalance)
+            return
+
         ctx = self._preTransfer(Context(fromAccount=fromAccount,
                                         toAccount=toAccount,
                                         amount=amount,
@@ -109,9 +176,12 @@ class Token:
             hook(context)
         return context
 
+    def _applyMint(self, toAccount: ADDRESS_t, amount: NUMERIC_t, receiverInitialBalance: NUMERIC_t):
+        self.balances[toAccount] = receiverInitialBalance + amount
+        self.totalSupply += amount
+
     def _executeMint(self, context: Context):
-        self.balances[context.toAccount] = context.receiverInitialBalance + context.amount
-        self.totalSupply += context.amount
+        self._applyMint(context.toAccount, context.amount, context.receiverInitialBalance)
         return context
 
     def _postMint(self, context: Context):
@@ -121,6 +191,10 @@ class Token:
 
     def mint(self, toAccount: ADDRESS_t, amount):
         receiverInitialBalance = self.balanceOf(toAccount)
+        if not self._hooked:
+            self._applyMint(toAccount, amount, receiverInitialBalance)
+            return
+
         ctx = self._preMint(update_context(EMPTY_CONTEXT,
                                            toAccount=toAccount,
                                            amount=amount,
@@ -138,13 +212,15 @@ class Token:
             raise AssertionError("Token_burn: Sender has insufficient funds")
         return context
 
-    def _executeBurn(self, context: Context):
-        self.balances[context.fromAccount] = context.senderInitialBalance - context.amount
-        assert self.balances[context.fromAccount] >= 0
+    def _applyBurn(self, fromAccount: ADDRESS_t, amount: NUMERIC_t, senderInitialBalance: NUMERIC_t):
+        self.balances[fromAccount] = senderInitialBalance - amount
+        assert self.balances[fromAccount] >= 0
 
-        self.totalSupply -= context.amount
+        self.totalSupply -= amount
         assert self.totalSupply >= 0
 
+    def _executeBurn(self, context: Context):
+        self._applyBurn(context.fromAccount, context.amount, context.senderInitialBalance)
         return context
 
     def _postBurn(self, context: Context):
@@ -154,6 +230,11 @@ class Token:
 
     def burn(self, fromAccount: ADDRESS_t, amount: NUMERIC_t):
         senderInitialBalance = self.balanceOf(fromAccount)
+        if not self._hooked:
+            if senderInitialBalance < amount:
+                raise AssertionError("Token_burn: Sender has insufficient funds")
+            self._applyBurn(fromAccount, amount, senderInitialBalance)
+            return
 
         ctx = self._preBurn(update_context(EMPTY_CONTEXT,
                                            fromAccount=fromAccount,
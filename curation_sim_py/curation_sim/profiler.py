@@ -0,0 +1,199 @@
+"""
+Opt-in profiling of a simulation. A Profiler passed to `simulate3` times every action by action type, times and
+counts the internal methods of the pools and tokens that the actions go through, and counts deep copies, transfers,
+mints and burns. Instrumentation is installed on the instances of the state when the run starts (and on
+`copy.deepcopy`) and removed when it ends, so the classes are untouched and a run without a profiler pays nothing.
+
+Method times are inclusive: the time of `curationPool.claim` includes that of `curationPool.mintShares`. With
+`memory=True`, the bytes of an action type (and of recordState) are the peak memory allocated while it ran, summed
+over calls, as traced by tracemalloc; tracing slows everything down, so compare timings of runs without it.
+"""
+import copy
+from dataclasses import asdict, dataclass
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# the methods instrumented on each component of the state, given as dotted attribute paths from the state.
+PROFILED_METHODS: Dict[str, Tuple[str, ...]] = {
+    'curationPool': ('deposit', 'withdraw', 'buyShares', 'claim', 'claimAll', 'mintShares', '_claim',
+                     'distributeRoyalties'),
+    'curationPool.secondaryPool': ('_claim', '_claimMany', '_updateDeposit', '_distributeShares',
+                                   '_distributeRoyalties'),
+    'reserveToken': ('transfer', 'mint', 'burn', '_preTransfer', '_postTransfer', '_preMint', '_postMint',
+                     '_preBurn', '_postBurn'),
+    'curationPool.shareToken': ('transfer', 'mint', 'burn', '_preTransfer', '_postTransfer', '_preMint', '_postMint',
+                                '_preBurn', '_postBurn'),
+}
+
+# (action type, target, method, args), as resolved by simulate3.
+STEP_t = Tuple[str, str, Callable, Tuple]
+
+COUNTED_OPERATIONS: Tuple[str, ...] = ('transfer', 'mint', 'burn')
+
+
+@dataclass
+class Stat:
+    calls: int = 0
+    seconds: float = 0.
+    bytes: int = 0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.seconds / self.calls if self.calls else 0.
+
+
+@dataclass
+class ProfileReport:
+    wall_time: float
+    actions: Dict[str, Stat]
+    methods: Dict[str, Stat]
+    counters: Dict[str, int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def table(self) -> str:
+        """the action types and methods by descending total time, followed by the counters."""
+        lines = [f'wall time {self.wall_time:.3f}s',
+                 f"{'':<52}{'calls':>10}{'total (s)':>12}{'mean (us)':>12}{'% wall':>8}{'KiB':>12}"]
+        for title, stats in (('action', self.actions), ('method', self.methods)):
+            lines.append(title)
+            for name, s in sorted(stats.items(), key=lambda kv: -kv[1].seconds):
+                share = 100 * s.seconds / self.wall_time if self.wall_time else 0.
+                lines.append(f'  {name:<50}{s.calls:>10,}{s.seconds:>12.4f}{s.mean_seconds * 1e6:>12.2f}'
+                             f'{share:>8.1f}{s.bytes / 1024:>12,.1f}')
+        lines.append('counters')
+        lines += [f'  {name:<50}{count:>10,}' for name, count in self.counters.items()]
+        return '\n'.join(lines)
+
+
+class Profiler:
+
+    def __init__(self, memory: bool = False, methods: Optional[Dict[str, Tuple[str, ...]]] = None):
+        """
+        :param memory: also trace the memory allocated by each action type and by recordState.
+        :param methods: the methods to instrument, by component; defaults to PROFILED_METHODS.
+        """
+        self.memory: bool = memory
+        self.methods: Dict[str, Tuple[str, ...]] = PROFILED_METHODS if methods is None else methods
+        self.action_stats: Dict[str, Stat] = {}
+        self.method_stats: Dict[str, Stat] = {}
+        self.wall_time: float = 0.
+        self._patched: List[Tuple[Any, str]] = []
+        self._deepcopy: Optional[Callable] = None
+        self._started_tracing: bool = False
+        self._start: float = 0.
+
+    def _timed(self, stat: Stat, fn: Callable, memory: bool = False) -> Callable:
+        perf_counter = time.perf_counter
+        if not memory:
+            def timed(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    stat.seconds += perf_counter() - start
+                    stat.calls += 1
+            return timed
+
+        def traced(*args, **kwargs):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stat.seconds += perf_counter() - start
+                stat.calls += 1
+                stat.bytes += tracemalloc.get_traced_memory()[1] - before
+        return traced
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """times a callable that is not an action, eg. recordState, under the methods."""
+        return self._timed(self.method_stats.setdefault(name, Stat()), fn, self.memory)
+
+    def wrap_action(self, action_type: str, method: Callable) -> Callable:
+        return self._timed(self.action_stats.setdefault(action_type, Stat()), method, self.memory)
+
+    def profile_steps(self, steps: Iterable[STEP_t]) -> Iterator[STEP_t]:
+        """wraps the methods of a stream of resolved steps, once per distinct method."""
+        wrapped: Dict[Tuple[str, Callable], Callable] = {}
+        for action_type, target, method, args in steps:
+            key = (action_type, method)
+            profiled = wrapped.get(key)
+            if profiled is None:
+                profiled = wrapped[key] = self.wrap_action(action_type, method)
+            yield action_type, target, profiled, args
+
+    def _patch_deepcopy(self):
+        original = self._deepcopy = copy.deepcopy
+        stat = self.method_stats.setdefault('copy.deepcopy', Stat())
+        perf_counter = time.perf_counter
+        depth = [0]
+
+        # copy.deepcopy recurses through the module global, so only the outermost call is counted.
+        def deepcopy(x, memo=None, _nil=[]):
+            if depth[0]:
+                return original(x, memo, _nil)
+            depth[0] += 1
+            start = perf_counter()
+            try:
+                return original(x, memo, _nil)
+            finally:
+                depth[0] -= 1
+                stat.seconds += perf_counter() - start
+                stat.calls += 1
+
+        copy.deepcopy = deepcopy
+
+    def attach(self, state):
+        """instruments the components of a state; must precede the resolution of the actions."""
+        for path, names in self.methods.items():
+            component = state
+            for attribute in path.split('.'):
+                component = getattr(component, attribute, None)
+            if component is None:
+                continue
+            for name in names:
+                method = getattr(component, name, None)
+                if method is None or name in vars(component):
+                    continue
+                stat = self.method_stats.setdefault(f'{path}.{name}', Stat())
+                setattr(component, name, self._timed(stat, method))
+                self._patched.append((component, name))
+        self._patch_deepcopy()
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start = time.perf_counter()
+
+    def detach(self):
+        self.wall_time += time.perf_counter() - self._start
+        for component, name in self._patched:
+            delattr(component, name)
+        self._patched = []
+        if self._deepcopy is not None:
+            copy.deepcopy = self._deepcopy
+            self._deepcopy = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def counters(self) -> Dict[str, int]:
+        counters = {'deepcopy': self.method_stats['copy.deepcopy'].calls if 'copy.deepcopy' in self.method_stats else 0}
+        for operation in COUNTED_OPERATIONS:
+            counters[operation] = sum(s.calls for name, s in self.method_stats.items()
+                                      if name.endswith(f'Token.{operation}'))
+        return counters
+
+    def report(self) -> ProfileReport:
+        return ProfileReport(wall_time=self.wall_time,
+                             actions={k: Stat(**asdict(v)) for k, v in self.action_stats.items()},
+                             methods={k: Stat(**asdict(v)) for k, v in self.method_stats.items() if v.calls},
+                             counters=self.counters())
@@ -0,0 +1,161 @@
+"""
+A declarative, columnar alternative to the `recordState` callables passed to `simulate3`. Rather than deep-copying
+dictionaries of balances after every action, a RecorderSpec names the metrics to observe and when to observe them, and
+a ColumnarRecorder writes those metrics into preallocated NumPy columns.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curation_sim.pools.utils import ADDRESS_t
+
+INITIAL_STATE = 'INITIAL_STATE'
+
+
+@dataclass
+class Metric:
+    """
+    :param name: the name of the column.
+    :param fn: computes the value of the metric from the state.
+    :param size: 0 for a scalar metric, otherwise the length of the vector returned by `fn`.
+    :param dtype: the dtype of the column.
+    """
+    name: str
+    fn: Callable[[Any], Any]
+    size: int = 0
+    dtype: Any = np.float64
+
+
+@dataclass
+class RecorderSpec:
+    """
+    :param metrics: the metrics to record.
+    :param action_types: the action types after which the state is sampled; None samples after every action.
+    :param stride: sample every `stride`-th matching action, starting with the first.
+    :param initial: whether to sample the initial state.
+    """
+    metrics: List[Metric]
+    action_types: Optional[Tuple[str, ...]] = None
+    stride: int = 1
+    initial: bool = True
+
+    def matches(self, action_type: str) -> bool:
+        return self.action_types is None or action_type in self.action_types
+
+
+@dataclass
+class ColumnarLog:
+    """The samples taken by a ColumnarRecorder, one array per metric plus the action index and type of each sample."""
+    columns: Dict[str, np.ndarray]
+    action_index: np.ndarray
+    action_type: np.ndarray
+    action_type_names: List[str] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.action_index)
+
+    def action_types(self) -> List[str]:
+        return [self.action_type_names[i] for i in self.action_type]
+
+
+class ColumnarRecorder:
+    """
+    Samples the metrics of a RecorderSpec into preallocated columns. Columns grow by doubling when more samples are
+    taken than reserved, so the recorder also works when the number of actions is not known in advance.
+    """
+
+    def __init__(self, spec: RecorderSpec, capacity: int = 1024):
+        self.spec: RecorderSpec = spec
+        self.size: int = 0
+        self._matches: int = 0
+        self._type_codes: Dict[str, int] = {}
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity: int):
+        self.columns: Dict[str, np.ndarray] = {
+            m.name: np.zeros((capacity, m.size) if m.size else capacity, dtype=m.dtype) for m in self.spec.metrics}
+        self.action_index: np.ndarray = np.zeros(capacity, dtype=np.int64)
+        self.action_type: np.ndarray = np.zeros(capacity, dtype=np.int16)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.action_index)
+
+    def reserve(self, capacity: int):
+        """grows the columns so that at least `capacity` samples fit without reallocating."""
+        if capacity <= self.capacity:
+            return
+        old_columns, old_index, old_type = self.columns, self.action_index, self.action_type
+        self._allocate(capacity)
+        for name, column in old_columns.items():
+            self.columns[name][:self.size] = column[:self.size]
+        self.action_index[:self.size] = old_index[:self.size]
+        self.action_type[:self.size] = old_type[:self.size]
+
+    def reserve_for(self, actions: Sequence):
+        """reserves room for every sample a list of actions, or an ActionProgram, will produce."""
+        if hasattr(actions, 'type_counts'):
+            matching = sum(n for t, n in actions.type_counts().items() if self.spec.matches(t))
+        else:
+            matching = sum(1 for a in actions if self.spec.matches(a.action_type))
+        self.reserve(self.size + int(self.spec.initial) + -(-matching // self.spec.stride))
+
+    def observe(self, state, index: int, action_type: str):
+        """samples the state if the spec asks for a sample after this action."""
+        if action_type == INITIAL_STATE:
+            if self.spec.initial:
+                self.record(state, index, action_type)
+            return
+        if not self.spec.matches(action_type):
+            return
+        matches = self._matches
+        self._matches += 1
+        if matches % self.spec.stride == 0:
+            self.record(state, index, action_type)
+
+    def record(self, state, index: int, action_type: str):
+        """unconditionally samples the state."""
+        if self.size == self.capacity:
+            self.reserve(2 * self.capacity)
+        row = self.size
+        for metric in self.spec.metrics:
+            self.columns[metric.name][row] = metric.fn(state)
+        self.action_index[row] = index
+        code = self._type_codes.get(action_type)
+        if code is None:
+            code = self._type_codes[action_type] = len(self._type_codes)
+        self.action_type[row] = code
+        self.size += 1
+
+    def result(self) -> ColumnarLog:
+        return ColumnarLog(columns={k: v[:self.size] for k, v in self.columns.items()},
+                           action_index=self.action_index[:self.size],
+                           action_type=self.action_type[:self.size],
+                           action_type_names=list(self._type_codes))
+
+
+def _pool_vector(state, accounts: List[ADDRESS_t], many: str, one: str) -> np.ndarray:
+    pool = state.curationPool
+    if hasattr(pool, many):
+        return getattr(pool, many)(accounts)
+    return np.array([getattr(pool, one)(a) for a in accounts], dtype=np.float64)
+
+
+def share_balances(name: str, accounts: Iterable[ADDRESS_t]) -> Metric:
+    """the effective share balance of each of `accounts`, as a vector metric."""
+    accounts = list(accounts)
+    return Metric(name=name,
+                  fn=lambda s: _pool_vector(s, accounts, 'effectiveShareBalancesOf', 'effectiveShareBalanceOf'),
+                  size=len(accounts))
+
+
+def deposit_balances(name: str, accounts: Iterable[ADDRESS_t]) -> Metric:
+    """the deposit of each of `accounts` in the curation pool, as a vector metric."""
+    accounts = list(accounts)
+    return Metric(name=name,
+                  fn=lambda s: _pool_vector(s, accounts, 'depositsOf', 'depositOf'),
+                  size=len(accounts))
@@ -0,0 +1,176 @@
+"""
+Simulation results on disk. A ResultsWriter is a ColumnarRecorder that holds at most a memory budget of samples, and
+whenever the budget is full appends them to one raw binary file per column and starts over, so the memory a run's
+results hold stays constant however long it runs. A results directory holds the column files and a JSON manifest of
+their dtypes and shapes:
+
+    results/
+        manifest.json
+        action_index.bin
+        action_type.bin
+        columns/<metric>.bin
+
+`load_results(path)` memory-maps the columns, so opening results takes the same time however large they are, and only
+the samples read are paged in. The manifest is rewritten after every spill, so the results of a run that was
+interrupted can be loaded up to its last spill.
+
+`write_parquet` exports results to a Parquet file, one row group per spill, if pyarrow is installed.
+"""
+import json
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+from curation_sim.recorder import ColumnarLog, ColumnarRecorder, RecorderSpec
+
+MANIFEST = 'manifest.json'
+
+# the default memory budget of a ResultsWriter, in bytes.
+MEMORY_BUDGET = 64 * 2**20
+
+
+def _column_path(path: str, name: str) -> str:
+    if name in ('action_index', 'action_type'):
+        return os.path.join(path, f'{name}.bin')
+    return os.path.join(path, 'columns', f'{name}.bin')
+
+
+def _write_chunk(path: str, columns: Dict[str, np.ndarray], rows: int, append: bool):
+    for name, column in columns.items():
+        with open(_column_path(path, name), 'ab' if append else 'wb') as f:
+            column[:rows].tofile(f)
+
+
+def _write_manifest(path: str,
+                    columns: Dict[str, np.ndarray],
+                    rows: int,
+                    chunks: List[int],
+                    action_type_names: List[str]):
+    manifest = {
+        'rows': rows,
+        'chunks': chunks,
+        'action_type_names': action_type_names,
+        'columns': {name: {'dtype': column.dtype.str, 'shape': list(column.shape[1:])}
+                    for name, column in columns.items()},
+    }
+    tmp_path = os.path.join(path, f'{MANIFEST}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+
+class ResultsWriter(ColumnarRecorder):
+    """
+    Samples the metrics of a RecorderSpec, as a ColumnarRecorder does, spilling them to a results directory whenever
+    the samples held reach the memory budget. Pass it to `simulate3` as the recordState; the run then returns the
+    results loaded back from disk, memory-mapped.
+    """
+
+    def __init__(self, path: str, spec: RecorderSpec, memory_budget: int = MEMORY_BUDGET):
+        """
+        :param path: the results directory, which is created if need be. Results already in it are replaced.
+        :param memory_budget: the bytes of samples held in memory before they are spilled to disk.
+        """
+        for metric in spec.metrics:
+            if np.dtype(metric.dtype).hasobject:
+                raise ValueError(f'ResultsWriter: metric {metric.name} has dtype object, which cannot be written')
+        self.path: str = path
+        row_bytes = (np.dtype(np.int64).itemsize + np.dtype(np.int16).itemsize
+                     + sum(np.dtype(m.dtype).itemsize * max(m.size, 1) for m in spec.metrics))
+        # the number of samples held before spilling.
+        self.budget_rows: int = max(memory_budget // row_bytes, 1)
+        # the number of samples already on disk, and the number in each spill.
+        self.rows: int = 0
+        self.chunks: List[int] = []
+        super().__init__(spec, capacity=min(1024, self.budget_rows))
+
+        os.makedirs(os.path.join(path, 'columns'), exist_ok=True)
+        _write_chunk(path, self._columns(), 0, append=False)
+        self._write_manifest()
+
+    def reserve(self, capacity: int):
+        super().reserve(min(capacity, self.budget_rows))
+
+    def record(self, state, index: int, action_type: str):
+        if self.size == self.budget_rows:
+            self.flush()
+        super().record(state, index, action_type)
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        return {'action_index': self.action_index, 'action_type': self.action_type, **self.columns}
+
+    def _write_manifest(self):
+        _write_manifest(self.path, self._columns(), self.rows, self.chunks, list(self._type_codes))
+
+    def flush(self):
+        """appends the samples held to the column files."""
+        if self.size == 0:
+            return
+        _write_chunk(self.path, self._columns(), self.size, append=True)
+        self.rows += self.size
+        self.chunks.append(self.size)
+        self.size = 0
+        self._write_manifest()
+
+    def result(self) -> ColumnarLog:
+        self.flush()
+        return load_results(self.path)
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def load_results(path: str) -> ColumnarLog:
+    """the results in a results directory, with every column memory-mapped read-only."""
+    manifest = read_manifest(path)
+    rows = manifest['rows']
+    arrays = {}
+    for name, column in manifest['columns'].items():
+        shape = (rows, *column['shape'])
+        if rows == 0:
+            # an empty file cannot be mapped.
+            arrays[name] = np.zeros(shape, dtype=column['dtype'])
+        else:
+            arrays[name] = np.memmap(_column_path(path, name), dtype=column['dtype'], mode='r', shape=shape)
+    return ColumnarLog(columns={k: v for k, v in arrays.items() if k not in ('action_index', 'action_type')},
+                       action_index=arrays['action_index'],
+                       action_type=arrays['action_type'],
+                       action_type_names=manifest['action_type_names'])
+
+
+def write_parquet(path: str, results_path: str):
+    """
+    exports a results directory to a Parquet file, one row group per spill, with action types as a dictionary column
+    and vector metrics as fixed-size lists. Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    manifest = read_manifest(results_path)
+    results = load_results(results_path)
+    columns = {'action_index': results.action_index, 'action_type': results.action_type, **results.columns}
+    writer = None
+    try:
+        start = 0
+        for rows in manifest['chunks'] or [0]:
+            arrays = {}
+            for name, column in columns.items():
+                chunk = np.ascontiguousarray(column[start:start + rows])
+                if chunk.ndim == 1:
+                    arrays[name] = pa.array(chunk)
+                else:
+                    arrays[name] = pa.FixedSizeListArray.from_arrays(pa.array(chunk.ravel()), chunk.shape[1])
+            arrays['action_type'] = pa.DictionaryArray.from_arrays(arrays['action_type'],
+                                                                   pa.array(manifest['action_type_names'],
+                                                                            type=pa.string()))
+            table = pa.table(arrays)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            start += rows
+    finally:
+        if writer is not None:
+            writer.close()
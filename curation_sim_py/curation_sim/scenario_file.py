@@ -0,0 +1,317 @@
+"""
+Declarative scenarios. A scenario file, in TOML or YAML, describes the initial balances and deposits of a single pool,
+populations of accounts with randomly drawn deposits and balances, random traders among them, drives (actions at
+given periods) and the metrics to record:
+
+    name = "whale"
+    seed = 0
+    periods = 120
+    blocks_per_period = 1000
+
+    [pool]
+    issuance_rate = 0.0001
+    deposits = { whale = 10000 }        # initial deposits, which are also the initial shares
+
+    [balances]                          # the reserve token held outside the pool
+    whale = 100000
+
+    [[populations]]                     # accounts curator0, curator1...
+    name = "curator"
+    count = 10
+    deposit = { mean = 10000, std = 1000 }
+    balance = { mean = 1000, std = 100 }
+
+    [[traders]]                         # a population trading at random, as streams.RandomTraders
+    population = "curator"
+    deposit_probability = 0.2
+    withdraw_probability = 0.2
+    trade_fraction = 1.05
+    start = 10                          # the first period of trading
+
+    [[drives]]                          # an action at the start of a period
+    period = 20
+    action = "DEPOSIT"
+    args = ["whale", 40000]
+
+    [record]
+    action_types = ["SLEEP"]
+    initial = false
+    metrics = [{ name = "whale_shares", kind = "shares", accounts = "whale" },
+               { name = "curator_shares", kind = "shares", accounts = "curator", sum = true }]
+
+Every period runs its drives, then its trades, then sleeps `blocks_per_period` blocks. Metric kinds are `deposits`,
+`shares` (effective share balances), `balances` (of the reserve token), `total_shares`, `secondary_pool_deposits` and
+`block_height`; `accounts` is an address, which gives a scalar, or a population or list of addresses, which gives a
+vector, or with `sum = true` its sum.
+
+`load_scenario(path)` compiles a file into its initial state and an ActionProgram, and caches the compiled program on
+disk, keyed by a hash of the parsed contents and the seed: loading it again, eg. in every worker of a sweep, reads the
+opcodes and argument arrays back without constructing any actions in Python.
+"""
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.pools.utils import ADDRESS_t
+from curation_sim.recorder import Metric, RecorderSpec
+from curation_sim.scenarios import Scenario
+from curation_sim.sim_utils import Action, ActionProgram, State, compile_actions, positive_normals
+from curation_sim.streams import periodic, random_trades
+
+# bumped whenever compilation changes, which invalidates every cached program.
+FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'curation_sim')
+
+
+def read_scenario_file(path: str) -> Dict[str, Any]:
+    """the contents of a TOML (.toml) or YAML (.yaml, .yml) scenario file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # before Python 3.11.
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        import yaml
+        with open(path) as f:
+            return yaml.safe_load(f)
+    raise ValueError(f'read_scenario_file: unknown scenario file type {extension}')
+
+
+def scenario_hash(definition: Dict[str, Any], seed: Optional[int] = None) -> str:
+    """the hash of a scenario's contents, insensitive to formatting, comments and the order of keys."""
+    key = json.dumps({'format': FORMAT_VERSION, 'seed': seed, 'definition': definition}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class PackedArgs(Sequence):
+    """
+    The argument tuples of an ActionProgram, stored as a table of the distinct tuples and the index of each action's
+    tuple into it.
+    """
+
+    def __init__(self, table: List[Tuple], ids: np.ndarray):
+        self.table: List[Tuple] = table
+        self.ids: np.ndarray = ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.table[j] for j in self.ids[i].tolist()]
+        return self.table[self.ids[i]]
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return map(self.table.__getitem__, self.ids.tolist())
+
+
+def _pack_args(args: Sequence[Tuple]) -> Tuple[List[Tuple], np.ndarray]:
+    index: Dict[Tuple, int] = {}
+    table: List[Tuple] = []
+    ids = np.empty(len(args), dtype=np.int64)
+    for i, a in enumerate(args):
+        # 1 and 1.0 compare equal, so the types are part of the key.
+        key = (a, tuple(map(type, a)))
+        try:
+            j = index.get(key)
+            if j is None:
+                j = index[key] = len(table)
+                table.append(a)
+        except TypeError:
+            # unhashable arguments, eg. lists, are stored once per action, as compile_actions leaves them.
+            j = len(table)
+            table.append(a)
+        ids[i] = j
+    return table, ids
+
+
+@dataclass
+class CompiledScenario:
+    definition: Dict[str, Any]
+    # the reserve token held outside the pool, and the initial deposits, which are also the initial shares.
+    reserveBalances: Dict[ADDRESS_t, float]
+    deposits: List[Tuple[ADDRESS_t, float]]
+    # the accounts of each population.
+    populations: Dict[str, List[ADDRESS_t]]
+    program: ActionProgram
+
+    def state(self) -> State:
+        pool = self.definition.get('pool', {})
+        balances = dict(self.reserveBalances)
+        balances['curationPool'] = sum(d for _, d in self.deposits)
+        reserveToken = Token(balances)
+        chain = Chain()
+        curationPool = CurationPool(address='curationPool',
+                                    initialShareBalances=dict(self.deposits),
+                                    initialDeposits=list(self.deposits),
+                                    chain=chain,
+                                    reserveToken=reserveToken,
+                                    issuanceRate=pool.get('issuance_rate', 0),
+                                    valuationMultiple=pool.get('valuation_multiple', 1))
+        return State(chain, reserveToken, curationPool)
+
+    def spec(self) -> RecorderSpec:
+        record = self.definition.get('record', {})
+        action_types = record.get('action_types')
+        return RecorderSpec(metrics=[self._metric(m) for m in record.get('metrics', [])],
+                            action_types=None if action_types is None else tuple(action_types),
+                            stride=record.get('stride', 1),
+                            initial=record.get('initial', True))
+
+    def _metric(self, definition: Dict[str, Any]) -> Metric:
+        name, kind = definition['name'], definition['kind']
+        if kind == 'total_shares':
+            return Metric(name, lambda s: s.curationPool.totalShares)
+        if kind == 'secondary_pool_deposits':
+            return Metric(name, lambda s: s.curationPool.secondaryPool.totalDeposits)
+        if kind == 'block_height':
+            return Metric(name, lambda s: s.chain.blockHeight, dtype=np.int64)
+
+        values = {'deposits': lambda s, a: s.curationPool.depositOf(a),
+                  'shares': lambda s, a: s.curationPool.effectiveShareBalanceOf(a),
+                  'balances': lambda s, a: s.reserveToken.balanceOf(a)}
+        if kind not in values:
+            raise ValueError(f'CompiledScenario: unknown metric kind {kind}')
+        value = values[kind]
+        accounts = definition['accounts']
+        if isinstance(accounts, str) and accounts not in self.populations:
+            return Metric(name, lambda s: value(s, accounts))
+        accounts = self.populations.get(accounts, accounts) if isinstance(accounts, str) else list(accounts)
+        if definition.get('sum', False):
+            return Metric(name, lambda s: sum(value(s, a) for a in accounts))
+        return Metric(name, lambda s: np.array([value(s, a) for a in accounts]), size=len(accounts))
+
+    def scenario(self) -> Scenario:
+        """a Scenario running the compiled program; its randomness was drawn when the file was compiled."""
+        return Scenario(description=self.definition.get('description', self.definition.get('name', '')),
+                        state=lambda rng: self.state(),
+                        actions=lambda state, rng: self.program,
+                        spec=self.spec())
+
+
+def _draw(population: Dict[str, Any], field: str, rng: np.random.Generator) -> List[float]:
+    value = population.get(field, 0)
+    if isinstance(value, dict):
+        return positive_normals(value['mean'], value.get('std', 0), population['count'], rng).tolist()
+    return [value] * population['count']
+
+
+def compile_scenario(definition: Dict[str, Any], seed: Optional[int] = None) -> CompiledScenario:
+    """
+    Draws the random populations and trades of a scenario and compiles its actions.
+
+    :param seed: overrides the seed of the file.
+    """
+    rng = np.random.default_rng(definition.get('seed') if seed is None else seed)
+    deposits = list(definition.get('pool', {}).get('deposits', {}).items())
+    reserveBalances = dict(definition.get('balances', {}))
+    populations: Dict[str, List[ADDRESS_t]] = {}
+    for population in definition.get('populations', []):
+        accounts = [f'{population["name"]}{i}' for i in range(population['count'])]
+        populations[population['name']] = accounts
+        deposits += zip(accounts, _draw(population, 'deposit', rng))
+        reserveBalances.update(zip(accounts, _draw(population, 'balance', rng)))
+
+    drives: Dict[int, List[Action]] = {}
+    for drive in definition.get('drives', []):
+        drives.setdefault(drive['period'], []).append(
+            Action(action_type=drive['action'], target=drive.get('target', 'curationPool'), args=list(drive['args'])))
+
+    periods = definition['periods']
+    deposit_of = dict(deposits)
+    schedules = []
+    for traders in definition.get('traders', []):
+        accounts = populations[traders['population']]
+        start = traders.get('start', 0)
+        schedule = random_trades({a: float(deposit_of.get(a, 0)) for a in accounts},
+                                 {a: float(reserveBalances.get(a, 0)) for a in accounts},
+                                 traders['deposit_probability'],
+                                 traders['withdraw_probability'],
+                                 traders['trade_fraction'],
+                                 periods=periods - start,
+                                 rng=rng)
+        schedules.append((start, schedule))
+
+    def period_actions(t: int) -> Iterator[Action]:
+        yield from drives.get(t, ())
+        for start, schedule in schedules:
+            yield from schedule(t - start)
+
+    program = compile_actions(periodic(period_actions, definition['blocks_per_period'], periods))
+    return CompiledScenario(definition=definition,
+                            reserveBalances=reserveBalances,
+                            deposits=deposits,
+                            populations=populations,
+                            program=program)
+
+
+def save_compiled(path: str, compiled: CompiledScenario):
+    """
+    writes the initial conditions and the packed program of a compiled scenario. The file is written under a unique
+    temporary name and moved into place, so that processes compiling the same scenario at once do not collide.
+    """
+    program = compiled.program
+    table, ids = _pack_args(program.args)
+    meta = {'definition': compiled.definition,
+            'reserveBalances': compiled.reserveBalances,
+            'deposits': compiled.deposits,
+            'populations': compiled.populations,
+            'operations': program.operations,
+            'args': table}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, opcodes=program.opcodes, arg_ids=ids, meta=np.array(json.dumps(meta)))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_compiled(path: str) -> CompiledScenario:
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        opcodes, ids = data['opcodes'], data['arg_ids']
+    program = ActionProgram(operations=[tuple(o) for o in meta['operations']],
+                            opcodes=opcodes,
+                            args=PackedArgs([tuple(a) for a in meta['args']], ids))
+    return CompiledScenario(definition=meta['definition'],
+                            reserveBalances=meta['reserveBalances'],
+                            deposits=[tuple(d) for d in meta['deposits']],
+                            populations=meta['populations'],
+                            program=program)
+
+
+def load_scenario(path: str,
+                  seed: Optional[int] = None,
+                  cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> CompiledScenario:
+    """
+    Compiles a scenario file, or loads it from the cache of compiled programs.
+
+    :param seed: overrides the seed of the file.
+    :param cache_dir: the directory of compiled programs, named by the hash of their contents and seed; None
+           compiles without caching.
+    """
+    definition = read_scenario_file(path)
+    if cache_dir is None:
+        return compile_scenario(definition, seed)
+    cached = os.path.join(cache_dir, f'{scenario_hash(definition, seed)}.npz')
+    if os.path.exists(cached):
+        return load_compiled(cached)
+    compiled = compile_scenario(definition, seed)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_compiled(cached, compiled)
+    return compiled
@@ -0,0 +1,79 @@
+"""
+A registry of scenarios, which the command line runs by name (see `curation_sim.__main__`):
+
+    python -m curation_sim run whale --seed 1 --out results/
+
+A Scenario builds the state and actions of one run from a random number generator, and names the metrics recorded.
+Scenario modules build nothing when imported, and import matplotlib only in their plotting functions, so looking a
+scenario up, or importing its module to reuse its configuration, is cheap; headless runs never import matplotlib.
+
+The registry maps names to `module:attribute` paths of Scenario objects, imported when a scenario is looked up.
+"""
+from dataclasses import dataclass
+import importlib
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from curation_sim.online import Accumulator
+from curation_sim.recorder import ColumnarLog, ColumnarRecorder, RecorderSpec
+from curation_sim.results import MEMORY_BUDGET, ResultsWriter
+from curation_sim.sim_utils import Action, State, simulate3
+
+
+@dataclass
+class Scenario:
+    description: str
+    # the initial state of a run.
+    state: Callable[[np.random.Generator], State]
+    # the actions of a run on its initial state, which may be generated lazily.
+    actions: Callable[[State, np.random.Generator], Iterable[Action]]
+    # the metrics recorded.
+    spec: RecorderSpec
+    # draws figures of the results of a run.
+    plot: Optional[Callable[[ColumnarLog], None]] = None
+    # fresh Accumulators of the summary statistics of a run (see `curation_sim.online`).
+    statistics: Optional[Callable[[], List[Accumulator]]] = None
+
+
+SCENARIOS: Dict[str, Union[str, Scenario]] = {
+    'whale': 'curation_sim.ohq_sim_whale:SCENARIO',
+    'vol': 'curation_sim.ohq_sim_vol:SCENARIO',
+    'share_drive': 'curation_sim.ohq_sim_share_drive:SCENARIO',
+}
+
+
+def register(name: str, scenario: Union[str, Scenario]):
+    """registers a scenario, or the `module:attribute` path of one, under a name."""
+    SCENARIOS[name] = scenario
+
+
+def get_scenario(name: str) -> Scenario:
+    if name not in SCENARIOS:
+        raise KeyError(f'get_scenario: no scenario {name}; registered: {", ".join(sorted(SCENARIOS))}')
+    scenario = SCENARIOS[name]
+    if isinstance(scenario, str):
+        module, attribute = scenario.split(':')
+        scenario = getattr(importlib.import_module(module), attribute)
+    return scenario
+
+
+def run_scenario(scenario: Union[str, Scenario],
+                 seed: Optional[int] = None,
+                 out: Optional[str] = None,
+                 memory_budget: int = MEMORY_BUDGET,
+                 accumulators: Sequence[Accumulator] = ()) -> ColumnarLog:
+    """
+    Runs a scenario once.
+
+    :param seed: seeds the generator the state and actions are drawn from; None draws fresh entropy.
+    :param out: if given, the results are written to this results directory (see `curation_sim.results`) as the run
+           goes, and are returned memory-mapped; otherwise they are kept in memory.
+    :param accumulators: Accumulators updated as the run goes; read their results afterwards.
+    """
+    if isinstance(scenario, str):
+        scenario = get_scenario(scenario)
+    rng = np.random.default_rng(seed)
+    state = scenario.state(rng)
+    recorder = ColumnarRecorder(scenario.spec) if out is None else ResultsWriter(out, scenario.spec, memory_budget)
+    return simulate3(scenario.actions(state, rng), state, recorder, accumulators=accumulators)
@@ -0,0 +1,92 @@
+"""
+Event-driven scenarios. A Scheduler holds a priority queue of actions due at given block heights, once or every so
+many blocks, and streams them to `simulate3`: the actions due at each event time, preceded by a single SLEEP from the
+previous event time. Issuance accrues lazily in the pools, so the blocks between events cost nothing, and a year of
+blocks with a handful of events (say, one whale depositing and withdrawing, and a weekly fee drip) is a handful of
+actions.
+
+    scheduler = Scheduler()
+    scheduler.at(1_000, [Action(action_type='DEPOSIT', target='curationPool', args=['whale', 1e6])])
+    scheduler.every(50_000, [Action(action_type='DISTRIBUTE_ROYALTIES', target='curationPool', args=[100])])
+    simulate3(scheduler.stream(end=2_600_000), state)
+"""
+import heapq
+import itertools
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from curation_sim.sim_utils import Action
+
+# the actions of an event: a list of actions, or a function of the block height returning them. Functions are called
+# when the event comes due, so they may observe the state and schedule further events.
+EventActions = Union[Iterable[Action], Callable[[int], Iterable[Action]]]
+
+# (block, order of scheduling, actions, period of a recurring event, last block of a recurring event)
+_Event = Tuple[int, int, EventActions, Optional[int], Optional[int]]
+
+
+class Scheduler:
+
+    def __init__(self, start: int = 0):
+        """
+        :param start: the block height of the chain when the stream starts.
+        """
+        self.blockHeight: int = start
+        self._queue: List[_Event] = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        """the number of pending events."""
+        return len(self._queue)
+
+    def at(self, block: int, actions: EventActions) -> 'Scheduler':
+        """schedules actions at a block height; events due at the same block run in the order they were scheduled."""
+        if block < self.blockHeight:
+            raise ValueError(f'Scheduler_at: block {block} is in the past (block height {self.blockHeight})')
+        heapq.heappush(self._queue, (block, next(self._order), actions, None, None))
+        return self
+
+    def after(self, blocks: int, actions: EventActions) -> 'Scheduler':
+        """schedules actions a number of blocks after the current block height."""
+        return self.at(self.blockHeight + blocks, actions)
+
+    def every(self,
+              blocks: int,
+              actions: EventActions,
+              start: Optional[int] = None,
+              until: Optional[int] = None) -> 'Scheduler':
+        """
+        schedules actions every `blocks` blocks.
+
+        :param start: the block of the first occurrence; defaults to `blocks` after the current block height.
+        :param until: the last block at which the actions may occur; None recurs for as long as the stream runs.
+        """
+        assert blocks > 0
+        start = self.blockHeight + blocks if start is None else start
+        if start < self.blockHeight:
+            raise ValueError(f'Scheduler_every: block {start} is in the past (block height {self.blockHeight})')
+        if until is None or start <= until:
+            heapq.heappush(self._queue, (start, next(self._order), actions, blocks, until))
+        return self
+
+    def stream(self, end: Optional[int] = None) -> Iterator[Action]:
+        """
+        The actions of the events in order of block height, each batch preceded by a SLEEP to its block.
+
+        :param end: if given, events after this block are left pending, and the stream ends with a SLEEP to it.
+               Without it the stream runs until no event is pending, which is never if an event recurs forever.
+        """
+        queue = self._queue
+        while queue and (end is None or queue[0][0] <= end):
+            block, order, actions, period, until = heapq.heappop(queue)
+            if block > self.blockHeight:
+                yield Action(action_type='SLEEP', target='chain', args=[block - self.blockHeight])
+                self.blockHeight = block
+            if period is not None and (until is None or block + period <= until):
+                heapq.heappush(queue, (block + period, order, actions, period, until))
+            yield from (actions(block) if callable(actions) else actions)
+        if end is not None and end > self.blockHeight:
+            yield Action(action_type='SLEEP', target='chain', args=[end - self.blockHeight])
+            self.blockHeight = end
+
+    def __iter__(self) -> Iterator[Action]:
+        return self.stream()
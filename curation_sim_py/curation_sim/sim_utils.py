@@ -1,20 +1,32 @@
+import copy
 from dataclasses import dataclass
+import itertools
 import logging
-from typing import List, Tuple, Callable, Dict, Any
+from typing import List, Tuple, Callable, Dict, Any, Iterable, Iterator, Optional, Sequence, Sized, Union, \
+    TYPE_CHECKING
 
+import numpy as np
 import numpy.random as nrand
 import pprint
 
+from curation_sim.event_log import EventLog
+from curation_sim.online import Accumulator
 from curation_sim.pools.curation_pool import CurationPool
 from curation_sim.pools.token import Token
 from curation_sim.pools.chain import Chain
 from curation_sim.pools.utils import ADDRESS_t, NUMERIC_t
+from curation_sim.profiler import Profiler
+from curation_sim.recorder import ColumnarRecorder, ColumnarLog, INITIAL_STATE
+
+if TYPE_CHECKING:
+    from curation_sim.checkpoint import Checkpointer
 
 _log = logging.getLogger(__name__)
 
 
 @dataclass
 class Action:
+    __slots__ = ('action_type', 'target', 'args')
     action_type: str
     target: str
     args: List
@@ -26,14 +38,57 @@ class State:
     reserveToken: Token
     curationPool: CurationPool
 
+    def fork(self) -> 'State':
+        """
+        An independent branch of the state, eg. to run several scenarios from one primed pool. Balances, deposits and
+        snapshots are copied table by table rather than deep-copied object by object, so a fork costs a fraction of
+        a `copy.deepcopy` and nothing like re-simulating the common prefix. Token hooks are not carried over.
+        """
+        chain = self.chain.fork()
+        reserveToken = self.reserveToken.fork()
+        return State(chain, reserveToken, self.curationPool.fork(chain, reserveToken))
+
+    def fast_forward(self, blocks: int, materialize: bool = False):
+        """
+        Advances the state over an idle window of `blocks` blocks, with the same result as stepping through the window
+        with periodic claims. Issuance compounds in closed form and is distributed pro rata to deposits, neither of
+        which changes while idle, so one mint at the end of the window is exact and costs O(1).
+
+        :param materialize: also claim for every depositor, in O(accounts), so that share balances hold the issued
+               shares rather than leaving them pending in the secondary pool.
+        """
+        self.chain.sleep(blocks)
+        if materialize:
+            self.curationPool.claimAll()
+        else:
+            self.curationPool.mintShares()
+
 
 @dataclass
 class Config:
     initialReserveTokenBalances: List[Tuple[ADDRESS_t, NUMERIC_t]]
     initialShareBalances: List[Tuple[ADDRESS_t, NUMERIC_t]]
     initialDeposits: List[Tuple[ADDRESS_t, NUMERIC_t]]
-    actions: List[Action]
-    recordState: Callable[[State], Dict]
+    actions: Union[Iterable[Action], 'ActionProgram']
+    recordState: Union[Callable[[State], Dict], ColumnarRecorder]
+
+
+def record_effective_state(state: State) -> Dict[str, Any]:
+    """
+    Records the usual observables of a single-pool state, reporting share balances as effective balances (held plus
+    pending, unclaimed shares). Observing the state this way does not mutate it, so scenarios no longer need to issue
+    a CLAIM for every curator before each observation.
+    """
+    pool = state.curationPool
+    return {
+        'time': state.chain.blockHeight,
+        'shareBalances': pool.effectiveShareBalances(),
+        'depositBalances': copy.deepcopy(pool.deposits),
+        'totalShares': pool.totalShares,
+        'primaryPoolTotalDeposits': pool.reserveToken.balanceOf(pool.address),
+        'secondaryPoolTotalDeposits': pool.secondaryPool.totalDeposits,
+        'reserveBalances': copy.deepcopy(state.reserveToken.balances),
+    }
 
 
 def snake_to_camel(s: str):
@@ -44,58 +99,249 @@ def snake_to_camel(s: str):
     return ''.join(sl)
 
 
-def simulate3(actions: List[Action],
+def resolve_target(state, target: str):
+    """the component of the state a target names; `pool[3]` names an item of the `pool` attribute."""
+    name, _, index = target.partition('[')
+    actor = getattr(state, name)
+    if index:
+        actor = actor[int(index.rstrip(']'))]
+    return actor
+
+
+def resolve_action(state: State, target: str, action_type: str) -> Callable:
+    """the bound method an action of this type on this target calls."""
+    return getattr(resolve_target(state, target), snake_to_camel(action_type))
+
+
+def _resolve_or_defer(state: State, target: str, action_type: str) -> Callable:
+    """
+    the bound method of an action, or, if it cannot be resolved (eg. a misspelled action type), a callable raising
+    the error when the action is applied, so that `simulate3` handles it as it does a failing action.
+    """
+    try:
+        return resolve_action(state, target, action_type)
+    except Exception as e:
+        error = e
+
+        def fail(*args):
+            raise error
+        return fail
+
+
+@dataclass
+class ActionProgram:
+    """
+    A list of actions compiled for dispatch. Each distinct (target, action type) pair is an operation, resolved to a
+    bound method once per run, and each action is reduced to an integer opcode and an argument tuple. Equal argument
+    tuples are shared, so eg. a million SLEEP(1) actions hold one tuple between them.
+    """
+    # (target, action type) of each opcode.
+    operations: List[Tuple[str, str]]
+    opcodes: np.ndarray
+    args: List[Tuple]
+
+    def __len__(self) -> int:
+        return len(self.args)
+
+    def __iter__(self) -> Iterator[Action]:
+        for code, args in zip(self.opcodes.tolist(), self.args):
+            target, action_type = self.operations[code]
+            yield Action(action_type=action_type, target=target, args=list(args))
+
+    def type_counts(self) -> Dict[str, int]:
+        """the number of actions of each action type."""
+        counts = {}
+        for (_, action_type), n in zip(self.operations, np.bincount(self.opcodes, minlength=len(self.operations))):
+            counts[action_type] = counts.get(action_type, 0) + int(n)
+        return counts
+
+    def bind(self, state: State) -> List[Callable]:
+        """the bound method of each operation on this state."""
+        return [_resolve_or_defer(state, target, action_type) for target, action_type in self.operations]
+
+    def steps(self, state: State) -> Iterator[Tuple[str, str, Callable, Tuple]]:
+        """(action type, target, bound method, args) for every action, without per-action lookups."""
+        methods = self.bind(state)
+        targets = [target for target, _ in self.operations]
+        types = [action_type for _, action_type in self.operations]
+        codes = self.opcodes.tolist()
+        return zip(map(types.__getitem__, codes), map(targets.__getitem__, codes), map(methods.__getitem__, codes),
+                   self.args)
+
+
+def compile_actions(actions: Iterable[Action]) -> ActionProgram:
+    """compiles actions, eg. a scenario that will be run many times, into an ActionProgram."""
+    codes: Dict[Tuple[str, str], int] = {}
+    interned: Dict[Tuple, Tuple] = {}
+    opcodes = []
+    args = []
+    for action in actions:
+        key = (action.target, action.action_type)
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+        opcodes.append(code)
+
+        a = tuple(action.args)
+        try:
+            # 1 and 1.0 compare equal, so the types are part of the key.
+            a = interned.setdefault((a, tuple(map(type, a))), a)
+        except TypeError:
+            pass
+        args.append(a)
+    return ActionProgram(operations=list(codes), opcodes=np.array(opcodes, dtype=np.int32), args=args)
+
+
+def _resolved_steps(actions: Iterable[Action], state: State) -> Iterator[Tuple[str, str, Callable, Tuple]]:
+    methods: Dict[Tuple[str, str], Callable] = {}
+    for action in actions:
+        key = (action.target, action.action_type)
+        method = methods.get(key)
+        if method is None:
+            method = methods[key] = _resolve_or_defer(state, action.target, action.action_type)
+        yield action.action_type, action.target, method, action.args
+
+
+def simulate3(actions: Union[Iterable[Action], ActionProgram],
               state: State,
-              recordState: Callable[[State], Dict[str, Any]],
+              recordState: Union[Callable[[State], Dict[str, Any]], ColumnarRecorder, None] = None,
               *,
+              event_log: Optional[EventLog] = None,
               catch_errors: bool = False,
-              verbose: bool = False) -> List[Dict]:
-
-    log = [{'action': {'action_type': 'INITIAL_STATE'},
-            'state': recordState(state)}]
+              verbose: bool = False,
+              profiler: Optional[Profiler] = None,
+              checkpointer: Optional['Checkpointer'] = None,
+              start: int = 0,
+              accumulators: Sequence[Accumulator] = ()) -> Union[List[Dict], ColumnarLog, None]:
+    """
+    Applies each action to the state in turn, recording the state after every action.
 
+    :param actions: the actions to perform: any iterable of Actions, including a generator that is consumed lazily
+           (see `streams`), or an ActionProgram. Either way, each (target, action type) pair is resolved to a bound
+           method once per run rather than once per action.
+    :param state: the state, which is modified in place.
+    :param recordState: either a callable whose return value is logged after every action, or a ColumnarRecorder,
+           which samples the metrics of its spec into columns. In the latter case the ColumnarLog is returned instead
+           of a list of dictionaries. If None, nothing is recorded and None is returned.
+    :param event_log: an EventLog that additionally logs the changes made by every action.
+    :param catch_errors: log failing actions and continue rather than raising.
+    :param verbose: print every recorded entry.
+    :param profiler: a Profiler that times and counts the actions, the internal methods of the pools and tokens, and
+           recordState; read its `report()` after the run.
+    :param checkpointer: a Checkpointer that saves the state every so many actions.
+    :param start: the number of actions already applied to the state, eg. the `action_index` of a checkpoint. The
+           first `start` actions are skipped, and the recorded action indices continue from `start`.
+    :param accumulators: Accumulators (see `online`) that fold metrics of the state into running statistics after
+           every action, alongside or instead of recording; read their `result()` after the run.
+    """
+    columnar = isinstance(recordState, ColumnarRecorder)
+    recording = recordState is not None and not columnar
     p_printer = pprint.PrettyPrinter()
-    if verbose:
-        p_printer.pprint(log[-1])
+    observe = recordState.observe if columnar else None
+    commits = [c.commit for c in (event_log, checkpointer) if c is not None]
+    observers = [a.observe for a in accumulators]
 
-    for action in actions:
+    if profiler is not None:
+        profiler.attach(state)
+        if columnar:
+            observe = profiler.wrap('recordState', observe)
+        elif recording:
+            recordState = profiler.wrap('recordState', recordState)
+    if event_log is not None:
+        event_log.attach(state)
 
-        try:
-            method_name = snake_to_camel(action.action_type)
-            actor = getattr(state, action.target)
-            # perform action
-            getattr(actor, method_name)(*action.args)
-
-            log.append({'action': {'action_type': action.action_type},
-                        'state': recordState(state)})
-        except Exception as e:
-            if not catch_errors:
-                raise e
-            else:
+    try:
+        log = None
+        if columnar:
+            if isinstance(actions, Sized):
+                recordState.reserve_for(actions)
+            observe(state, start, INITIAL_STATE)
+        elif recording:
+            log = [{'action': {'action_type': INITIAL_STATE},
+                    'state': recordState(state)}]
+            if verbose:
+                p_printer.pprint(log[-1])
+        for accumulate in observers:
+            accumulate(state, start, INITIAL_STATE)
+
+        if isinstance(actions, ActionProgram):
+            steps = actions.steps(state)
+        else:
+            steps = _resolved_steps(actions, state)
+        if start:
+            steps = itertools.islice(steps, start, None)
+        if profiler is not None:
+            steps = profiler.profile_steps(steps)
+
+        for index, (action_type, target, method, args) in enumerate(steps, start + 1):
+            try:
+                method(*args)
+            except Exception as e:
+                if not catch_errors:
+                    raise e
                 _log.error(e)
-                log.append({'action': action,
-                            'state': recordState(state)})
+                if recording:
+                    log.append({'action': Action(action_type=action_type, target=target, args=list(args)),
+                                'state': recordState(state)})
+            else:
+                if recording:
+                    log.append({'action': {'action_type': action_type},
+                                'state': recordState(state)})
 
-        if verbose:
-            p_printer.pprint(log[-1])
+            if observe is not None:
+                observe(state, index, action_type)
+            for accumulate in observers:
+                accumulate(state, index, action_type)
+            for commit in commits:
+                commit(state, index)
+            if verbose and recording:
+                p_printer.pprint(log[-1])
+    finally:
+        if event_log is not None:
+            event_log.detach()
+        if profiler is not None:
+            profiler.detach()
 
+    if columnar:
+        return recordState.result()
     return log
 
 
+def positive_normals(mean: NUMERIC_t, std: NUMERIC_t, size: int, rng=None) -> np.ndarray:
+    """
+    Integer draws of a normal distribution, truncated toward zero, conditioned on being non-negative: the result of
+    redrawing every negative draw until it is not, drawn in one shot by inverting the distribution function of the
+    upper tail, so that it costs the same however rarely a draw is non-negative.
+
+    :param rng: a numpy.random.Generator, or None for the global generator of numpy.random.
+    """
+    from scipy.special import ndtr, ndtri
+
+    if std == 0:
+        if int(mean) < 0:
+            raise ValueError(f'positive_normals: no non-negative draws of mean {mean} and std 0')
+        return np.full(size, int(mean), dtype=np.int64)
+    # a draw truncates to a non-negative integer if it is above -1.
+    tail = ndtr((mean + 1) / std)
+    if tail == 0:
+        raise ValueError(f'positive_normals: no non-negative draws of mean {mean} and std {std}')
+    u = 1 - (nrand.random(size) if rng is None else rng.random(size))
+    x = mean - std * ndtri(u * tail)
+    # u == 1 lands on the boundary at exactly -1.
+    return np.maximum(x.astype(np.int64), 0)
+
+
 def get_stakers(num_stakers: int,
                 mean: int,
-                std: int) -> List[Tuple[str, int]]:
-    found = False
-    ret = []
-    while not found:
-        ret = [(f'curator{i}', int(nrand.normal(mean, std))) for i in range(num_stakers)]
-        if all(i[1] >= 0 for i in ret):
-            found = True
-    return ret
-
-
-def get_positive_normal(mean: NUMERIC_t, std: NUMERIC_t):
-    ret = int(nrand.normal(mean, std))
-    while ret < 0:
-        ret = int(nrand.normal(mean, std))
-    return ret
+                std: int,
+                rng=None) -> List[Tuple[str, int]]:
+    """
+    Curators `curator0`, `curator1`... with stakes drawn by `positive_normals`. The draws are independent, so this is
+    the distribution of a whole population drawn again until none of its stakes is negative.
+    """
+    stakes = positive_normals(mean, std, num_stakers, rng).tolist()
+    return [(f'curator{i}', stake) for i, stake in enumerate(stakes)]
+
+
+def get_positive_normal(mean: NUMERIC_t, std: NUMERIC_t, rng=None):
+    return int(positive_normals(mean, std, 1, rng)[0])
@@ -0,0 +1,180 @@
+"""
+Lazy action streams. Scenarios are built period by period: a period function returns the actions taken in period t,
+and `periodic` follows them with a SLEEP of the period length. The streams are generators that `simulate3` consumes
+one action at a time, so the memory held by actions stays constant however long the simulation runs, and the
+number of periods may even be left open.
+"""
+from dataclasses import dataclass
+import itertools
+import random
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from curation_sim.pools.utils import ADDRESS_t
+from curation_sim.sim_utils import Action
+
+# the actions taken in period t.
+PeriodActions = Callable[[int], Iterable[Action]]
+
+
+def periodic(period_actions: Optional[PeriodActions],
+             blocks: int,
+             periods: Optional[int] = None,
+             start: int = 0) -> Iterator[Action]:
+    """
+    The actions of every period, each followed by a SLEEP of `blocks` blocks.
+
+    :param period_actions: the actions of each period, or None for idle periods.
+    :param periods: the number of periods; None streams forever.
+    :param start: the index of the first period, passed on to `period_actions`.
+    """
+    for t in (itertools.count(start) if periods is None else range(start, start + periods)):
+        if period_actions is not None:
+            yield from period_actions(t)
+        yield Action(action_type='SLEEP', target='chain', args=[blocks])
+
+
+def combine(*period_actions: PeriodActions) -> PeriodActions:
+    """the actions of several period functions, in turn."""
+    def combined(t: int) -> Iterator[Action]:
+        for p in period_actions:
+            yield from p(t)
+    return combined
+
+
+def claims(curators: Sequence[ADDRESS_t]) -> PeriodActions:
+    """every curator claims, every period."""
+    return lambda t: (Action(action_type='CLAIM', target='curationPool', args=[c]) for c in curators)
+
+
+def claim_all_then_sleep(curators: Sequence[ADDRESS_t], blocks: int, periods: Optional[int] = None) -> Iterator[Action]:
+    """periods in which every curator claims, each followed by a SLEEP of `blocks` blocks."""
+    return periodic(claims(curators), blocks, periods)
+
+
+class RandomTraders:
+    """
+    A population of traders who, every period, each deposit a further fraction of their stake with one probability,
+    withdraw a fraction of it with another, or else do nothing. Deposits are skipped when a trader's GRT outside
+    the pool does not cover them. The stakes and GRT are the traders' own bookkeeping, updated as actions are
+    emitted; `curation_sim.agents.VolTraders` reads them off the state instead, and `random_trades` draws all the
+    periods at once.
+    """
+
+    def __init__(self,
+                 stakes: Dict[ADDRESS_t, float],
+                 grt: Dict[ADDRESS_t, float],
+                 deposit_probability: float,
+                 withdraw_probability: float,
+                 trade_fraction: float,
+                 rng=random):
+        """
+        :param stakes: the GRT deposited by each trader.
+        :param grt: the GRT each trader holds outside the pool.
+        :param trade_fraction: a deposit raises a stake by this factor, and a withdrawal lowers it by its inverse.
+        :param rng: the source of randomness, anything with a `random()` method such as a seeded random.Random.
+        """
+        assert deposit_probability >= 0
+        assert withdraw_probability >= 0
+        assert deposit_probability + withdraw_probability <= 1.0
+        self.stakes: Dict[ADDRESS_t, float] = stakes
+        self.grt: Dict[ADDRESS_t, float] = grt
+        self.deposit_probability: float = deposit_probability
+        self.withdraw_probability: float = withdraw_probability
+        self.trade_fraction: float = trade_fraction
+        self.rng = rng
+
+    def __call__(self, t: int) -> Iterator[Action]:
+        for trader in self.stakes:
+            event_val = self.rng.random()
+            if event_val < self.deposit_probability:
+                amnt_up = (self.trade_fraction - 1) * self.stakes[trader]
+                if amnt_up < self.grt[trader]:
+                    yield Action(action_type='DEPOSIT', target='curationPool', args=[trader, amnt_up])
+                    self.stakes[trader] += amnt_up
+                    self.grt[trader] -= amnt_up
+            elif event_val < self.deposit_probability + self.withdraw_probability:
+                amnt_down = self.stakes[trader] * (1 - 1 / self.trade_fraction)
+                yield Action(action_type='WITHDRAW', target='curationPool', args=[trader, amnt_down])
+                self.stakes[trader] -= amnt_down
+
+
+@dataclass
+class TradeSchedule:
+    """
+    The trades of a population over a number of periods, held as arrays with one entry per trade, in the order the
+    trades are made. Called with a period, it is the period actions of that period.
+    """
+    traders: List[ADDRESS_t]
+    # the trades of period t are entries offsets[t] to offsets[t + 1].
+    offsets: np.ndarray
+    # the index of the trader making each trade.
+    trader: np.ndarray
+    # whether each trade is a deposit; the others are withdrawals.
+    deposit: np.ndarray
+    amount: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.trader)
+
+    @property
+    def periods(self) -> int:
+        return len(self.offsets) - 1
+
+    def __call__(self, t: int) -> Iterator[Action]:
+        if not 0 <= t < self.periods:
+            return
+        lo, hi = self.offsets[t:t + 2].tolist()
+        for i, deposit, amount in zip(self.trader[lo:hi].tolist(), self.deposit[lo:hi].tolist(),
+                                      self.amount[lo:hi].tolist()):
+            yield Action(action_type='DEPOSIT' if deposit else 'WITHDRAW', target='curationPool',
+                         args=[self.traders[i], amount])
+
+
+def random_trades(stakes: Dict[ADDRESS_t, float],
+                  grt: Dict[ADDRESS_t, float],
+                  deposit_probability: float,
+                  withdraw_probability: float,
+                  trade_fraction: float,
+                  periods: int,
+                  rng: Optional[np.random.Generator] = None) -> TradeSchedule:
+    """
+    The trades RandomTraders makes over a number of periods, drawn all at once: the decision of every trader in every
+    period is one periods × traders matrix of uniform draws, and the stakes and GRT are advanced a period at a time
+    for all traders together. Given a Generator, the trades are those of RandomTraders drawing from an equally seeded
+    Generator. Unlike RandomTraders, the stakes and GRT passed in are left as they are.
+    """
+    assert deposit_probability >= 0
+    assert withdraw_probability >= 0
+    assert deposit_probability + withdraw_probability <= 1.0
+    rng = np.random.default_rng() if rng is None else rng
+    traders = list(stakes)
+    stake = np.array([stakes[a] for a in traders], dtype=np.float64)
+    cash = np.array([grt[a] for a in traders], dtype=np.float64)
+
+    u = rng.random((periods, len(traders)))
+    wants_deposit = u < deposit_probability
+    wants_withdraw = ~wants_deposit & (u < deposit_probability + withdraw_probability)
+
+    amounts = np.zeros(u.shape)
+    deposits = np.zeros(u.shape, dtype=bool)
+    for t in range(periods):
+        up = (trade_fraction - 1) * stake
+        down = stake * (1 - 1 / trade_fraction)
+        deposit = wants_deposit[t] & (up < cash)
+        withdraw = wants_withdraw[t]
+        amounts[t] = np.where(deposit, up, down)
+        deposits[t] = deposit
+        stake = np.where(deposit, stake + up, np.where(withdraw, stake - down, stake))
+        cash = np.where(deposit, cash - up, cash)
+    trades = deposits | wants_withdraw
+
+    period, trader = np.nonzero(trades)
+    offsets = np.zeros(periods + 1, dtype=np.int64)
+    np.cumsum(trades.sum(axis=1), out=offsets[1:])
+    return TradeSchedule(traders=traders,
+                         offsets=offsets,
+                         trader=trader.astype(np.int32),
+                         deposit=deposits[trades],
+                         amount=amounts[trades])
@@ -0,0 +1,88 @@
+"""
+Runs grids of share-drive simulations in parallel. Each task of the grid carries its own seed, which seeds the global
+random number generators of the worker before the simulation is built, so a task gives the same result whichever
+worker runs it and in whichever order. Sweeps run in the calling process restore its generators afterwards. Tasks
+that share a seed share their random initial conditions, which makes comparisons across pool configurations and drives
+paired.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import itertools
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from curation_sim.ohq_sim_share_drive import PoolConfig, ProcessedSim, run_and_process
+
+
+@dataclass
+class SweepTask:
+    pool_config: PoolConfig
+    share_drive: Dict[int, float]
+    max_time: int
+    seed: int
+
+
+@dataclass
+class SweepResult:
+    tasks: List[SweepTask]
+    results: List[ProcessedSim]
+    # the wall time of each task in seconds, measured in the worker.
+    wall_times: np.ndarray
+
+    def __iter__(self):
+        return iter(zip(self.tasks, self.results))
+
+
+def spawn_seeds(seed: int, n: int) -> List[int]:
+    """n independent, reproducible seeds derived from one seed."""
+    return [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n)]
+
+
+def sweep_grid(pool_configs: Iterable[PoolConfig],
+               share_drives: Iterable[Dict[int, float]],
+               seeds: Iterable[int],
+               max_time: int) -> List[SweepTask]:
+    """the tasks of a PoolConfig x share drive x seed grid, with the seed varying fastest."""
+    return [SweepTask(pool_config=c, share_drive=d, max_time=max_time, seed=s)
+            for c, d, s in itertools.product(pool_configs, share_drives, seeds)]
+
+
+def _run_task(task: SweepTask,
+              runner: Callable[[PoolConfig, Dict[int, float], int], ProcessedSim]) -> Tuple[ProcessedSim, float]:
+    random.seed(task.seed)
+    np.random.seed(task.seed % 2**32)
+    start = time.perf_counter()
+    result = runner(task.pool_config, task.share_drive, task.max_time)
+    return result, time.perf_counter() - start
+
+
+def run_sweep(tasks: List[SweepTask],
+              processes: Optional[int] = None,
+              chunksize: int = 1,
+              runner: Callable[[PoolConfig, Dict[int, float], int], ProcessedSim] = run_and_process) -> SweepResult:
+    """
+    :param tasks: the tasks to run, eg. from `sweep_grid`.
+    :param processes: the number of worker processes; None uses one per core, and 1 runs in this process.
+    :param chunksize: the number of tasks sent to a worker at once. Larger chunks amortise the inter-process
+           overhead of grids of many short simulations.
+    :param runner: a picklable, module-level function that runs and processes one simulation.
+    :return: the results, in the order of `tasks`.
+    """
+    if processes == 1:
+        # the tasks reseed the global generators, which belong to the caller here.
+        random_state, np_random_state = random.getstate(), np.random.get_state()
+        try:
+            outputs = [_run_task(t, runner) for t in tasks]
+        finally:
+            random.setstate(random_state)
+            np.random.set_state(np_random_state)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            outputs = list(executor.map(_run_task, tasks, itertools.repeat(runner), chunksize=chunksize))
+
+    return SweepResult(tasks=list(tasks),
+                       results=[r for r, _ in outputs],
+                       wall_times=np.array([t for _, t in outputs]))
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from curation_sim.agents import (MarketBuyers, SensibleCurators, VolTraders, Whale, agent_actions, deposits_of,
+                                 share_price)
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import simulate3
+from curation_sim.streams import periodic
+
+
+class TestAgents(unittest.TestCase):
+
+    def setUp(self):
+        self.workload = Workload(num_curators=200, periods=0)
+        self.curators = self.workload.curators
+
+    def test_vol_traders_observe_state(self):
+        def run(pool_cls, token_cls):
+            state = self.workload.state(pool_cls, token_cls)
+            traders = VolTraders(self.curators, .3, .3, 1.05, rng=np.random.default_rng(0))
+            actions = []
+            for action in periodic(agent_actions(state, traders), blocks=100, periods=20):
+                if action.action_type == 'DEPOSIT':
+                    # deposits grow the live deposit, not a copy of it.
+                    self.assertAlmostEqual(action.args[1], .05 * state.curationPool.depositOf(action.args[0]))
+                actions.append(action)
+                simulate3([action], state)
+            return actions, state
+
+        actions, state = run(CurationPool, Token)
+        array_actions, array_state = run(ArrayCurationPool, ArrayToken)
+        self.assertEqual(len(actions), len(array_actions))
+        self.assertEqual({a.action_type for a in actions}, {'DEPOSIT', 'WITHDRAW', 'SLEEP'})
+        np.testing.assert_allclose(deposits_of(state.curationPool, self.curators),
+                                   deposits_of(array_state.curationPool, self.curators))
+
+    def test_sensible_curators_and_whale(self):
+        state = self.workload.state()
+        agents = (SensibleCurators(self.curators[:2], growth=.1, every=2),
+                  Whale('market', 5_000, enter=1, exit=3))
+        log = simulate3(periodic(agent_actions(state, *agents), blocks=10, periods=5), state,
+                        lambda s: (s.curationPool.depositOf('curator0'), s.curationPool.depositOf('market')))
+        self.assertAlmostEqual(state.curationPool.depositOf('curator0'), 1_000 * 1.1 ** 3)
+        self.assertEqual(state.curationPool.depositOf('curator2'), 1_000)
+        self.assertEqual(state.curationPool.depositOf('market'), 0)
+        self.assertEqual(max(entry['state'][1] for entry in log), 5_000)
+
+    def test_market_buyers_respond_to_price(self):
+        state = self.workload.state(ArrayCurationPool, ArrayToken)
+        price = share_price(state.curationPool)
+        buyers = [f'buyer{i}' for i in range(10_000)]
+        state.reserveToken.balances.update({b: 100. for b in buyers})
+        valuations = np.random.default_rng(0).uniform(.5, 2., len(buyers)) * price
+        agent = MarketBuyers(buyers, valuations, shares=1.)
+
+        position = {b: i for i, b in enumerate(buyers)}
+        purchases = 0
+        for action in periodic(agent_actions(state, agent), blocks=1, periods=3):
+            if action.action_type == 'BUY_SHARES':
+                purchases += 1
+                self.assertGreater(valuations[position[action.args[0]]], share_price(state.curationPool))
+            simulate3([action], state)
+        bought = state.curationPool.shareToken.balancesOf(buyers) > 0
+        self.assertEqual(purchases, np.sum(state.curationPool.shareToken.balancesOf(buyers)))
+        self.assertTrue(bought.any())
+        self.assertFalse(bought[valuations <= share_price(state.curationPool)].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+
+from curation_sim.analysis import (_relaxation, ema, fit_exponential, fit_least_squares, fit_linear, fit_lowpass,
+                                   fit_relaxation, lowpass)
+
+
+def _lowpass(x, a):
+    y = [x[0]]
+    for i in range(1, len(x)):
+        y.append(a * y[i - 1] + (1 - a) * x[i])
+    return y
+
+
+def _ema(x, a):
+    num, denom = [x[0]], [1]
+    for i in range(1, len(x)):
+        num.append(x[i] + a * num[i - 1])
+        denom.append(denom[i - 1] + a ** i)
+    return [i / j for i, j in zip(num, denom)]
+
+
+class TestFilters(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.random.default_rng(0).random((4, 30))
+
+    def test_lowpass(self):
+        expected = [_lowpass(x, .7) for x in self.x]
+        np.testing.assert_allclose(lowpass(self.x, .7), expected)
+        np.testing.assert_allclose(lowpass(self.x.T, .7, axis=0).T, expected)
+        a = np.array([[.1], [.4], [.7], [.9]])
+        np.testing.assert_allclose(lowpass(self.x, a), [_lowpass(x, b) for x, b in zip(self.x, a[:, 0])])
+
+    def test_ema(self):
+        np.testing.assert_allclose(ema(self.x, .8), [_ema(x, .8) for x in self.x])
+        np.testing.assert_allclose(ema(self.x[0], 1.), np.cumsum(self.x[0]) / np.arange(1, 31))
+
+
+class TestFits(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1)
+        self.t = np.arange(60.)
+
+    def test_fit_linear(self):
+        basis = np.stack([np.ones(60), self.t], axis=-1)
+        c = self.rng.random((5, 2))
+        np.testing.assert_allclose(fit_linear(basis, c @ basis.T), c)
+        # a basis per trajectory.
+        bases = np.stack([basis * s for s in range(1, 6)])
+        y = np.einsum('ntk,nk->nt', bases, c)
+        np.testing.assert_allclose(fit_linear(bases, y), c)
+
+    def test_fit_exponential(self):
+        scale, rate = fit_exponential(self.t, [2 * np.exp(-.1 * self.t), 3 * np.exp(.05 * self.t)])
+        np.testing.assert_allclose(scale, [2, 3])
+        np.testing.assert_allclose(rate, [-.1, .05])
+
+    def test_fit_relaxation(self):
+        n = 500
+        a, b, rate = self.rng.uniform(4, 6, n), self.rng.uniform(3, 5, n), -self.rng.uniform(.03, .2, n)
+        y = a[:, None] - b[:, None] * np.exp(rate[:, None] * self.t) + self.rng.normal(0, .01, (n, 60))
+        fit = fit_relaxation(self.t, y)
+        self.assertTrue(fit.converged.all())
+        np.testing.assert_allclose(fit.params[:, 2], rate, atol=5e-3)
+        # no trajectory is left worse off than its true parameters.
+        truth = ((a[:, None] - b[:, None] * np.exp(rate[:, None] * self.t) - y) ** 2).sum(axis=1)
+        self.assertTrue((fit.cost <= truth + 1e-12).all())
+
+    def test_bounds(self):
+        model = lambda t, c: c * np.ones_like(t)
+        fit = fit_least_squares(model, self.t, np.full((2, 60), 5.), [1.], bounds=([0.], [3.]))
+        np.testing.assert_allclose(fit.params[:, 0], [3, 3])
+
+    def test_not_converged(self):
+        # a fit no step can improve stalls, and a fit cut short runs out of iterations; neither has converged.
+        model = lambda t, c: np.where(c == 1., t, np.nan)
+        self.assertFalse(fit_least_squares(model, self.t, 2 * self.t, [1.]).converged[0])
+
+        y = 4 - 3 * np.exp(-.1 * self.t)
+        self.assertTrue(fit_least_squares(_relaxation, self.t, y, [0., 0., -1e-3]).converged[0])
+        self.assertFalse(fit_least_squares(_relaxation, self.t, y, [0., 0., -1e-3], max_iterations=1).converged[0])
+
+    def test_fit_lowpass(self):
+        a = np.linspace(.1, .9, 20)
+        x = self.rng.random((20, 50))
+        fit = fit_lowpass(x, lowpass(x, a[:, None]))
+        np.testing.assert_allclose(fit.params[:, 0], a, atol=1e-8)
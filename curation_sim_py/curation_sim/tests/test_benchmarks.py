@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from curation_sim.benchmarks.suite import BENCHMARKS, ENGINES, compare, load_baselines, run_suite, save_baselines
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.sim_utils import simulate3
+
+
+class TestWorkload(unittest.TestCase):
+
+    def test_actions(self):
+        workload = Workload(num_curators=50, periods=30, mix={'WITHDRAW': .5, 'CLAIM': .1, 'BUY_SHARES': 1.})
+        actions = workload.actions()
+
+        self.assertEqual(actions, workload.actions())
+        self.assertEqual(sum(a.action_type == 'SLEEP' for a in actions), 30)
+        self.assertEqual(sum(a.action_type == 'BUY_SHARES' for a in actions), 30)
+        self.assertEqual({a.action_type for a in actions}, {'SLEEP', 'BUY_SHARES', 'WITHDRAW', 'CLAIM'})
+
+        # every action, including the withdrawals, succeeds on both engines.
+        simulate3(actions, workload.state())
+        simulate3(actions, workload.state(ArrayCurationPool, ArrayToken))
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_baselines(self):
+        results = run_suite(sizes=(10,), benchmarks=['token.transfer', 'simulate3'], engines=['dict'], repeat=3,
+                            min_seconds=.01)
+        self.assertEqual([r.key for r in results], ['dict/token.transfer[10]', 'dict/simulate3[10]'])
+        # runs are lengthened to the minimum duration.
+        self.assertTrue(all(r.seconds >= .005 and r.ops > 10 for r in results))
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'baselines.json')
+            save_baselines(results, path)
+            baselines = load_baselines(path)
+        self.assertEqual(compare(results, baselines), [])
+
+        baselines['dict/simulate3[10]'].seconds /= 10
+        results[1].spread = baselines['dict/simulate3[10]'].spread = 0.
+        baselines['dict/token.transfer[10]'].peak_bytes //= 1_000
+        regressions = compare(results, baselines, memory_slack=0)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('dict/token.transfer[10]: peak'))
+
+        # a drop within the spread of the runs is noise.
+        baselines['dict/simulate3[10]'].spread = .95
+        self.assertEqual(len(compare(results, baselines, memory_slack=0)), 1)
+
+    def test_every_benchmark_runs(self):
+        for name in BENCHMARKS:
+            for engine in ENGINES:
+                ops, run = BENCHMARKS[name](10, engine, 100)
+                run()
+                self.assertGreater(ops, 0)
@@ -0,0 +1,100 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.checkpoint import Checkpointer, load_checkpoint, save_checkpoint
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.numeric import FIXED18, Wad
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import record_effective_state, simulate3
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.workload = Workload(num_curators=20, periods=30, mix={'DEPOSIT': .1, 'WITHDRAW': .1, 'CLAIM': .1,
+                                                                   'BUY_SHARES': .5})
+        self.actions = self.workload.actions()
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'state.npz')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _check_resume(self, pool_cls, token_cls):
+        expected = simulate3(self.actions, self.workload.state(pool_cls, token_cls), record_effective_state)
+
+        half = len(self.actions) // 2
+        state = self.workload.state(pool_cls, token_cls)
+        simulate3(self.actions[:half], state)
+        save_checkpoint(self.path, state, half)
+
+        checkpoint = load_checkpoint(self.path)
+        self.assertEqual(checkpoint.action_index, half)
+        self.assertIs(type(checkpoint.state.curationPool), pool_cls)
+        self.assertIs(type(checkpoint.state.curationPool.shareToken), token_cls)
+        resumed = simulate3(self.actions, checkpoint.state, record_effective_state, start=half)
+
+        self.assertEqual(len(resumed), len(expected) - half)
+        for entry, resumed_entry in zip(expected[half:], resumed):
+            for key in ('time', 'totalShares', 'primaryPoolTotalDeposits', 'secondaryPoolTotalDeposits'):
+                self.assertAlmostEqual(entry['state'][key], resumed_entry['state'][key], places=6)
+            for key in ('shareBalances', 'depositBalances', 'reserveBalances'):
+                self.assertEqual(set(entry['state'][key]), set(resumed_entry['state'][key]))
+                for account, value in entry['state'][key].items():
+                    self.assertAlmostEqual(value, resumed_entry['state'][key][account], places=6)
+
+    def test_resume(self):
+        self._check_resume(CurationPool, Token)
+
+    def test_resume_array_engine(self):
+        self._check_resume(ArrayCurationPool, ArrayToken)
+
+    def test_fixed_point(self):
+        # a fixed-point state restores to the unit, and resumes to the state of an uninterrupted run.
+        actions = self.workload.actions(FIXED18)
+        for pool_cls, token_cls in ((CurationPool, Token), (ArrayCurationPool, ArrayToken)):
+            expected = self.workload.state(pool_cls, token_cls, FIXED18)
+            simulate3(actions, expected)
+
+            half = len(actions) // 2
+            state = self.workload.state(pool_cls, token_cls, FIXED18)
+            simulate3(actions[:half], state)
+            save_checkpoint(self.path, state, half)
+            checkpoint = load_checkpoint(self.path)
+            self.assertIs(checkpoint.state.reserveToken.numeric, FIXED18)
+            self.assertEqual(checkpoint.state.curationPool.secondaryPool.totalDeposits,
+                             state.curationPool.secondaryPool.totalDeposits)
+
+            resumed = checkpoint.state
+            simulate3(actions, resumed, start=half)
+            for curator in self.workload.curators:
+                share_balance = resumed.curationPool.shareToken.balanceOf(curator)
+                self.assertIs(type(share_balance), Wad)
+                self.assertEqual(share_balance, expected.curationPool.shareToken.balanceOf(curator))
+                self.assertEqual(resumed.reserveToken.balanceOf(curator), expected.reserveToken.balanceOf(curator))
+                self.assertEqual(resumed.curationPool.depositOf(curator), expected.curationPool.depositOf(curator))
+            self.assertEqual(resumed.curationPool.totalShares, expected.curationPool.totalShares)
+
+    def test_rng_states(self):
+        rng, generator = random.Random(1), np.random.default_rng(1)
+        np.random.seed(5)
+        save_checkpoint(self.path, self.workload.state(), rngs={'scenario': rng, 'generator': generator})
+        expected = (rng.random(), generator.random(), np.random.random())
+
+        load_checkpoint(self.path, rngs={'scenario': rng, 'generator': generator})
+        self.assertEqual((rng.random(), generator.random(), np.random.random()), expected)
+
+    def test_checkpointer(self):
+        state = self.workload.state()
+        simulate3(self.actions, state, checkpointer=Checkpointer(self.path, every=10))
+        checkpoint = load_checkpoint(self.path)
+
+        self.assertEqual(checkpoint.action_index, len(self.actions) // 10 * 10)
+        self.assertFalse(os.path.exists(f'{self.path}.tmp'))
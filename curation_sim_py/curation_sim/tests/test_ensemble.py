@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from curation_sim.ensemble import EnsembleResult, StreamingQuantile, run_ensemble
+
+PERIODS = 4
+
+
+def _replica(seed: int):
+    rng = np.random.default_rng(seed)
+    return {'walk': np.cumsum(rng.normal(size=PERIODS)), 'level': rng.uniform(size=PERIODS)}
+
+
+class TestEnsemble(unittest.TestCase):
+
+    def test_moments_and_quantiles(self):
+        seeds = range(2_000)
+        result = run_ensemble(_replica, seeds, quantiles=(.1, .5, .9))
+        samples = {k: np.stack([_replica(s)[k] for s in seeds]) for k in ('walk', 'level')}
+
+        self.assertEqual(result.count, 2_000)
+        for k, v in samples.items():
+            np.testing.assert_allclose(result.mean[k], v.mean(axis=0))
+            np.testing.assert_allclose(result.variance[k], v.var(axis=0, ddof=1))
+            np.testing.assert_allclose(result.quantiles[k], np.quantile(v, (.1, .5, .9), axis=0), atol=.1)
+
+        lower, upper = result.band('walk', .1, .9)
+        self.assertTrue((lower < result.quantile('walk', .5)).all())
+        self.assertTrue((result.quantile('walk', .5) < upper).all())
+        with self.assertRaises(ValueError):
+            result.quantile('walk', .95)
+
+    def test_few_samples_are_exact(self):
+        q = StreamingQuantile(.5, (2,))
+        for x in ([1., 5.], [3., 4.], [2., 6.]):
+            q.update(np.array(x))
+        np.testing.assert_array_equal(q.value, [2., 5.])
+
+    def test_save_load(self):
+        result = run_ensemble(_replica, range(10))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'ensemble.npz')
+            result.save(path)
+            loaded = EnsembleResult.load(path)
+
+        self.assertEqual(loaded.count, 10)
+        np.testing.assert_array_equal(loaded.quantile_levels, result.quantile_levels)
+        for k in ('walk', 'level'):
+            np.testing.assert_array_equal(loaded.mean[k], result.mean[k])
+            np.testing.assert_array_equal(loaded.quantiles[k], result.quantiles[k])
@@ -0,0 +1,126 @@
+import copy
+import unittest
+
+import numpy as np
+
+from curation_sim.event_log import EventLog
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.numeric import FIXED18, FLOAT
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import Action, State, simulate3
+from curation_sim.streams import claims, combine, periodic, random_trades
+
+
+def _build_state(pool_cls=CurationPool, token_cls=Token, numeric=FLOAT, **kwargs):
+    deposits = [('curator0', 1_000), ('curator1', 3_000)]
+    reserve = token_cls({'curationPool': 4_000, 'curator2': 2_000, 'buyer': 10_000}, numeric=numeric)
+    chain = Chain()
+    pool = pool_cls(address='curationPool',
+                    initialShareBalances={k: v for k, v in deposits},
+                    initialDeposits=deposits,
+                    chain=chain,
+                    reserveToken=reserve,
+                    issuanceRate=1e-4,
+                    **kwargs)
+    return State(chain, reserve, pool)
+
+
+def _actions():
+    actions = []
+    for t in range(20):
+        if t == 3:
+            actions.append(Action(action_type='DEPOSIT', target='curationPool', args=['curator2', 1_500]))
+        if t == 7:
+            actions.append(Action(action_type='BUY_SHARES', target='curationPool', args=['buyer', 100]))
+        if t == 12:
+            actions.append(Action(action_type='WITHDRAW', target='curationPool', args=['curator0', 500]))
+        actions.append(Action(action_type='CLAIM', target='curationPool', args=['curator1']))
+        actions.append(Action(action_type='SLEEP', target='chain', args=[100]))
+    return actions
+
+
+def _record(state):
+    return {'blockHeight': state.chain.blockHeight,
+            'reserveToken.balance': copy.deepcopy(state.reserveToken.balances),
+            'shareToken.balance': copy.deepcopy(state.curationPool.shareToken.balances),
+            'curationPool.deposit': copy.deepcopy(state.curationPool.deposits),
+            'secondaryPool.deposit': {k: v.deposit for k, v in state.curationPool.secondaryPool.snapshots.items()}}
+
+
+class TestEventLog(unittest.TestCase):
+
+    def _check_reconstruction(self, pool_cls, token_cls, numeric=FLOAT):
+        event_log = EventLog(keyframe_interval=7)
+        expected = simulate3(_actions(), _build_state(pool_cls, token_cls, numeric), _record, event_log=event_log)
+
+        self.assertEqual(event_log.num_actions, len(expected) - 1)
+        for index, entry in enumerate(expected):
+            logged = event_log.reconstruct(index)
+            self.assertEqual(logged.scalars['chain.blockHeight'], entry['state']['blockHeight'])
+            for field in ('reserveToken.balance', 'shareToken.balance', 'curationPool.deposit',
+                          'secondaryPool.deposit'):
+                self.assertEqual(set(logged.fields[field]), set(entry['state'][field]), (index, field))
+                for account, value in entry['state'][field].items():
+                    self.assertEqual(logged.fields[field][account], value, (index, field, account))
+
+    def test_reconstruction(self):
+        self._check_reconstruction(CurationPool, Token)
+
+    def test_reconstruction_array_engine(self):
+        self._check_reconstruction(ArrayCurationPool, ArrayToken)
+
+    def test_reconstruction_fixed_point(self):
+        self._check_reconstruction(CurationPool, Token, FIXED18)
+        self._check_reconstruction(ArrayCurationPool, ArrayToken, FIXED18)
+
+    def test_long_run(self):
+        # rebuilt states do not drift from the run over many actions of fractional amounts.
+        trades = random_trades({'curator0': 1_000., 'curator1': 3_000.}, {'curator0': 0., 'curator1': 0.}, .3, .3, 1.1,
+                               periods=300, rng=np.random.default_rng(0))
+        actions = periodic(combine(trades, claims(['curator0', 'curator1'])), blocks=10, periods=300)
+        event_log = EventLog()
+        expected = simulate3(actions, _build_state(), _record, event_log=event_log)
+        for index, entry in enumerate(expected):
+            logged = event_log.reconstruct(index)
+            for field in ('reserveToken.balance', 'shareToken.balance', 'curationPool.deposit'):
+                self.assertEqual(logged.fields[field], entry['state'][field], (index, field))
+
+    def test_rebase(self):
+        # a rebase rescales every account's shares without moving tokens; rebuilt states still match the run.
+        for pool_cls, token_cls in ((CurationPool, Token), (ArrayCurationPool, ArrayToken)):
+            state = _build_state(pool_cls, token_cls, rebaseAbove=4_500)
+            event_log = EventLog(keyframe_interval=1_000)
+            expected = simulate3(_actions(), state, _record, event_log=event_log)
+            self.assertGreater(state.curationPool.logShareUnit, 0)
+            for index, entry in enumerate(expected):
+                logged = event_log.reconstruct(index)
+                self.assertEqual(logged.fields['shareToken.balance'], entry['state']['shareToken.balance'], index)
+            final = event_log.reconstruct(event_log.num_actions)
+            self.assertEqual(final.scalars['curationPool.logShareUnit'], state.curationPool.logShareUnit)
+            self.assertEqual(final.scalars['curationPool.mintedLogIndex'], state.curationPool.mintedLogIndex)
+            self.assertEqual(final.fields['curationPool.shares'],
+                             {k: v.shares for k, v in state.curationPool.snapshots.items()})
+
+    def test_entries_and_block_lookup(self):
+        event_log = EventLog()
+        state = _build_state()
+        simulate3(_actions(), state, event_log=event_log)
+
+        # a sleep only advances the chain.
+        self.assertEqual(event_log.entries(2), [('chain.blockHeight', None, 100)])
+        # a claim touches a handful of accounts.
+        self.assertLessEqual(len({account for _, account, _ in event_log.entries(3)}), 4)
+
+        logged = event_log.reconstruct_at_block(250)
+        self.assertEqual(logged.scalars['chain.blockHeight'], 200)
+        final = event_log.reconstruct(event_log.num_actions).fields['shareToken.balance']
+        self.assertEqual(final, state.curationPool.shareToken.balances)
+
+    def test_hooks_removed(self):
+        state = _build_state()
+        simulate3(_actions(), state, event_log=EventLog())
+        self.assertEqual(state.reserveToken.hooks['postTransfer'], [])
+        self.assertEqual(state.curationPool.shareToken.hooks['postMint'], [])
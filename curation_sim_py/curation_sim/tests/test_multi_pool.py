@@ -0,0 +1,87 @@
+import time
+import unittest
+
+from curation_sim.multi_pool import build_multi_pool_state
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.sim_utils import Action, simulate3
+
+
+class TestMultiPool(unittest.TestCase):
+
+    def setUp(self):
+        self.state = build_multi_pool_state(
+            [[('alice', 100), ('bob', 50)], [('bob', 200)], [('carol', 10)]],
+            {'alice': 1000, 'bob': 1000, 'carol': 1000, 'market': 1000},
+            issuanceRate=1e-3)
+
+    def test_index(self):
+        pools = self.state.pool
+        self.assertEqual(pools.poolsOf('bob'), [0, 1])
+        self.assertEqual(pools.poolsOf('alice'), [0])
+        self.assertEqual(pools.poolsOf('market'), [])
+
+    def test_pool_targets(self):
+        simulate3([Action('BUY_SHARES', 'pool[1]', ['market', 10]),
+                   Action('SLEEP', 'chain', [10]),
+                   Action('DEPOSIT', 'pool', [2, 'alice', 30])], self.state)
+        pools = self.state.pool
+        self.assertEqual(pools[1].shareToken.balanceOf('market'), 10)
+        self.assertEqual(pools[0].shareToken.balanceOf('market'), 0)
+        self.assertEqual(pools[2].depositOf('alice'), 30)
+        self.assertEqual(pools.poolsOf('alice'), [0, 2])
+        self.assertEqual(self.state.reserveToken.balanceOf('pool2'), 40)
+        self.assertEqual(self.state.reserveToken.balanceOf('alice'), 970)
+        # the secondary pools have distinct addresses.
+        self.assertEqual(len({p.secondaryPool.address for p in pools}), 3)
+
+    def test_move_signal(self):
+        pools = self.state.pool
+        simulate3([Action('MOVE_SIGNAL', 'pool', ['bob', 0, 2, 50])], self.state)
+        self.assertEqual(pools[0].depositOf('bob'), 0)
+        self.assertEqual(pools[2].depositOf('bob'), 50)
+        self.assertEqual(pools.poolsOf('bob'), [1, 2])
+        self.assertEqual(self.state.reserveToken.balanceOf('bob'), 1000)
+
+    def test_claim_touches_own_pools(self):
+        pools = self.state.pool
+        self.state.chain.sleep(100)
+        pools.claim('bob')
+        self.assertEqual(pools[0].lastMintedBlock, self.state.chain.blockHeight)
+        self.assertEqual(pools[1].lastMintedBlock, self.state.chain.blockHeight)
+        self.assertEqual(pools[2].lastMintedBlock, 0)
+
+    def test_pool_target_deposits(self):
+        # deposits and withdrawals through a single pool keep the index current, so a claim through the set finds them.
+        simulate3([Action('DEPOSIT', 'pool[1]', ['alice', 30]),
+                   Action('WITHDRAW', 'pool[0]', ['bob', 50]),
+                   Action('SLEEP', 'chain', [100]),
+                   Action('CLAIM', 'pool', ['alice'])], self.state)
+        pools = self.state.pool
+        self.assertEqual(pools.poolsOf('alice'), [0, 1])
+        self.assertEqual(pools.poolsOf('bob'), [1])
+        self.assertEqual(pools[1].depositOf('alice'), 30)
+        self.assertEqual(pools[1].lastMintedBlock, self.state.chain.blockHeight)
+
+    def test_fork(self):
+        fork = self.state.fork()
+        fork.pool.moveSignal('bob', 0, 2, 50)
+        self.assertEqual(self.state.pool[0].depositOf('bob'), 50)
+        self.assertEqual(self.state.pool.poolsOf('bob'), [0, 1])
+        self.assertIs(fork.pool[2].chain, fork.chain)
+
+    def test_many_pools(self):
+        n = 10_000
+        start = time.perf_counter()
+        state = build_multi_pool_state([[(f'curator{i % 100}', 10)] for i in range(n)], {'market': 1e6},
+                                       issuanceRate=1e-4, pool_cls=ArrayCurationPool, token_cls=ArrayToken)
+        simulate3([Action('SLEEP', 'chain', [1000]),
+                   Action('CLAIM', 'pool', ['curator7']),
+                   Action('BUY_SHARES', f'pool[{n - 1}]', ['market', 1])], state)
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertEqual(len(state.pool.poolsOf('curator7')), n // 100)
+        self.assertEqual(state.pool[n - 1].shareToken.balanceOf('market'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
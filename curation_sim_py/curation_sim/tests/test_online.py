@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from curation_sim.analysis import lowpass
+from curation_sim.online import EWMA, MinMax, RunningMean, TimeToThreshold, summarize
+from curation_sim.ohq_sim_whale import RECORDER_SPEC, SCENARIO, _whale_to_curators_share_ratio
+from curation_sim.recorder import INITIAL_STATE
+from curation_sim.scenarios import run_scenario
+
+
+class TestOnline(unittest.TestCase):
+
+    def test_scalar(self):
+        xs = np.random.default_rng(0).normal(size=100)
+        accumulators = [RunningMean('mean', None), EWMA('ewma', None, a=.7), MinMax('range', None),
+                        TimeToThreshold('up', None, 2.), TimeToThreshold('down', None, -1., below=True)]
+        for i, x in enumerate(xs):
+            for a in accumulators:
+                a.fn = lambda s: x
+                a.observe(None, i, INITIAL_STATE if i == 0 else 'SLEEP')
+        result = summarize(accumulators)
+
+        self.assertEqual(result['mean']['count'], 100)
+        self.assertAlmostEqual(result['mean']['mean'], xs.mean())
+        self.assertAlmostEqual(result['mean']['variance'], xs.var())
+        self.assertAlmostEqual(result['ewma']['value'], lowpass(xs, .7)[-1])
+        self.assertEqual(result['range']['min'], xs.min())
+        self.assertEqual(result['range']['argmax'], xs.argmax())
+        self.assertEqual(result['up']['index'], np.argmax(xs >= 2.))
+        self.assertEqual(result['down']['reads'], np.argmax(xs <= -1.))
+
+    def test_vector(self):
+        xs = np.random.default_rng(1).normal(size=(50, 3))
+        mean, range_, threshold = RunningMean('mean', None), MinMax('range', None), TimeToThreshold('t', None, 1.5)
+        for i, x in enumerate(xs):
+            for a in (mean, range_, threshold):
+                a.fn = lambda s: x
+                a.observe(None, i, 'SLEEP')
+        np.testing.assert_allclose(mean.result()['std'], xs.std(axis=0))
+        np.testing.assert_array_equal(range_.result()['argmin'], xs.argmin(axis=0))
+        reached = xs >= 1.5
+        np.testing.assert_array_equal(threshold.result()['index'],
+                                      np.where(reached.any(axis=0), reached.argmax(axis=0), -1))
+
+    def test_empty(self):
+        self.assertEqual(TimeToThreshold('t', None, 1.).result()['index'], -1)
+        self.assertTrue(np.isnan(RunningMean('mean', None).result()['mean']))
+
+    def test_simulate(self):
+        # the statistics of the whale scenario, accumulated during the run, are those of its recorded log.
+        accumulators = SCENARIO.statistics() + [EWMA('ewma', _whale_to_curators_share_ratio, a=.9,
+                                                     action_types=RECORDER_SPEC.action_types, initial=False)]
+        ratio = run_scenario(SCENARIO, seed=1, accumulators=accumulators)['ratio']
+        result = summarize(accumulators)
+        self.assertEqual(result['ratio_range']['max'], ratio.max())
+        self.assertAlmostEqual(result['ratio_mean']['mean'], ratio.mean())
+        self.assertEqual(result['ratio_reaches_4']['reads'], np.argmax(ratio >= 4))
+        self.assertAlmostEqual(result['ewma']['value'], lowpass(ratio, .9)[-1])
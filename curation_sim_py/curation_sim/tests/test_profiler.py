@@ -0,0 +1,54 @@
+import copy
+import json
+import unittest
+
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.profiler import Profiler
+from curation_sim.recorder import ColumnarRecorder, Metric, RecorderSpec
+from curation_sim.sim_utils import Action, compile_actions, record_effective_state, simulate3
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.workload = Workload(num_curators=20, periods=5, mix={'DEPOSIT': .2, 'CLAIM': .2, 'BUY_SHARES': 1.})
+        self.actions = self.workload.actions()
+
+    def test_counts(self):
+        deepcopy = copy.deepcopy
+        state = self.workload.state()
+        profiler = Profiler()
+        log = simulate3(compile_actions(self.actions), state, record_effective_state, profiler=profiler)
+        report = profiler.report()
+
+        expected = {}
+        for a in self.actions:
+            expected[a.action_type] = expected.get(a.action_type, 0) + 1
+        self.assertEqual({k: s.calls for k, s in report.actions.items()}, expected)
+        self.assertEqual(report.methods['recordState'].calls, len(log))
+        self.assertEqual(report.methods['curationPool.buyShares'].calls, 5)
+        # two deep copies per recorded state.
+        self.assertEqual(report.counters['deepcopy'], 2 * len(log))
+        self.assertEqual(report.counters['mint'], report.methods['curationPool.shareToken.mint'].calls)
+        self.assertGreater(report.counters['transfer'], 0)
+        self.assertEqual(json.loads(report.to_json())['counters'], report.counters)
+        self.assertIn('curationPool.mintShares', report.table())
+
+        # the instrumentation is removed after the run.
+        self.assertIs(copy.deepcopy, deepcopy)
+        self.assertNotIn('mintShares', vars(state.curationPool))
+        self.assertNotIn('transfer', vars(state.reserveToken))
+
+    def test_memory_and_errors(self):
+        recorder = ColumnarRecorder(RecorderSpec([Metric('time', lambda s: s.chain.blockHeight)]))
+        profiler = Profiler(memory=True)
+        actions = self.actions + [Action(action_type='WITHDRAW', target='curationPool', args=['nobody', 1])]
+        state = self.workload.state()
+        with self.assertRaises(AssertionError):
+            simulate3(actions, state, recorder, profiler=profiler)
+
+        report = profiler.report()
+        self.assertEqual(report.actions['WITHDRAW'].calls, 1)
+        self.assertGreater(report.actions['DEPOSIT'].bytes, 0)
+        self.assertEqual(report.methods['recordState'].calls, len(self.actions) + 1)
+        self.assertNotIn('deposit', vars(state.curationPool))
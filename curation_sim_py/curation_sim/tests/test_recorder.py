@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.recorder import ColumnarRecorder, Metric, RecorderSpec, share_balances
+from curation_sim.sim_utils import Action, State, simulate3, record_effective_state
+
+
+def _build_state():
+    deposits = [('curator0', 1_000), ('curator1', 3_000)]
+    reserve = Token({'curationPool': 4_000, 'curator2': 1_000})
+    chain = Chain()
+    pool = CurationPool(address='curationPool',
+                        initialShareBalances={k: v for k, v in deposits},
+                        initialDeposits=deposits,
+                        chain=chain,
+                        reserveToken=reserve,
+                        issuanceRate=1e-4)
+    return State(chain, reserve, pool)
+
+
+def _actions(periods: int):
+    actions = []
+    for t in range(periods):
+        if t == 2:
+            actions.append(Action(action_type='DEPOSIT', target='curationPool', args=['curator2', 1_000]))
+        actions.append(Action(action_type='SLEEP', target='chain', args=[100]))
+    return actions
+
+
+SPEC = RecorderSpec(metrics=[Metric('time', lambda s: s.chain.blockHeight, dtype=np.int64),
+                             share_balances('shares', ['curator0', 'curator1', 'curator2'])],
+                    action_types=('SLEEP',))
+
+
+class TestColumnarRecorder(unittest.TestCase):
+
+    def test_matches_dict_log(self):
+        expected = simulate3(_actions(10), _build_state(), record_effective_state)
+        expected = [e for e in expected if e['action']['action_type'] in ('INITIAL_STATE', 'SLEEP')]
+
+        log = simulate3(_actions(10), _build_state(), ColumnarRecorder(SPEC))
+
+        self.assertEqual(len(log), len(expected))
+        self.assertEqual(log.action_types(), ['INITIAL_STATE'] + ['SLEEP'] * 10)
+        np.testing.assert_array_equal(log['time'], [e['state']['time'] for e in expected])
+        for column, account in enumerate(['curator0', 'curator1', 'curator2']):
+            np.testing.assert_allclose(log['shares'][:, column],
+                                       [e['state']['shareBalances'].get(account, 0) for e in expected])
+
+    def test_stride(self):
+        spec = RecorderSpec(metrics=SPEC.metrics, action_types=('SLEEP',), stride=3, initial=False)
+        log = simulate3(_actions(10), _build_state(), ColumnarRecorder(spec))
+
+        np.testing.assert_array_equal(log['time'], [100, 400, 700, 1000])
+        np.testing.assert_array_equal(log.action_index, [1, 5, 8, 11])
+
+    def test_growth(self):
+        recorder = ColumnarRecorder(SPEC, capacity=1)
+        log = simulate3(iter(_actions(10)), _build_state(), recorder)
+
+        self.assertEqual(len(log), 11)
+        self.assertGreaterEqual(recorder.capacity, 11)
+        self.assertEqual(log['shares'].shape, (11, 3))
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from curation_sim.recorder import ColumnarRecorder
+from curation_sim.results import ResultsWriter, load_results, read_manifest
+from curation_sim.sim_utils import Action, simulate3
+from curation_sim.tests.test_recorder import SPEC, _actions, _build_state
+
+
+class TestResults(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'results')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_matches_columnar_recorder(self):
+        expected = simulate3(_actions(10), _build_state(), ColumnarRecorder(SPEC))
+        # room for 3 samples at a time: 8 bytes of time, 24 of shares and 10 of action index and type per sample.
+        writer = ResultsWriter(self.path, SPEC, memory_budget=3 * 42)
+        log = simulate3(_actions(10), _build_state(), writer)
+
+        self.assertIsInstance(log['shares'], np.memmap)
+        self.assertEqual(read_manifest(self.path)['chunks'], [3, 3, 3, 2])
+        self.assertLessEqual(writer.capacity, 3)
+        self.assertEqual(log.action_types(), expected.action_types())
+        np.testing.assert_array_equal(log.action_index, expected.action_index)
+        np.testing.assert_array_equal(log['time'], expected['time'])
+        np.testing.assert_array_equal(log['shares'], expected['shares'])
+
+        loaded = load_results(self.path)
+        np.testing.assert_array_equal(loaded['shares'], expected['shares'])
+
+    def test_partial_results(self):
+        writer = ResultsWriter(self.path, SPEC, memory_budget=4 * 42)
+        self.assertEqual(len(load_results(self.path)), 0)
+        failing = Action(action_type='WITHDRAW', target='curationPool', args=['curator0', 1e9])
+        with self.assertRaises(Exception):
+            simulate3(_actions(10) + [failing], _build_state(), writer)
+        # the samples spilled before the failure are readable.
+        self.assertEqual(len(load_results(self.path)), 8)
+
+    def test_replaces_results(self):
+        simulate3(_actions(10), _build_state(), ResultsWriter(self.path, SPEC))
+        log = simulate3(_actions(2), _build_state(), ResultsWriter(self.path, SPEC))
+        self.assertEqual(len(log), 3)
+        self.assertEqual(os.path.getsize(os.path.join(self.path, 'action_index.bin')), 3 * 8)
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from curation_sim.__main__ import main
+from curation_sim.recorder import ColumnarRecorder
+from curation_sim.scenario_file import PackedArgs, compile_scenario, load_compiled, load_scenario, \
+    read_scenario_file, save_compiled, scenario_hash
+from curation_sim.scenarios import run_scenario
+from curation_sim.sim_utils import simulate3
+
+WHALE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scenario_files', 'whale.toml')
+
+TRADERS = """
+name: traders
+seed: 4
+periods: 30
+blocks_per_period: 10
+pool:
+  deposits: {lp: 1000}
+populations:
+  - {name: trader, count: 5, deposit: {mean: 100, std: 10}, balance: 500}
+traders:
+  - {population: trader, deposit_probability: 0.3, withdraw_probability: 0.3, trade_fraction: 1.5, start: 10}
+record:
+  metrics:
+    - {name: trader_deposits, kind: deposits, accounts: trader}
+    - {name: lp_balance, kind: balances, accounts: lp}
+    - {name: block_height, kind: block_height}
+"""
+
+
+class TestScenarioFile(unittest.TestCase):
+
+    def test_whale(self):
+        # the scenario file of the whale scenario runs as the registered scenario does.
+        log = run_scenario(load_scenario(WHALE, seed=1, cache_dir=None).scenario())
+        expected = run_scenario('whale', seed=1)
+        self.assertEqual(len(log), 120)
+        for name in log.columns:
+            np.testing.assert_allclose(log[name], expected[name])
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            compiled = load_scenario(WHALE, seed=1, cache_dir=d)
+            self.assertEqual(os.listdir(d), [f'{scenario_hash(read_scenario_file(WHALE), 1)}.npz'])
+            cached = load_scenario(WHALE, seed=1, cache_dir=d)
+            self.assertIsInstance(cached.program.args, PackedArgs)
+            np.testing.assert_array_equal(cached.program.opcodes, compiled.program.opcodes)
+            self.assertEqual(list(cached.program), list(compiled.program))
+            self.assertEqual(cached.deposits, compiled.deposits)
+
+            # another seed is another program.
+            load_scenario(WHALE, seed=2, cache_dir=d)
+            self.assertEqual(len(os.listdir(d)), 2)
+
+    def test_unhashable_args(self):
+        definition = dict(read_scenario_file(WHALE), drives=[{'period': 1, 'action': 'SLEEP', 'target': 'chain',
+                                                              'args': [[1, 2]]}] * 2)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'program.npz')
+            save_compiled(path, compile_scenario(definition))
+            program = load_compiled(path).program
+        self.assertEqual(program.args[1], ([1, 2],))
+        self.assertEqual(program.args[2], ([1, 2],))
+
+    def test_concurrent_writes(self):
+        # processes compiling the same scenario at once each write their own temporary file.
+        compiled = compile_scenario(read_scenario_file(WHALE))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'program.npz')
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(lambda _: save_compiled(path, compiled), range(32)))
+            self.assertEqual(os.listdir(d), ['program.npz'])
+            self.assertEqual(list(load_compiled(path).program), list(compiled.program))
+
+    def test_hash(self):
+        definition = read_scenario_file(WHALE)
+        reordered = dict(reversed(list(definition.items())))
+        self.assertEqual(scenario_hash(definition), scenario_hash(reordered))
+        self.assertNotEqual(scenario_hash(definition), scenario_hash(dict(definition, periods=121)))
+
+    def test_traders(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'traders.yaml')
+            with open(path, 'w') as f:
+                f.write(TRADERS)
+            compiled = load_scenario(path, cache_dir=d)
+        self.assertEqual(compiled.populations['trader'], [f'trader{i}' for i in range(5)])
+        self.assertEqual(compiled.reserveBalances['trader0'], 500)
+        # trades start at period 10.
+        action_types = [a.action_type for a in compiled.program]
+        self.assertEqual(action_types[:10], ['SLEEP'] * 10)
+        self.assertGreater(len(action_types), 30)
+
+        state = compiled.state()
+        log = simulate3(compiled.program, state, ColumnarRecorder(compiled.spec()))
+        self.assertEqual(log['trader_deposits'].shape, (len(compiled.program) + 1, 5))
+        np.testing.assert_array_equal(log['trader_deposits'][-1],
+                                      [state.curationPool.depositOf(f'trader{i}') for i in range(5)])
+        self.assertEqual(log['block_height'][-1], 300)
+        self.assertTrue((log['lp_balance'] == 0).all())
+
+    def test_seed(self):
+        definition = read_scenario_file(WHALE)
+        self.assertEqual(compile_scenario(definition).deposits, compile_scenario(definition, seed=0).deposits)
+        self.assertNotEqual(compile_scenario(definition).deposits, compile_scenario(definition, seed=1).deposits)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as d:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(['run', WHALE, '--seed', '1', '--cache-dir', d]), 0)
+            self.assertIn('120 samples', out.getvalue())
+            self.assertEqual(len(os.listdir(d)), 1)
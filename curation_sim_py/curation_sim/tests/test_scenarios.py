@@ -0,0 +1,52 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from curation_sim.__main__ import main
+from curation_sim.results import load_results
+from curation_sim.scenarios import SCENARIOS, get_scenario, register, run_scenario
+
+
+class TestScenarios(unittest.TestCase):
+
+    def test_registry(self):
+        for name in SCENARIOS:
+            self.assertTrue(get_scenario(name).description)
+        with self.assertRaises(KeyError):
+            get_scenario('nothing')
+
+    def test_seeded(self):
+        log = run_scenario('whale', seed=1)
+        self.assertEqual(len(log), 120)
+        np.testing.assert_array_equal(log['ratio'], run_scenario('whale', seed=1)['ratio'])
+        self.assertFalse(np.array_equal(log['ratio'], run_scenario('whale', seed=2)['ratio']))
+
+    def test_register(self):
+        register('whale_again', 'curation_sim.ohq_sim_whale:SCENARIO')
+        try:
+            self.assertIs(get_scenario('whale_again'), get_scenario('whale'))
+        finally:
+            del SCENARIOS['whale_again']
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as d:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                self.assertEqual(main(['run', 'share_drive', '--seed', '3', '--out', os.path.join(d, 'results')]), 0)
+            self.assertIn('150 samples', out.getvalue())
+            log = load_results(os.path.join(d, 'results'))
+            np.testing.assert_array_equal(log['curator_shares'], run_scenario('share_drive', seed=3)['curator_shares'])
+
+    def test_imports_are_light(self):
+        # importing the scenarios, or the command line, imports neither matplotlib nor scipy.
+        code = ('import sys, curation_sim.__main__, curation_sim.ohq_sim_whale, curation_sim.ohq_sim_vol, '
+                'curation_sim.ohq_sim_share_drive; print(sorted({"matplotlib", "scipy"} & set(sys.modules)))')
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '[]')
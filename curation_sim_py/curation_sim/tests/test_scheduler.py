@@ -0,0 +1,75 @@
+import itertools
+import unittest
+
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.scheduler import Scheduler
+from curation_sim.sim_utils import Action, record_effective_state, simulate3
+
+
+def _deposit(curator, amount):
+    return Action(action_type='DEPOSIT', target='curationPool', args=[curator, amount])
+
+
+def _drip():
+    return Action(action_type='DISTRIBUTE_ROYALTIES', target='curationPool', args=[5])
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_order(self):
+        scheduler = Scheduler()
+        scheduler.at(30, [_deposit('b', 1)])
+        scheduler.at(10, [_deposit('a', 1)])
+        scheduler.every(10, [_drip()], until=30)
+        scheduler.at(30, [_deposit('c', 1)])
+        actions = list(scheduler.stream(end=45))
+
+        self.assertEqual([(a.action_type, a.args[0]) for a in actions],
+                         [('SLEEP', 10), ('DEPOSIT', 'a'), ('DISTRIBUTE_ROYALTIES', 5),
+                          ('SLEEP', 10), ('DISTRIBUTE_ROYALTIES', 5),
+                          ('SLEEP', 10), ('DEPOSIT', 'b'), ('DISTRIBUTE_ROYALTIES', 5), ('DEPOSIT', 'c'),
+                          ('SLEEP', 15)])
+        self.assertEqual(scheduler.blockHeight, 45)
+        self.assertEqual(len(scheduler), 0)
+        with self.assertRaises(ValueError):
+            scheduler.at(44, [])
+
+    def test_recurring_forever(self):
+        scheduler = Scheduler(start=100).every(7, lambda block: [_deposit('a', block)])
+        actions = list(itertools.islice(scheduler, 6))
+        self.assertEqual([a.args[-1] for a in actions], [7, 107, 7, 114, 7, 121])
+        # a stream with an end leaves later events pending.
+        self.assertEqual([a.args[-1] for a in scheduler.stream(end=130)], [7, 128, 2])
+        self.assertEqual(len(scheduler), 1)
+
+    def test_matches_block_by_block(self):
+        workload = Workload(num_curators=3, periods=0)
+        scheduler = Scheduler()
+        scheduler.at(250, [_deposit('curator0', 100)])
+        scheduler.every(100, [_drip()])
+        # events may react to the state when they come due.
+        scheduler.every(300, lambda block: [Action(action_type='CLAIM', target='curationPool', args=[c])
+                                            for c in workload.curators])
+        state = workload.state()
+        evented = simulate3(scheduler.stream(end=1_000), state, record_effective_state)
+
+        events = {250: [_deposit('curator0', 100)]}
+        blocks = []
+        for block in range(1, 1_001):
+            blocks.append(Action(action_type='SLEEP', target='chain', args=[1]))
+            blocks += events.get(block, [])
+            if block % 100 == 0:
+                blocks.append(_drip())
+            if block % 300 == 0:
+                blocks += [Action(action_type='CLAIM', target='curationPool', args=[c]) for c in workload.curators]
+        expected = simulate3(blocks, workload.state(), record_effective_state)
+
+        self.assertLess(len(evented), 40)
+        self.assertEqual(evented[-1]['state']['time'], expected[-1]['state']['time'])
+        for key in ('shareBalances', 'depositBalances', 'reserveBalances'):
+            for account, value in expected[-1]['state'][key].items():
+                self.assertAlmostEqual(evented[-1]['state'][key][account], value)
+
+
+if __name__ == '__main__':
+    unittest.main()
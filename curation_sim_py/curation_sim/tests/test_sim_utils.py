@@ -1,8 +1,17 @@
+import copy
 import unittest
 
 import numpy as np
 
-from curation_sim.sim_utils import snake_to_camel, get_stakers
+from curation_sim.benchmarks.workload import Workload
+from curation_sim.event_log import EventLog
+from curation_sim.pools.array_curation_pool import ArrayCurationPool
+from curation_sim.pools.array_token import ArrayToken
+from curation_sim.pools.chain import Chain
+from curation_sim.pools.curation_pool import CurationPool
+from curation_sim.pools.token import Token
+from curation_sim.sim_utils import snake_to_camel, get_stakers, positive_normals, Action, State, compile_actions, \
+    simulate3
 
 
 class TestSnakeToCamel(unittest.TestCase):
@@ -35,3 +44,191 @@ class TestGetStakers(unittest.TestCase):
     def test_zeros(self):
         st = get_stakers(10, 0, 0)
         self.assertEqual(st, [(f'curator{i}', 0) for i in range(10)])
+
+    def test_seeded(self):
+        self.assertEqual(get_stakers(100, 10, 20, np.random.default_rng(0)),
+                         get_stakers(100, 10, 20, np.random.default_rng(0)))
+
+    def test_rarely_positive(self):
+        # the draws of the whole population are all non-negative with probability 1e-300 or so.
+        stakes = positive_normals(-50, 10, 100_000, np.random.default_rng(0))
+        self.assertEqual(stakes.min(), 0)
+        self.assertLess(stakes.mean(), 1)
+        with self.assertRaises(ValueError):
+            positive_normals(-1, 0, 10)
+
+    def test_matches_rejection(self):
+        rng = np.random.default_rng(0)
+        stakes = positive_normals(-5, 10, 200_000, rng)
+        rejected = rng.normal(-5, 10, 1_000_000).astype(np.int64)
+        rejected = rejected[rejected >= 0]
+        self.assertAlmostEqual(stakes.mean(), rejected.mean(), delta=.1)
+        np.testing.assert_allclose(np.bincount(stakes)[:5] / len(stakes),
+                                   np.bincount(rejected)[:5] / len(rejected), atol=.005)
+
+
+def _build_state():
+    reserve = Token({'curationPool': 1_000, 'curator1': 1_000})
+    chain = Chain()
+    pool = CurationPool(address='curationPool',
+                        initialShareBalances={'curator0': 1_000},
+                        initialDeposits=[('curator0', 1_000)],
+                        chain=chain,
+                        reserveToken=reserve,
+                        issuanceRate=1e-3)
+    return State(chain, reserve, pool)
+
+
+def _actions():
+    actions = []
+    for t in range(10):
+        if t == 4:
+            actions.append(Action(action_type='DEPOSIT', target='curationPool', args=['curator1', 500]))
+        actions.append(Action(action_type='CLAIM', target='curationPool', args=['curator0']))
+        actions.append(Action(action_type='SLEEP', target='chain', args=[10]))
+    return actions
+
+
+def _record(state):
+    return {'time': state.chain.blockHeight, 'shareBalances': dict(state.curationPool.shareToken.balances)}
+
+
+class TestCompileActions(unittest.TestCase):
+
+    def test_program(self):
+        actions = _actions()
+        program = compile_actions(actions)
+
+        self.assertEqual(len(program), len(actions))
+        self.assertEqual(list(program), actions)
+        self.assertEqual(program.type_counts(), {'CLAIM': 10, 'SLEEP': 10, 'DEPOSIT': 1})
+        self.assertEqual(len(program.operations), 3)
+        # equal arguments share one tuple.
+        self.assertIs(program.args[0], program.args[2])
+
+    def test_program_matches_actions(self):
+        expected = simulate3(_actions(), _build_state(), _record)
+        result = simulate3(compile_actions(_actions()), _build_state(), _record)
+        self.assertEqual(result, expected)
+
+    def test_catch_errors(self):
+        actions = [Action(action_type='WITHDRAW', target='curationPool', args=['curator1', 1]),
+                   Action(action_type='SLEEP', target='chain', args=[1])]
+        with self.assertLogs('curation_sim.sim_utils', level='ERROR'):
+            log = simulate3(compile_actions(actions), _build_state(), _record, catch_errors=True)
+        self.assertEqual(log[1]['action'], actions[0])
+        self.assertEqual(log[2]['state']['time'], 1)
+
+    def test_unknown_action(self):
+        # an action that does not resolve fails when applied, like any failing action, with either kind of input.
+        actions = [Action(action_type='WITHDRAWW', target='curationPool', args=['curator0', 1]),
+                   Action(action_type='SLEEP', target='nowhere', args=[1]),
+                   Action(action_type='SLEEP', target='chain', args=[1])]
+        for stream in (actions, compile_actions(actions)):
+            with self.assertLogs('curation_sim.sim_utils', level='ERROR'):
+                log = simulate3(stream, _build_state(), _record, catch_errors=True)
+            self.assertEqual([entry['action'] for entry in log[1:3]], actions[:2])
+            self.assertEqual(log[3]['state']['time'], 1)
+            with self.assertRaises(AttributeError):
+                simulate3(stream, _build_state(), _record)
+
+
+class TestFastForward(unittest.TestCase):
+
+    CURATORS = [f'curator{i}' for i in range(5)]
+
+    def _state(self, pool_cls=CurationPool, token_cls=Token):
+        deposits = [(c, 1_000 * (i + 1)) for i, c in enumerate(self.CURATORS)]
+        reserve = token_cls({'curationPool': sum(d for _, d in deposits)})
+        chain = Chain()
+        pool = pool_cls(address='curationPool',
+                        initialShareBalances=dict(deposits),
+                        initialDeposits=deposits,
+                        chain=chain,
+                        reserveToken=reserve,
+                        issuanceRate=1e-4)
+        return State(chain, reserve, pool)
+
+    def _stepped(self, state, periods, blocks):
+        actions = []
+        for _ in range(periods):
+            actions.append(Action(action_type='SLEEP', target='chain', args=[blocks]))
+            actions += [Action(action_type='CLAIM', target='curationPool', args=[c]) for c in self.CURATORS]
+        simulate3(actions, state)
+        return state
+
+    def _assert_same(self, state, expected):
+        pool, expected_pool = state.curationPool, expected.curationPool
+        self.assertEqual(state.chain.blockHeight, expected.chain.blockHeight)
+        self.assertAlmostEqual(pool.shareToken.totalSupply, expected_pool.shareToken.totalSupply, places=6)
+        for account in self.CURATORS + ['secondaryPool']:
+            self.assertAlmostEqual(pool.shareToken.balanceOf(account), expected_pool.shareToken.balanceOf(account),
+                                   places=6)
+
+    def test_matches_stepping(self):
+        for pool_cls, token_cls in ((CurationPool, Token), (ArrayCurationPool, ArrayToken)):
+            expected = self._stepped(self._state(pool_cls, token_cls), 50, 100)
+
+            state = self._state(pool_cls, token_cls)
+            state.fast_forward(5_000, materialize=True)
+            self._assert_same(state, expected)
+
+            lazy = self._state(pool_cls, token_cls)
+            lazy.fast_forward(5_000)
+            for c in self.CURATORS:
+                self.assertAlmostEqual(lazy.curationPool.effectiveShareBalanceOf(c),
+                                       expected.curationPool.shareToken.balanceOf(c), places=6)
+
+    def test_hooked_tokens(self):
+        expected = self._stepped(self._state(ArrayCurationPool, ArrayToken), 10, 100)
+        state = self._state(ArrayCurationPool, ArrayToken)
+        event_log = EventLog()
+        event_log.attach(state)
+        state.fast_forward(1_000, materialize=True)
+        event_log.detach()
+        self._assert_same(state, expected)
+
+
+class TestFork(unittest.TestCase):
+
+    def _check_fork(self, pool_cls, token_cls):
+        workload = Workload(num_curators=10, periods=20, mix={'DEPOSIT': .2, 'WITHDRAW': .2, 'CLAIM': .2,
+                                                              'BUY_SHARES': .5})
+        actions = workload.actions()
+        prefix, suffix = actions[:len(actions) // 2], actions[len(actions) // 2:]
+
+        state = workload.state(pool_cls, token_cls)
+        simulate3(prefix, state)
+        before = _record(state)
+        reference = copy.deepcopy(state)
+
+        branches = [state.fork() for _ in range(2)]
+        simulate3(suffix, branches[0])
+        simulate3(suffix[:len(suffix) // 2], branches[1])
+        simulate3(suffix, reference)
+
+        # the branches evolve independently of each other and of the original.
+        self.assertEqual(_record(state), before)
+        self.assertNotEqual(_record(branches[0]), _record(branches[1]))
+        self.assertEqual(_record(branches[0]), _record(reference))
+        self.assertEqual(branches[0].curationPool.secondaryPool.totalDeposits,
+                         reference.curationPool.secondaryPool.totalDeposits)
+        self.assertIs(branches[0].curationPool.secondaryPool.primaryPool, branches[0].curationPool)
+        self.assertIs(branches[0].curationPool.chain, branches[0].chain)
+
+    def test_fork(self):
+        self._check_fork(CurationPool, Token)
+
+    def test_fork_array_engine(self):
+        self._check_fork(ArrayCurationPool, ArrayToken)
+
+    def test_hooks_not_forked(self):
+        state = _build_state()
+        event_log = EventLog()
+        event_log.attach(state)
+        fork = state.fork()
+        event_log.detach()
+
+        self.assertEqual(fork.reserveToken.hooks['postTransfer'], [])
+        fork.reserveToken.transfer('curator1', 'curator0', 1)
+        self.assertEqual(state.reserveToken.balanceOf('curator0'), 0)
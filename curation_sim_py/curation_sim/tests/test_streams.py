@@ -0,0 +1,65 @@
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+from curation_sim.pools.chain import Chain
+from curation_sim.sim_utils import Action, State, simulate3
+from curation_sim.streams import RandomTraders, claim_all_then_sleep, combine, periodic, random_trades
+
+
+class TestStreams(unittest.TestCase):
+
+    def test_claim_all_then_sleep(self):
+        stream = claim_all_then_sleep(['a', 'b'], blocks=10)
+        actions = list(itertools.islice(stream, 7))
+        self.assertEqual([a.action_type for a in actions], ['CLAIM', 'CLAIM', 'SLEEP'] * 2 + ['CLAIM'])
+        self.assertEqual(actions[1].args, ['b'])
+        self.assertEqual(actions[2].args, [10])
+
+    def test_combine_and_start(self):
+        seen = []
+        odd = lambda t: [Action(action_type='CLAIM', target='curationPool', args=[t])] if t % 2 else []
+        actions = list(periodic(combine(odd, lambda t: seen.append(t) or ()), blocks=1, periods=3, start=4))
+        self.assertEqual(seen, [4, 5, 6])
+        self.assertEqual([a.args[0] for a in actions], [1, 5, 1, 1])
+
+    def test_random_traders(self):
+        def run(seed):
+            traders = RandomTraders({'t0': 100., 't1': 100.}, {'t0': 1e6, 't1': 1.}, .5, .3, 1.1,
+                                    rng=random.Random(seed))
+            return list(periodic(traders, blocks=1, periods=50)), traders
+
+        actions, traders = run(0)
+        self.assertEqual(actions, run(0)[0])
+        deposits = [a for a in actions if a.action_type == 'DEPOSIT']
+        # t1 cannot afford any deposit.
+        self.assertTrue(deposits)
+        self.assertTrue(all(a.args[0] == 't0' for a in deposits))
+        stake = 100.
+        for a in actions:
+            if a.args and a.args[0] == 't0':
+                stake += a.args[1] if a.action_type == 'DEPOSIT' else -a.args[1]
+        self.assertAlmostEqual(traders.stakes['t0'], stake)
+
+    def test_random_trades(self):
+        stakes, grt = {'t0': 100., 't1': 100., 't2': 50.}, {'t0': 1e6, 't1': 1., 't2': 20.}
+        schedule = random_trades(stakes, grt, .5, .3, 1.1, periods=40, rng=np.random.default_rng(1))
+        traders = RandomTraders(dict(stakes), dict(grt), .5, .3, 1.1, rng=np.random.default_rng(1))
+        expected = list(periodic(traders, blocks=1, periods=40))
+        self.assertEqual(list(periodic(schedule, blocks=1, periods=40)), expected)
+        self.assertEqual(len(schedule), len(expected) - 40)
+        self.assertEqual(stakes['t0'], 100.)
+        self.assertEqual(list(schedule(40)), [])
+
+    def test_consumed_lazily(self):
+        state = State(Chain(), None, None)
+        heights = []
+
+        def observed(t):
+            heights.append(state.chain.blockHeight)
+            return ()
+
+        simulate3(periodic(observed, blocks=5, periods=4), state)
+        self.assertEqual(heights, [0, 5, 10, 15])
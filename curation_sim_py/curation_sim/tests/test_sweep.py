@@ -0,0 +1,45 @@
+import random
+import unittest
+
+import numpy as np
+
+from curation_sim.ohq_sim_share_drive import PoolConfig
+from curation_sim.sweep import run_sweep, spawn_seeds, sweep_grid
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        configs = [PoolConfig(issuance_rate=r, deposit_std=1_000, reserve_std=100) for r in (1e-4, 4e-4)]
+        self.tasks = sweep_grid(configs, [{2: 10_000}, {3: 5_000}], spawn_seeds(7, 2), max_time=1)
+
+    def test_grid_order(self):
+        self.assertEqual(len(self.tasks), 8)
+        self.assertEqual([t.pool_config.issuance_rate for t in self.tasks], [1e-4] * 4 + [4e-4] * 4)
+        self.assertEqual([t.share_drive for t in self.tasks[:4]], [{2: 10_000}] * 2 + [{3: 5_000}] * 2)
+        self.assertEqual(self.tasks[0].seed, self.tasks[2].seed)
+        self.assertNotEqual(self.tasks[0].seed, self.tasks[1].seed)
+
+    def test_parallel_matches_serial(self):
+        serial = run_sweep(self.tasks, processes=1)
+        parallel = run_sweep(self.tasks, processes=2, chunksize=3)
+
+        self.assertEqual(len(parallel.results), len(self.tasks))
+        self.assertEqual(parallel.wall_times.shape, (len(self.tasks),))
+        for s, p in zip(serial.results, parallel.results):
+            np.testing.assert_array_equal(s.ratio, p.ratio)
+            np.testing.assert_array_equal(s.curator_deposits, p.curator_deposits)
+
+    def test_seed_determines_initial_conditions(self):
+        result = run_sweep(self.tasks[:2] + self.tasks[:1], processes=1).results
+        self.assertEqual(result[0].curator_deposits, result[2].curator_deposits)
+        self.assertNotEqual(result[0].curator_deposits, result[1].curator_deposits)
+
+    def test_serial_keeps_global_generators(self):
+        np.random.seed(3)
+        random.seed(3)
+        expected = np.random.random(), random.random()
+        np.random.seed(3)
+        random.seed(3)
+        run_sweep(self.tasks[:1], processes=1)
+        self.assertEqual((np.random.random(), random.random()), expected)